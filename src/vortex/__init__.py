@@ -41,7 +41,7 @@ from bronx.fancies import loggers as bloggers
 import footprints
 
 # Populate a fake proxy module with footprints shortcuts
-from . import proxy, tools, sessions, config
+from . import proxy, tools, sessions, config, lazyload
 
 # vortex user API
 from .toolbox import input as input
@@ -53,8 +53,6 @@ from .toolbox import defaults as defaults
 from .toolbox import algo as task
 from .toolbox import VortexForceComplete as VortexForceComplete
 
-from . import nwp as nwp  # footprints import
-
 __version__ = "2.4.1"
 __prompt__ = "Vortex v-" + __version__ + ":"
 
@@ -101,6 +99,7 @@ del rs
 
 def vortexfpdefaults():
     """Return actual glove, according to current environment."""
+    lazyload.load()
     cur_session = sessions.current()
     return dict(
         glove=cur_session.glove, systemtarget=cur_session.sh.default_target
@@ -122,18 +121,39 @@ if confname.exists():
 else:
     config.load_config(Path.home() / ".vortex.d" / confname)
 
-# Load some superstars sub-packages
+# Load some superstars sub-packages and plugins
 
 
-# Now load plugins that have been installed with the
-# 'vtx' entry point.  Order matters: since plugins
-# will typically depend on objects defined in 'vortex'
-# and 'vortex.nwp', these must be imported /before/
-# loading plugins.
+# Plugins are installed with the 'vtx' entry point.  Order matters: since
+# plugins will typically depend on objects defined in 'vortex' and
+# 'vortex.nwp', these must be imported /before/ loading plugins.
 _LOADED_PLUGINS = set()
-for plugin in importlib.metadata.entry_points(group="vtx"):
-    plugin.load()
-    _LOADED_PLUGINS.add(plugin.name)
+
+
+def _load_extensions():
+    """Import the :mod:`vortex.nwp` package and the plugins."""
+    importlib.import_module(".nwp", __name__)  # footprints import
+    for plugin in importlib.metadata.entry_points(group="vtx"):
+        plugin.load()
+        _LOADED_PLUGINS.add(plugin.name)
+
+
+# In lazy startup mode, this is done when the first footprint resolution
+# occurs (see the vortex.lazyload module)
+if lazyload.lazy_startup():
+    lazyload.defer(_load_extensions, __version__)
+else:
+    _load_extensions()
+
+
+def __getattr__(name):
+    """Import the deferred ``nwp`` sub-package when it is first accessed."""
+    if name == "nwp":
+        lazyload.load()
+        return importlib.import_module(".nwp", __name__)
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name)
+    )
 
 
 def loaded_plugins() -> Set[str]:
@@ -147,6 +167,7 @@ def loaded_plugins() -> Set[str]:
         >>> vortex.loaded_plugins()
             {"gco", "cen"}
     """
+    lazyload.load()
     return copy.copy(_LOADED_PLUGINS)
 
 
@@ -38,6 +38,7 @@ import importlib
 import locale
 import logging
 import multiprocessing
+import os
 import queue
 import shlex
 import sys
@@ -54,6 +55,7 @@ import vortex.config as config
 from vortex.algo import mpitools
 from vortex.syntax.stdattrs import DelayedEnvValue
 from vortex.tools.parallelism import ParallelResultParser
+from vortex.tools.writebehind import WriteBehindQueue
 
 #: No automatic export
 __all__ = []
@@ -622,6 +624,10 @@ class AlgoComponent(footprints.FootprintBase, metaclass=AlgoComponentMeta):
         logger.debug("Algo component init %s", self.__class__)
         self._fslog = list()
         self._promises = None
+        self._promises_index = None
+        self._promises_queue = None
+        self._promises_pending = dict()
+        self._promises_errors = list()
         self._expected = None
         self._delayed_excs = list()
         self._server_synctool = None
@@ -661,6 +667,30 @@ class AlgoComponent(footprints.FootprintBase, metaclass=AlgoComponentMeta):
             ]
         return self._promises
 
+    @property
+    def promises_index(self):
+        """The promises of the current component indexed by absolute path.
+
+        Since absolute paths depend on the current working directory, the
+        index is rebuilt whenever it changes.
+        """
+        cwd = os.getcwd()
+        if self._promises_index is None or self._promises_index[0] != cwd:
+            index = dict()
+            for x in self.promises:
+                index.setdefault(
+                    self.system.path.abspath(x.rh.container.abspath), []
+                ).append(x)
+            self._promises_index = (cwd, index)
+        return self._promises_index[1]
+
+    def promise_lookup(self, filename):
+        """Return the promise that matches the **filename** file (if any)."""
+        candidates = self.promises_index.get(
+            self.system.path.abspath(filename)
+        )
+        return candidates[-1] if candidates else None
+
     @property
     def expected_resources(self):
         """Return the list of really expected inputs."""
@@ -772,6 +802,85 @@ class AlgoComponent(footprints.FootprintBase, metaclass=AlgoComponentMeta):
             self, "io_poll_sleep", self.env.get("IO_POLL_SLEEP", 20)
         )
 
+    def flyput_workers(self):
+        """Return the number of threads used to put the promised resources."""
+        return int(
+            getattr(
+                self,
+                "io_poll_workers",
+                config.get_from_config_w_default("flyput", "workers", 4),
+            )
+        )
+
+    def flyput_promise(self, promise):
+        """Put the **promise** section in cache (in a background thread).
+
+        The puts are performed concurrently, while the polling (or the
+        processing) continues. Use :meth:`flyput_flush` to wait for them.
+        """
+        workers = self.flyput_workers()
+        if workers <= 1:
+            promise.put(incache=True)
+            return
+        # A new queue is needed in a forked process (e.g. the polling one)
+        if (
+            self._promises_queue is None
+            or self._promises_queue[0] != os.getpid()
+        ):
+            self._promises_queue = (
+                os.getpid(),
+                WriteBehindQueue(
+                    self.system, self.context.rundir, workers=workers
+                ),
+            )
+            self._promises_pending = dict()
+            self._promises_errors = list()
+        previous = self._promises_pending.get(id(promise))
+        if previous is not None and not previous.done():
+            # The same file must not be put twice at the same time
+            previous.result()
+        self._promises_pending[id(promise)] = self._promises_queue[1].submit(
+            "put promised " + promise.rh.container.localpath(),
+            self._flyput_promise_put,
+            promise,
+        )
+
+    def _flyput_promise_put(self, promise):
+        """Put **promise** in cache and remember the exception (if any)."""
+        try:
+            return promise.put(incache=True)
+        except Exception as e:
+            self._promises_errors.append(e)
+            raise
+
+    def flyput_flush(self):
+        """Wait for the puts of promised resources that are still pending.
+
+        The exceptions raised by the puts (e.g. a
+        :class:`~vortex.layout.dataflow.SectionFatalError` for a fatal
+        promise) are delayed (see :meth:`delayed_exception_add`): they are
+        raised at the end of the run.
+
+        :return: The number of puts that failed
+        """
+        if (
+            self._promises_queue is None
+            or self._promises_queue[0] != os.getpid()
+        ):
+            return 0
+        wbqueue = self._promises_queue[1]
+        self._promises_queue = None
+        self._promises_pending = dict()
+        failed = wbqueue.flush()
+        if failed:
+            logger.error("%d promised resource(s) could not be put", failed)
+        wbqueue.clear()
+        errors = self._promises_errors
+        self._promises_errors = list()
+        for exc in errors:
+            self.delayed_exception_add(exc, traceback=False)
+        return failed
+
     def flyput_outputmapping(self, item):
         """Map output to another filename."""
         return item, "unknown"
@@ -811,16 +920,10 @@ class AlgoComponent(footprints.FootprintBase, metaclass=AlgoComponentMeta):
                     )
             else:
                 mappeddata = thisdata
-            candidates = [
-                x
-                for x in self.promises
-                if x.rh.container.abspath
-                == self.system.path.abspath(mappeddata)
-            ]
-            if candidates:
+            bingo = self.promise_lookup(mappeddata)
+            if bingo is not None:
                 logger.info("Polled data is promised <%s>", mappeddata)
-                bingo = candidates.pop()
-                bingo.put(incache=True)
+                self.flyput_promise(bingo)
             else:
                 logger.warning("Polled data not promised <%s>", mappeddata)
 
@@ -863,6 +966,13 @@ class AlgoComponent(footprints.FootprintBase, metaclass=AlgoComponentMeta):
                 logger.info("Get asleep for %d seconds...", time_sleep)
                 self.system.sleep(time_sleep)
 
+        # Wait for the pending puts
+        self.flyput_flush()
+
+        # Let the polling method save its state (if need be)
+        if callable(getattr(io_poll_method, "close", None)):
+            io_poll_method.close()
+
         # Stop recording and send back the results
         ctxrec.unregister()
         logger.info("Sending the Context recorder to the master process.")
@@ -1266,6 +1376,7 @@ class AlgoComponent(footprints.FootprintBase, metaclass=AlgoComponentMeta):
                 raise
             finally:
                 self.execute_finalise(kw)  # 3.2
+                self.flyput_flush()  # 3.3
             self.fscheck(kw)  # 4
             self.postfix(rh, kw)  # 5
             self.dumplog(kw)  # 6
@@ -2,8 +2,11 @@
 Utility classes to interact with long running binaries.
 """
 
+import os
+import select
 import socket
 import sys
+import time
 
 import footprints
 from bronx.fancies import loggers
@@ -169,3 +172,167 @@ class ServerSyncSimpleSocket(ServerSyncTool):
 
     def trigger_stop(self):
         return self._command("STOP")
+
+
+#: The script called by the server (see :class:`ServerSyncFifo`)
+_FIFO_SCRIPT = """#!/bin/sh
+# Generated by Vortex: wait for the main process' go-ahead
+echo "WAIT $$" > '{req:s}' || exit 1
+read cmd < '{rep:s}' || exit 1
+echo "OK $cmd" > '{req:s}'
+exit 0
+"""
+
+
+class ServerSyncFifo(ServerSyncTool):
+    """Practical implementation of a ServerSyncTool that relies on named pipes.
+
+    A tiny shell script is created (its name is defined by the *medium*
+    attribute): it will be called by the server process before starting any
+    computations. This script and the main process communicate through two
+    FIFOs (created next to the script). There is no Python interpreter to
+    start and no TCP connection to set up for each step: the main process is
+    woken up as soon as the server writes something in the request FIFO
+    (the *checkinterval* timeout is only used to check the server's state).
+
+    The FIFOs are opened in read/write mode by the main process (so that
+    opening them never blocks on Linux).
+
+    The duration of each step and of each handshake are recorded (see
+    :attr:`stats`).
+    """
+
+    _footprint = dict(
+        info="Server Synchronisation Tool that uses named pipes",
+        attr=dict(
+            method=dict(
+                values=["fifo"],
+            ),
+            medium=dict(
+                optional=False,
+            ),
+        ),
+    )
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self._fifos = dict()
+        self._fds = dict()
+        for way in ("req", "rep"):
+            self._fifos[way] = os.path.abspath(
+                "{:s}.{:s}.fifo".format(self.medium, way)
+            )
+            if os.path.lexists(self._fifos[way]):
+                os.remove(self._fifos[way])
+            os.mkfifo(self._fifos[way], 0o600)
+            self._fds[way] = os.open(self._fifos[way], os.O_RDWR)
+        os.set_blocking(self._fds["req"], False)
+        self._buffer = b""
+        # Is the server waiting for a command ?
+        self._waiting = False
+        self._step_t0 = None
+        self._timings = dict(handshake=list(), step=list())
+        # Create the script that will be called by the server
+        with open(self.medium, "w") as fd:
+            fd.write(_FIFO_SCRIPT.format(**self._fifos))
+        sessions.current().sh.chmod(self.medium, 0o555)
+
+    def __del__(self):
+        for way in ("req", "rep"):
+            if way in self._fds:
+                os.close(self._fds[way])
+            if os.path.lexists(self._fifos.get(way, "")):
+                os.remove(self._fifos[way])
+        if self._waiting:
+            logger.warning("The server is still waiting... that's odd.")
+        t = sessions.current()
+        if t.sh.path.exists(self.medium):
+            t.sh.remove(self.medium)
+
+    @property
+    def stats(self):
+        """Number of steps and average/maximum step and handshake durations."""
+        stats = dict(steps=len(self._timings["step"]))
+        for what, timings in self._timings.items():
+            if timings:
+                stats[what + "_mean"] = sum(timings) / len(timings)
+                stats[what + "_max"] = max(timings)
+        return stats
+
+    def _readline(self):
+        """Wait for the next message of the server (*None* if it died)."""
+        while b"\n" not in self._buffer:
+            ready, _, _ = select.select(
+                [self._fds["req"]], [], [], self.checkinterval
+            )
+            if ready:
+                self._buffer += os.read(self._fds["req"], 4096)
+            elif not self._check_callback():
+                logger.debug("FIFO wait timed-out: the server is gone.")
+                return None
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line.decode(encoding="utf-8")
+
+    def _command(self, mess):
+        """Send a command (a string) to the server and wait for a response."""
+        if self._waiting:
+            logger.info('Sending "%s" to the server.', mess)
+            t0 = time.perf_counter()
+            os.write(self._fds["rep"], (mess + "\n").encode(encoding="utf-8"))
+            self._waiting = False
+            repl = self._readline()
+            self._timings["handshake"].append(time.perf_counter() - t0)
+            logger.info('Server replied "%s" to %s.', repl, mess)
+            if repl != "OK " + mess:
+                raise ValueError(mess + " failed")
+            return True
+        else:
+            # This should not happen ! If we are sitting here, it's most likely
+            # that the main process received a signal like SIGTERM...
+            return False
+
+    def trigger_wait(self):
+        logger.info("Waiting for the server to complete")
+        message = self._readline()
+        while message is not None and not message.startswith("WAIT"):
+            logger.warning('Unexpected message from the server: "%s"', message)
+            message = self._readline()
+        if message is None:
+            if self.raiseonexit:
+                raise OSError("Apparently the server died.")
+            else:
+                logger.info("The server stopped.")
+        else:
+            if self._step_t0 is not None:
+                self._timings["step"].append(
+                    time.perf_counter() - self._step_t0
+                )
+                self._step_t0 = None
+            self._waiting = True
+            logger.info("The server is now waiting")
+
+    def trigger_run(self):
+        # Tell the server that everything is ready
+        if self._command("STEP"):
+            self._step_t0 = time.perf_counter()
+        # Wait for the server to complete its work
+        self.trigger_wait()
+
+    def trigger_stop(self):
+        # The server stops if the script is missing when it returns
+        t = sessions.current()
+        if self._waiting and t.sh.path.exists(self.medium):
+            t.sh.remove(self.medium)
+        rc = self._command("STOP")
+        stats = self.stats
+        if stats["steps"]:
+            logger.info(
+                "%d server steps. Step duration: %.3fs (mean) %.3fs (max). "
+                + "Handshake: %.2fms (mean) %.2fms (max).",
+                stats["steps"],
+                stats["step_mean"],
+                stats["step_max"],
+                stats["handshake_mean"] * 1000,
+                stats["handshake_max"] * 1000,
+            )
+        return rc
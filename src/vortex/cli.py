@@ -9,6 +9,7 @@ import yaml
 
 import vortex
 from vortex import toolbox
+from vortex.tools import storage
 
 LOG = logging.getLogger()
 LOG.addHandler(logging.StreamHandler())
@@ -22,6 +23,10 @@ def main() -> None:
     subcommand. The vortex resource description is provided via a yaml config
     file or via stdin.
 
+    The ``cache-gc`` subcommand removes the unreferenced blobs of a cache
+    space where deduplication is activated (see the ``cache`` section of
+    the configuration file).
+
     Example:
 
     ..code:: bash
@@ -87,10 +92,27 @@ def main() -> None:
             ),
         )
 
+    sub = subparsers.add_parser(
+        "cache-gc",
+        help="Remove unreferenced blobs from a deduplicated cache",
+    )
+    sub.add_argument(
+        "entry", type=str, help="The absolute path to the cache space."
+    )
+    sub.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report what would be removed.",
+    )
+
     args = parser.parse_args()
 
     LOG.setLevel(args.log_level)
 
+    if args.subcommand == "cache-gc":
+        cache_gc(args.entry, dryrun=args.dry_run)
+        return
+
     if args.path is not None:
         yaml_str = Path(args.path).read_text()
     else:
@@ -134,3 +156,25 @@ def vortex_cli(
         toolbox.input(now=True, **args)
     elif action == "output":
         toolbox.output(now=True, **args)
+
+
+def cache_gc(entry: str, dryrun: bool = False) -> dict[str, int]:
+    """
+    Remove the blobs that are not referenced anymore from a cache space.
+
+    Blobs are created when the content-addressed deduplication is
+    activated for a cache (see :class:`vortex.tools.storage.DedupBlobStore`).
+
+    :param entry: The absolute path to the cache space.
+    :param dryrun: Only report what would be removed.
+    """
+    t = vortex.ticket()
+    stats = storage.DedupBlobStore(t.sh, entry).gc(dryrun=dryrun)
+    LOG.info(
+        "%s %d blob(s) (%d bytes). %d blob(s) are still referenced.",
+        "Would remove" if dryrun else "Removed",
+        stats["removed"],
+        stats["freed"],
+        stats["kept"],
+    )
+    return stats
@@ -5,12 +5,15 @@ This module handles store objects in charge of physically accessing resources.
 Store objects use the :mod:`footprints` mechanism.
 """
 
+import collections
+import concurrent.futures
 import copy
+import threading
+import time
 
 from bronx.fancies import loggers
-from bronx.patterns import observer
+from bronx.patterns import getbytag, observer
 from bronx.stdtypes import date
-from bronx.system import hash as hashutils
 import footprints
 
 from vortex import sessions
@@ -25,6 +28,7 @@ from vortex.syntax.stdattrs import (
     hashalgo_avail_list,
     compressionpipeline,
 )
+from vortex.tools import digests
 from vortex.tools import storage
 from vortex.tools import compression
 from vortex.tools.systems import ExecutionError
@@ -51,6 +55,119 @@ def observer_board(obsname=None):
     return observer.get(tag=obsname)
 
 
+class StoreLookupCache(getbytag.GetByTag):
+    """Remember the results of the :meth:`Store.check` and :meth:`Store.locate` calls.
+
+    Results are indexed by the store's scheme and netloc and by the remote
+    path. They are kept for ``ttl`` seconds (``negative_ttl`` seconds if the
+    resource was not found and if the store allows it: see
+    :meth:`Store.use_negative_lookup_cache`). The entries associated with a given remote path
+    are discarded whenever a ``put`` or a ``del`` action (or a failed
+    ``get``) is notified by a store (see :meth:`Store._observer_notify`).
+
+    The default settings can be changed in the ``store-lookups`` section of
+    the configuration file.
+
+    There is one such object per session (the object's tag is the session's
+    tag): see the :func:`lookup_cache` function.
+    """
+
+    def __init__(self, active=None, ttl=None, negative_ttl=None):
+        """
+        :param bool active: Is the cache used at all ?
+        :param float ttl: Time to live of positive results (in seconds)
+        :param float negative_ttl: Time to live of negative results (in seconds)
+        """
+        self.active = bool(
+            get_from_config_w_default("store-lookups", "active", True)
+            if active is None
+            else active
+        )
+        self.ttl = float(
+            get_from_config_w_default("store-lookups", "ttl", 300)
+            if ttl is None
+            else ttl
+        )
+        self.negative_ttl = float(
+            get_from_config_w_default("store-lookups", "negative_ttl", 60)
+            if negative_ttl is None
+            else negative_ttl
+        )
+        self._lock = threading.Lock()
+        self._entries = collections.defaultdict(dict)
+        self._stats = collections.Counter()
+
+    @property
+    def stats(self):
+        """A dictionary with the number of hits, misses and invalidations."""
+        with self._lock:
+            return dict(self._stats)
+
+    def __len__(self):
+        with self._lock:
+            return sum([len(bucket) for bucket in self._entries.values()])
+
+    @staticmethod
+    def _bucket_key(store, remote):
+        return (str(store.scheme), str(store.netloc), remote["path"])
+
+    @staticmethod
+    def _entry_key(store, action, remote):
+        return (
+            store.footprint_clsname(),
+            action,
+            remote.get("username", None),
+            repr(sorted(remote.get("query", dict()).items())),
+        )
+
+    def lookup(self, store, action, remote):
+        """Look for a previous result of **action** for the **remote** resource.
+
+        :return: A ``(found, result)`` tuple
+        """
+        bkey = self._bucket_key(store, remote)
+        ekey = self._entry_key(store, action, remote)
+        with self._lock:
+            expiry, result = self._entries.get(bkey, dict()).get(
+                ekey, (None, None)
+            )
+            if expiry is not None and expiry >= time.monotonic():
+                self._stats["hits"] += 1
+                return True, result
+            self._stats["misses"] += 1
+            return False, None
+
+    def record(self, store, action, remote, result):
+        """Remember the **result** of **action** for the **remote** resource."""
+        if result:
+            ttl = self.ttl
+        else:
+            ttl = self.negative_ttl if store.use_negative_lookup_cache() else 0
+        if ttl <= 0:
+            return
+        bkey = self._bucket_key(store, remote)
+        ekey = self._entry_key(store, action, remote)
+        with self._lock:
+            self._entries[bkey][ekey] = (time.monotonic() + ttl, result)
+
+    def invalidate(self, store, remote):
+        """Forget about any result concerning the **remote** resource."""
+        with self._lock:
+            if self._entries.pop(self._bucket_key(store, remote), None):
+                self._stats["invalidations"] += 1
+
+    def clear(self):
+        """Forget about everything (and reset the statistics)."""
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+
+
+def lookup_cache():
+    """Return the :class:`StoreLookupCache` object of the current session."""
+    return StoreLookupCache(tag=sessions.current().tag)
+
+
 class Store(footprints.FootprintBase):
     """Root class for any :class:`Store` subclasses."""
 
@@ -108,7 +225,32 @@ class Store(footprints.FootprintBase):
         """How fast and reliable is a check call ?"""
         return False
 
+    def use_lookup_cache(self):
+        """Can the results of check/locate calls be cached for a while ?
+
+        See the :class:`StoreLookupCache` class.
+        """
+        return False
+
+    def use_negative_lookup_cache(self):
+        """Can the unsuccessful check/locate calls be cached too ?
+
+        Caches may be shared with other processes that fill them at any time:
+        by default, only the misses of archive stores are remembered.
+        """
+        return self.use_archive()
+
+    def _lookup_cache(self, options):
+        """The :class:`StoreLookupCache` object to use (or *None*)."""
+        if not options.get("lookupcache", True) or not self.use_lookup_cache():
+            return None
+        lcache = lookup_cache()
+        return lcache if lcache.active else None
+
     def _observer_notify(self, action, rc, remote, local=None, options=None):
+        if action in ("put", "del") or (action == "get" and not rc):
+            for lcache in StoreLookupCache.tag_values():
+                lcache.invalidate(self, remote)
         strack = options is None or options.get("obs_notify", True)
         if self.storetrack and strack:
             infos = dict(action=action, status=rc, remote=remote)
@@ -207,7 +349,18 @@ class Store(footprints.FootprintBase):
         options = self._options_fixup(options)
         if not self._incache_inarchive_check(options):
             return False
-        rc = getattr(self, self.scheme + "check", self.notyet)(remote, options)
+        lcache = self._lookup_cache(options)
+        found, rc = (
+            lcache.lookup(self, "check", remote)
+            if lcache is not None
+            else (False, None)
+        )
+        if not found:
+            rc = getattr(self, self.scheme + "check", self.notyet)(
+                remote, options
+            )
+            if lcache is not None:
+                lcache.record(self, "check", remote, rc)
         self._observer_notify("check", rc, remote, options=options)
         return rc
 
@@ -217,9 +370,19 @@ class Store(footprints.FootprintBase):
         logger.debug("Store locate %s", remote)
         if not self._incache_inarchive_check(options):
             return None
-        return getattr(self, self.scheme + "locate", self.notyet)(
-            remote, options
+        lcache = self._lookup_cache(options)
+        found, rloc = (
+            lcache.lookup(self, "locate", remote)
+            if lcache is not None
+            else (False, None)
         )
+        if not found:
+            rloc = getattr(self, self.scheme + "locate", self.notyet)(
+                remote, options
+            )
+            if lcache is not None:
+                lcache.record(self, "locate", remote, rloc)
+        return rloc
 
     def list(self, remote, options=None):
         """Proxy method to dedicated list method according to scheme."""
@@ -315,9 +478,10 @@ class Store(footprints.FootprintBase):
                     "Something went very wrong when fetching the hash file ! (assuming rc=False)"
                 )
                 rc = False
-            # check the hash key
-            hadapt = hashutils.HashAdapter(self.storehash)
-            rc = rc and hadapt.filecheck(local, tempcontainer)
+            # check the hash key (it may be known already, see _actual_get)
+            rc = rc and digests.digest_cache().filecheck(
+                local, self.storehash, tempcontainer
+            )
             if rc:
                 logger.info("%s hash sanity check succeeded.", self.storehash)
             else:
@@ -333,14 +497,16 @@ class Store(footprints.FootprintBase):
         if not self._incache_inarchive_check(options):
             return False
         if not options.get("insitu", False) or self.use_cache():
-            if result_id:
-                rc = getattr(self, self.scheme + action, self.notyet)(
-                    result_id, remote, local, options
-                )
-            else:
-                rc = getattr(self, self.scheme + action, self.notyet)(
-                    remote, local, options
-                )
+            # If possible, the hash sum is computed while the data are fetched
+            with digests.streaming_digests(self.storehash):
+                if result_id:
+                    rc = getattr(self, self.scheme + action, self.notyet)(
+                        result_id, remote, local, options
+                    )
+                else:
+                    rc = getattr(self, self.scheme + action, self.notyet)(
+                        remote, local, options
+                    )
             self._observer_notify(
                 "get", rc, remote, local=local, options=options
             )
@@ -384,8 +550,7 @@ class Store(footprints.FootprintBase):
         remote = remote.copy()
         remote["path"] = remote["path"] + "." + self.storehash
         # Generate the hash sum
-        hadapt = hashutils.HashAdapter(self.storehash)
-        tmplocal = hadapt.file2hash_fh(local)
+        tmplocal = digests.digest_cache().file2hash_fh(local, self.storehash)
         # Write it whereever the original store wants to.
         return callback(tmplocal, remote, options)
 
@@ -576,12 +741,68 @@ class MultiStore(footprints.FootprintBase):
     def _options_fixup(options):
         return dict() if options is None else options
 
+    @staticmethod
+    def _concurrent_probes(options, stores):
+        """Should **stores** be probed concurrently ?
+
+        This is an opt-in feature: either the ``concurrent_probes`` option is
+        provided or the ``concurrent_probes`` setting of the ``multistore``
+        configuration section is *True*.
+        """
+        return len(stores) > 1 and options.get(
+            "concurrent_probes",
+            get_from_config_w_default(
+                "multistore", "concurrent_probes", False
+            ),
+        )
+
+    @staticmethod
+    def _probes_executor(stores):
+        """A pool of threads suitable to probe **stores** concurrently."""
+        return concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(stores), thread_name_prefix="vortex-probe"
+        )
+
+    def _probe(self, stores, remote, options):
+        """Check concurrently for the resource in **stores**.
+
+        The priority of the stores is honoured: the first store (in the order
+        of **stores**) that holds the resource wins. Once the winner is known,
+        the pending probes are cancelled and the ongoing probes are abandoned.
+
+        :return: A ``(index, rc)`` tuple where ``index`` is the position of the
+            winning store in **stores** (*None* if the resource is not found)
+            and ``rc`` is the result of its ``check`` method.
+        """
+        logger.debug("Multistore concurrent probes on %d stores", len(stores))
+        executor = self._probes_executor(stores)
+        futures = list()
+        try:
+            for sto in stores:
+                futures.append(
+                    executor.submit(sto.check, remote.copy(), options)
+                )
+            rc = False
+            for num, future in enumerate(futures):
+                rc = future.result()
+                if rc:
+                    return num, rc
+            return None, rc
+        finally:
+            # NB: shutdown's cancel_futures argument requires Python >= 3.9
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
     def check(self, remote, options=None):
         """Go through internal opened stores and check for the resource."""
         options = self._options_fixup(options)
         logger.debug("Multistore check from %s", remote)
+        f_ostores = self.filtered_readable_openedstores(remote)
+        if self._concurrent_probes(options, f_ostores):
+            return self._probe(f_ostores, remote, options)[1]
         rc = False
-        for sto in self.filtered_readable_openedstores(remote):
+        for sto in f_ostores:
             rc = sto.check(remote.copy(), options)
             if rc:
                 break
@@ -594,13 +815,20 @@ class MultiStore(footprints.FootprintBase):
         f_ostores = self.filtered_readable_openedstores(remote)
         if not f_ostores:
             return False
-        rloc = list()
-        for sto in f_ostores:
-            logger.debug("Multistore locate at %s", sto)
-            tmp_rloc = sto.locate(remote.copy(), options)
-            if tmp_rloc:
-                rloc.append(tmp_rloc)
-        return ";".join(rloc)
+        if self._concurrent_probes(options, f_ostores):
+            with self._probes_executor(f_ostores) as executor:
+                all_rloc = list(
+                    executor.map(
+                        lambda sto: sto.locate(remote.copy(), options),
+                        f_ostores,
+                    )
+                )
+        else:
+            all_rloc = list()
+            for sto in f_ostores:
+                logger.debug("Multistore locate at %s", sto)
+                all_rloc.append(sto.locate(remote.copy(), options))
+        return ";".join([rloc for rloc in all_rloc if rloc])
 
     def list(self, remote, options=None):
         """Go through internal opened stores and list the expected resource for each of them."""
@@ -635,6 +863,58 @@ class MultiStore(footprints.FootprintBase):
                     break
         return rc
 
+    @staticmethod
+    def _writebehind_refills(options, local):
+        """Should the refills of **local** be performed asynchronously ?
+
+        This is an opt-in feature: either the ``writebehind_refills`` option is
+        provided or the ``writebehind_refills`` setting of the ``multistore``
+        configuration section is *True*.
+        """
+        return isinstance(local, str) and options.get(
+            "writebehind_refills",
+            get_from_config_w_default(
+                "multistore", "writebehind_refills", False
+            ),
+        )
+
+    @staticmethod
+    def _refill_stores(restores, local, remote, options):
+        """Refill the **restores** stores with **local** (if needed)."""
+        rc = True
+        for restore in restores:
+            if not restore.check(remote.copy(), options):
+                logger.info("Refill back in writeable store [%s].", restore)
+                rc = restore.put(local, remote.copy(), options) and rc
+        return rc
+
+    def _writebehind_refill(self, restores, local, remote, options):
+        """Refill the **restores** stores in a background thread.
+
+        :return: *False* if the refill could not be submitted.
+        """
+        wbqueue = sessions.current().context.writebehind_queue
+        staged = wbqueue.stage(
+            local,
+            fmt=options.get("fmt"),
+            intent=options.get("intent", CACHE_GET_INTENT_DEFAULT),
+        )
+        if staged is None:
+            return False
+        r_options = copy.copy(options)
+        # The tracking should refer to the original local file
+        r_options.setdefault("obs_overridelocal", local)
+        wbqueue.submit(
+            "refill of {:s}".format(remote["path"]),
+            self._refill_stores,
+            restores,
+            staged,
+            remote.copy(),
+            r_options,
+            staged=staged,
+        )
+        return True
+
     def _refilling_get(self, remote, local, options, result_id=None):
         """Go through internal opened stores for the first available resource."""
         rc = False
@@ -644,8 +924,17 @@ class MultiStore(footprints.FootprintBase):
             f_wr_ostores = self.filtered_writeable_openedstores(remote)
         get_options = copy.copy(options)
         get_options["silent"] = True
+        first = 0
+        if result_id is None and self._concurrent_probes(
+            options, f_rd_ostores
+        ):
+            # Skip the stores that do not hold the resource. If none does,
+            # the usual sequential processing takes place.
+            first = self._probe(f_rd_ostores, remote, options)[0] or 0
         while refill_in_progress:
             for num, sto in enumerate(f_rd_ostores):
+                if num < first:
+                    continue
                 logger.debug("Multistore get at %s", sto)
                 if result_id and num == len(f_rd_ostores) - 1:
                     rc = sto.finaliseget(
@@ -670,6 +959,15 @@ class MultiStore(footprints.FootprintBase):
                             and ostore.use_cache()
                         )
                     ]
+                # Do the refills in the background if requested
+                if (
+                    restores
+                    and self._writebehind_refills(options, local)
+                    and self._writebehind_refill(
+                        restores, local, remote, options
+                    )
+                ):
+                    restores = []
                 # Do the refills and check if one of them succeed
                 refill_in_progress = False
                 for restore in restores:
@@ -703,6 +1001,8 @@ class MultiStore(footprints.FootprintBase):
                 # Whatever the refill's outcome, that's fine
                 if rc:
                     break
+            # The refilled stores are considered in the next round
+            first = 0
         if not rc:
             self._verbose_log(
                 options,
@@ -838,6 +1138,10 @@ class ArchiveStore(Store):
     def realkind(self):
         return "archivestore"
 
+    def use_lookup_cache(self):
+        """Archive lookups are costly: cache them."""
+        return True
+
     @property
     def tracking_extraargs(self):
         tea = super().tracking_extraargs
@@ -1121,6 +1425,10 @@ class CacheStore(Store):
         """Because that's why caching is used !"""
         return True
 
+    def use_lookup_cache(self):
+        """Cache lookups may involve numerous stat calls: cache them."""
+        return True
+
     @property
     def underlying_cache_kind(self):
         """The kind of cache that will be used."""
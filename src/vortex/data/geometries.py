@@ -3,13 +3,16 @@ This module contains the definition of all the Geometry objects widely in
 Vortex's resources description. Geometry objects rely on the
 :class:`bronx.patterns.getbytag.GetByTag` class.
 
-When this module is first imported, pre-defined geometries are automatically
-created using:
+Pre-defined geometries are automatically available using:
 
     * The ``geometries.ini`` file from the Vortex's distribution ``conf`` directory
     * The ``geometries.ini`` file located in the user's configuration directory
       (usually ``$HOME/.vortexrc``). (This file may be missing)
 
+These files are only read when a geometry is first looked for (not when this
+module is imported) and each pre-defined Geometry object is only created when
+it is first requested (or when the whole list of geometries is browsed).
+
 Additional Geometry objects can be manually created by the user provided that
 the ``new=True`` argument is given to the desired class constructor (otherwise
 an exception will be raised).
@@ -55,6 +58,7 @@ class documentation for more details.
 import configparser
 import importlib.resources
 import re
+import threading
 
 from bronx.fancies import loggers
 import bronx.patterns.getbytag
@@ -117,6 +121,14 @@ class Geometry(bronx.patterns.getbytag.GetByTag):
 
     _tag_implicit_new = False
 
+    def __new__(cls, *args, **kw):
+        """Create the requested pre-defined geometry if needed."""
+        if not kw.get("new", False) and (_DEFERRED_LOADS or _DEFERRED):
+            tag = kw.get("tag", args[0] if args else None)
+            if isinstance(tag, str):
+                _materialize(cls.tag_clean(tag))
+        return super().__new__(cls, *args, **kw)
+
     def __init__(self, **kw):
         """
         :param str tag: The geometry's name (if no **tag** attributes is provided,
@@ -146,6 +158,30 @@ class Geometry(bronx.patterns.getbytag.GetByTag):
         """Geometries id tags are lower case."""
         return tag.lower()
 
+    @classmethod
+    def tag_keys(cls):
+        """Return the sorted list of tags (pre-defined geometries included)."""
+        _materialize()
+        return super().tag_keys()
+
+    @classmethod
+    def tag_values(cls):
+        """Return the list of geometries (pre-defined geometries included)."""
+        _materialize()
+        return super().tag_values()
+
+    @classmethod
+    def tag_items(cls):
+        """Return the list of (tag, geometry) pairs (pre-defined included)."""
+        _materialize()
+        return super().tag_items()
+
+    @classmethod
+    def tag_check(cls, tag):
+        """Check if the **tag** geometry exists (pre-defined included)."""
+        _materialize(cls.tag_clean(tag))
+        return super().tag_check(tag)
+
     def __repr__(self):
         """Nicer represenation for geometries."""
         return "<{:s}.{:s} (tag='{:s}') object at {:#x}>".format(
@@ -756,7 +792,29 @@ hgeometry_deco = footprints.DecorativeFootprint(
 )
 
 
-# Load default geometries when the module is first imported
+# Load default geometries when they are first needed
+
+#: The pending calls to :func:`add_geometries` (configuration files not yet read)
+_DEFERRED_LOADS = list()
+
+#: The pre-defined geometries that are not created yet (tag -> class, attributes)
+_DEFERRED = dict()
+
+_DEFERRED_LOCK = threading.RLock()
+
+
+def _materialize(tag=None):
+    """Create the **tag** pre-defined geometry (or all of them if omitted)."""
+    with _DEFERRED_LOCK:
+        while _DEFERRED_LOADS:
+            _DEFERRED_LOADS.pop(0)()
+        if tag is None:
+            tags = list(_DEFERRED.keys())
+        else:
+            tags = [tag] if tag in _DEFERRED else []
+        for item in tags:
+            thisclass, gdesc = _DEFERRED.pop(item)
+            thisclass(tag=item, new=True, **gdesc)
 
 
 def _get_user_config_dir():
@@ -771,18 +829,8 @@ def _get_user_config_dir():
     return Path(env.HOME) / ".vortexrc"
 
 
-def load(
-    inifile="@geometries.ini",
-    refresh=False,
-    verbose=True,
-    _user_config_dir=None,
-):
-    """Load a set of pre-defined geometries from a configuration file.
-
-    The class that will be instantiated depends on the "kind" keyword..
-
-    :param _user_config_dir: Override user config directory (for testing)
-    """
+def _read_inifiles(_user_config_dir=None):
+    """Read the distribution's and the user's geometries configuration files."""
     iniconf = configparser.ConfigParser()
 
     # Load from vortex distribution
@@ -800,10 +848,39 @@ def load(
         with open(user_geometries, encoding="utf-8") as fh:
             iniconf.read_file(fh)
 
-    add_geometries(iniconf, refresh, verbose)
+    return iniconf
+
+
+def load(
+    inifile="@geometries.ini",
+    refresh=False,
+    verbose=True,
+    _user_config_dir=None,
+    lazy=False,
+):
+    """Load a set of pre-defined geometries from a configuration file.
+
+    The class that will be instantiated depends on the "kind" keyword..
+
+    :param _user_config_dir: Override user config directory (for testing)
+    :param lazy: Read the configuration files and create the Geometry objects
+        only when they are first needed
+    """
+    if lazy:
+        with _DEFERRED_LOCK:
+            _DEFERRED_LOADS.append(
+                lambda: add_geometries(
+                    _read_inifiles(_user_config_dir),
+                    refresh,
+                    verbose,
+                    lazy=True,
+                )
+            )
+    else:
+        add_geometries(_read_inifiles(_user_config_dir), refresh, verbose)
 
 
-def add_geometries(iniconf, refresh, verbose):
+def add_geometries(iniconf, refresh, verbose, lazy=False):
     for item in iniconf.sections():
         gdesc = dict(iniconf.items(item))
         gkind = gdesc.get("kind")
@@ -821,13 +898,19 @@ def add_geometries(iniconf, refresh, verbose):
             )
         if verbose:
             print("+ Load", item.ljust(16), "as", thisclass)
-        if refresh:
-            # Always recreate the Geometry...
-            thisclass(tag=item, new=True, **gdesc)
-        else:
-            # Only create new geometries
-            if item not in Geometry.tag_keys():
+        with _DEFERRED_LOCK:
+            if not refresh and (
+                item in Geometry._tag_table
+                or Geometry.tag_clean(item) in _DEFERRED
+            ):
+                # Only create new geometries
+                continue
+            if lazy:
+                _DEFERRED[Geometry.tag_clean(item)] = (thisclass, gdesc)
+            else:
+                # Always recreate the Geometry...
+                _DEFERRED.pop(Geometry.tag_clean(item), None)
                 thisclass(tag=item, new=True, **gdesc)
 
 
-load(verbose=False)
+load(verbose=False, lazy=True)
@@ -1247,6 +1247,15 @@ class Handler:
         else:
             return None
 
+    @property
+    def promise_location(self):
+        """The location of the promise file of an expected resource.
+
+        *None* is returned if the resource is not expected.
+        """
+        pr = self._localpr_json
+        return None if pr is None else pr.get("itself")
+
     def is_grabable(self, check_exists=False):
         """Return if an expected resource is available or not.
 
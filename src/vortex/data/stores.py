@@ -238,6 +238,10 @@ class Finder(Store):
     def realkind(self):
         return "finder"
 
+    def use_lookup_cache(self):
+        """Only remote (FTP) lookups are worth caching."""
+        return self.scheme == "ftp"
+
     def hostname(self):
         """Returns the current :attr:`netloc`."""
         return self.netloc
@@ -1448,6 +1452,10 @@ class PromiseCacheStore(VortexCacheMtStore):
     def cache_entry(self):
         return os.path.join(super().cache_entry, "promise")
 
+    def use_lookup_cache(self):
+        """Promises are volatile by nature: never cache lookups."""
+        return False
+
     @staticmethod
     def _add_default_options(options):
         options_upd = options.copy()
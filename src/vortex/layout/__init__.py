@@ -11,7 +11,10 @@ a VORTEX session:
       class that provide a logical separation within VORTEX sessions. It mantains
       the list of sections and environment variables ;
     * the :mod:`monitor` module defines utility classes to monitor the state of an
-      ensemble of :class:`~dataflow.Section` objects.
+      ensemble of :class:`~dataflow.Section` objects ;
+    * the :mod:`fetching` module provides a thread based engine that performs
+      the get-like actions of several :class:`~dataflow.Section` objects
+      concurrently.
 """
 
 #: No automatic export
@@ -2,6 +2,8 @@
 This modules defines the physical layout.
 """
 
+import threading
+
 import footprints
 from bronx.fancies import loggers
 from bronx.stdtypes.history import PrivateHistory
@@ -10,7 +12,9 @@ from bronx.stdtypes.tracking import Tracker
 
 from vortex.tools.env import Environment
 import vortex.tools.prestaging
+import vortex.tools.touches
 from vortex.tools.delayedactions import PrivateDelayedActionsHub
+from vortex.tools.writebehind import WriteBehindQueue
 from . import dataflow
 
 #: No automatic export.
@@ -204,6 +208,9 @@ class Context(getbytag.GetByTag, observer.Observer):
         self._record = False
         self._prestaging_hub = None  # Will be initialised on demand
         self._delayedactions_hub = None  # Will be initialised on demand
+        self._writebehind_queue = None  # Will be initialised on demand
+        # Notifications may come from several threads (see layout.fetching)
+        self._obslock = threading.RLock()
 
         if sequence:
             self._sequence = sequence
@@ -266,7 +273,8 @@ class Context(getbytag.GetByTag, observer.Observer):
                 id(item),
             )
             if self._record and info["observerboard"] == _RHANDLERS_OBSBOARD:
-                self._sequence.section(rh=item, stage="load")
+                with self._obslock:
+                    self._sequence.section(rh=item, stage="load")
 
     def updobsitem(self, item, info):
         """
@@ -275,20 +283,25 @@ class Context(getbytag.GetByTag, observer.Observer):
         """
         if self.active:
             logger.debug("Notified %s upd item %s", self, item)
-            if info["observerboard"] == _RHANDLERS_OBSBOARD:
-                if "stage" in info:
-                    # Update the sequence
-                    for section in self._sequence.fastsearch(item):
-                        if section.rh is item:
-                            self._sequence.section_updstage(section, info)
-                if ("stage" in info) or ("clear" in info):
-                    # Update the local tracker
-                    self._localtracker.update_rh(item, info)
-            elif info["observerboard"] == _STORES_OBSBOARD:
+            with self._obslock:
+                self._updobsitem_locked(item, info)
+
+    def _updobsitem_locked(self, item, info):
+        """Actually process an update notification (see :meth:`updobsitem`)."""
+        if info["observerboard"] == _RHANDLERS_OBSBOARD:
+            if "stage" in info:
+                # Update the sequence
+                for section in list(self._sequence.fastsearch(item)):
+                    if section.rh is item:
+                        self._sequence.section_updstage(section, info)
+            if ("stage" in info) or ("clear" in info):
                 # Update the local tracker
-                self._localtracker.update_store(item, info)
-                if info["action"] == _PRESTAGE_REQ_ACTION:
-                    self.prestaging_hub.record(**info)
+                self._localtracker.update_rh(item, info)
+        elif info["observerboard"] == _STORES_OBSBOARD:
+            # Update the local tracker
+            self._localtracker.update_store(item, info)
+            if info["action"] == _PRESTAGE_REQ_ACTION:
+                self.prestaging_hub.record(**info)
 
     def get_recorder(self):
         """Return a :obj:`ContextObserverRecorder` object recording the changes in this Context."""
@@ -422,6 +435,23 @@ class Context(getbytag.GetByTag, observer.Observer):
             )
         return self._delayedactions_hub
 
+    @property
+    def writebehind_queue(self):
+        """Return the write-behind queue associated with this context.
+
+        see :class:`vortex.tools.writebehind` for more details.
+        """
+        if self._writebehind_queue is None:
+            self._writebehind_queue = WriteBehindQueue(
+                sh=self.system, contextrundir=self.rundir
+            )
+        return self._writebehind_queue
+
+    def flush_writebehind(self):
+        """Wait for the pending write-behind actions (if any)."""
+        if self._writebehind_queue is not None:
+            self._writebehind_queue.flush()
+
     @property
     def system(self):
         """Return the :class:`~vortex.tools.env.System` object associated to the root session."""
@@ -556,6 +586,8 @@ class Context(getbytag.GetByTag, observer.Observer):
 
     def free_resources(self):
         """Try to free up memory (removing temporary stuff, caches, ...)."""
+        self.flush_writebehind()
+        vortex.tools.touches.flush()
         self.sequence.free_resources()
         self.clear_stamps()
 
@@ -566,6 +598,9 @@ class Context(getbytag.GetByTag, observer.Observer):
 
     def exit(self):
         """Clean exit from the current context."""
+        if self._writebehind_queue is not None:
+            self._writebehind_queue.clear()
+            self._writebehind_queue = None
         try:
             self.clear()
         except TypeError:
@@ -5,6 +5,7 @@ This modules defines the low level physical layout for data handling.
 from collections import namedtuple, defaultdict
 import collections.abc
 import json
+import os
 import pprint
 import re
 import traceback
@@ -18,6 +19,8 @@ import footprints
 
 from vortex.util.roles import setrole
 
+from .fetching import FetchEngine
+
 #: No automatic export.
 __all__ = []
 
@@ -654,6 +657,21 @@ class Sequence(observer.Observer):
             for section in [s for s in self.sections if s.rh is item]:
                 self._sections_hash[section.rh.simplified_hashkey].add(section)
 
+    def fetch(self, sections=None, workers=None, **kw):
+        """Concurrently call the ``get`` method of several input sections.
+
+        :param list sections: The sections to process (by default, all the
+            input sections that are still in the "load" stage)
+        :param int workers: The maximum number of threads (see
+            :class:`~vortex.layout.fetching.FetchEngine`)
+        :return: The list of return codes (in the order of **sections**)
+
+        Any additional named argument is passed to the sections' ``get`` method.
+        """
+        if sections is None:
+            sections = [s for s in self.inputs() if s.stage == "load"]
+        return FetchEngine(workers=workers).run_action(sections, "get", **kw)
+
     def fastsearch(self, skeleton):
         """
         Uses the sections hash table to significantly speed-up searches.
@@ -887,16 +905,23 @@ class LocalTrackerEntry:
     )
     _internals = ("rhdict", "hook", "uri")
 
-    def __init__(self, master_tracker=None):
+    def __init__(self, master_tracker=None, location=None):
         """
 
         :param master_tracker: The LocalTracker this entry belongs to.
+        :param location: The local container this entry deals with.
         """
         self._data = dict()
         self._master_tracker = master_tracker
+        self._location = location
         for internal in self._internals:
             self._data[internal] = {act: list() for act in self._actions}
 
+    def _journal(self, op, **kwargs):
+        """Record a change in the master tracker's journal."""
+        if self._master_tracker is not None and self._location is not None:
+            self._master_tracker.journal_event(self._location, op, **kwargs)
+
     @classmethod
     def _check_action(cls, action):
         return action in cls._actions
@@ -923,12 +948,14 @@ class LocalTrackerEntry:
         stage = info["stage"]
         if self._check_action(stage):
             if "hook" in info:
-                self._data["hook"][stage].append(self._jsonize(info["hook"]))
+                hook = self._jsonize(info["hook"])
+                self._data["hook"][stage].append(hook)
+                self._journal("hook", action=stage, item=hook)
             elif not info.get("insitu", False):
                 # We are using as_dict since this may be written to a JSON file
-                self._data["rhdict"][stage].append(
-                    self._clean_rhdict(rh.as_dict())
-                )
+                rhdict = self._clean_rhdict(rh.as_dict())
+                self._data["rhdict"][stage].append(rhdict)
+                self._journal("rhdict", action=stage, item=rhdict)
 
     def _update_store(self, info, uri):
         """Update the entry based on data received from the observer board.
@@ -945,6 +972,7 @@ class LocalTrackerEntry:
             self._data["uri"][action].append(uri)
             if self._master_tracker is not None:
                 self._master_tracker.uri_map_append(self, action, uri)
+            self._journal("uri", action=action, item=uri)
 
     def dump_as_dict(self):
         """Export the entry as a dictionary."""
@@ -961,13 +989,34 @@ class LocalTrackerEntry:
             for uri in self._data["uri"][action]:
                 self._master_tracker.uri_map_append(self, action, uri)
 
-    def append(self, anotherentry):
-        """Append the content of another LocalTrackerEntry object into this one."""
+    def journal_replay(self, event):
+        """Apply a change recorded in a :class:`LocalTracker` journal.
+
+        :param dict event: The journal's event
+        """
+        op = event["op"]
+        if op == "entry":
+            self.load_from_dict(event["data"])
+        elif op == "append":
+            self._extend(event["data"])
+        elif op == "uri_remove":
+            self._uri_remove(event["item"])
+        elif op in self._internals:
+            self._data[op][event["action"]].append(event["item"])
+            if op == "uri" and self._master_tracker is not None:
+                self._master_tracker.uri_map_append(
+                    self, event["action"], event["item"]
+                )
+
+    def _extend(self, data):
         for internal in self._internals:
             for act in self._actions:
-                self._data[internal][act].extend(
-                    anotherentry._data[internal][act]
-                )
+                self._data[internal][act].extend(data[internal][act])
+
+    def append(self, anotherentry):
+        """Append the content of another LocalTrackerEntry object into this one."""
+        self._extend(anotherentry._data)
+        self._journal("append", data=anotherentry._data)
 
     def latest_rhdict(self, action):
         """Return the dictionary that represents the latest :class:`~vortex.data.handlers.Handler` object involved.
@@ -1009,6 +1058,11 @@ class LocalTrackerEntry:
 
         :param uri: A cleaned (i.e. compatible with JSON) representation of the URI
         """
+        if uri in self._data["uri"]["put"]:
+            self._uri_remove(uri)
+            self._journal("uri_remove", item=uri)
+
+    def _uri_remove(self, uri):
         while uri in self._data["uri"]["put"]:
             self._data["uri"]["put"].remove(uri)
             if self._master_tracker is not None:
@@ -1073,18 +1127,106 @@ class LocalTracker(defaultdict):
     For each local container (identified by the result of its iotarget method), a
     dictionary entry is created. Its value is a :class:`~vortex.layout.dataflow.LocalTrackerEntry`
     object.
+
+    The tracker is saved as a journal (see :meth:`json_dump`): the file
+    contains one JSON document per line. The first dump (and, from time to
+    time, subsequent ones) writes a full snapshot of the tracker. Otherwise,
+    only the changes that occurred since the previous dump are appended to
+    the file. When such a file is loaded (see :meth:`json_load`), the
+    :class:`LocalTrackerEntry` objects are only created when they are
+    actually accessed.
     """
 
     _default_json_filename = "local-tracker-state.json"
 
+    _journal_format = "localtracker-journal"
+    _journal_version = 1
+
     def __init__(self):
         super().__init__()
         # This hash table will be used to speedup searches
         self._uri_map = defaultdict(lambda: defaultdict(weakref.WeakSet))
+        # Location -> journal events that were loaded but not yet replayed
+        self._lazy = dict()
+        # The journal file that is kept up to date by json_dump
+        self._journal_file = None
+        self._journal_stat = None
+        self._journal_lines = 0
+        # The events not yet written (None if a snapshot is needed)
+        self._journal_pending = None
+
+    def __reduce__(self):
+        self._materialize_all()
+        return super().__reduce__()
 
     def __missing__(self, key):
-        self[key] = LocalTrackerEntry(master_tracker=self)
-        return self[key]
+        if key in self._lazy:
+            entry = LocalTrackerEntry(master_tracker=self, location=key)
+            dict.__setitem__(self, key, entry)
+            for event in self._lazy.pop(key):
+                entry.journal_replay(event)
+        else:
+            self[key] = LocalTrackerEntry(master_tracker=self, location=key)
+            self.journal_event(key, "new")
+        return dict.__getitem__(self, key)
+
+    def _materialize_all(self):
+        """Create the entries that were loaded but not accessed yet."""
+        for key in list(self._lazy):
+            self.__missing__(key)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self._lazy
+
+    def __len__(self):
+        return dict.__len__(self) + len(self._lazy)
+
+    def __iter__(self):
+        self._materialize_all()
+        return super().__iter__()
+
+    def __delitem__(self, key):
+        self._lazy.pop(key, None)
+        super().__delitem__(key)
+        self._journal_pending = None
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        self._materialize_all()
+        return super().keys()
+
+    def values(self):
+        self._materialize_all()
+        return super().values()
+
+    def items(self):
+        self._materialize_all()
+        return super().items()
+
+    def pop(self, key, *kargs):
+        if key in self:
+            self.journal_event(key, "drop")
+            self._lazy.pop(key, None)
+            return super().pop(key, None)
+        return super().pop(key, *kargs)
+
+    def clear(self):
+        self._lazy.clear()
+        super().clear()
+        self._journal_pending = None
+
+    def journal_event(self, loc, op, **kwargs):
+        """Record a change (if the tracker is being saved in a journal).
+
+        :param str loc: The local container that changed
+        :param str op: The kind of change
+        """
+        if self._journal_pending is not None:
+            kwargs["loc"] = loc
+            kwargs["op"] = op
+            self._journal_pending.append(json.dumps(kwargs, sort_keys=True))
 
     def _hashable_uri(self, uri):
         """Produces a version of the URI that is hashable."""
@@ -1140,6 +1282,7 @@ class LocalTracker(defaultdict):
         if lpath is None:
             # Check for file deleted on the remote side
             if info["action"] == "del" and info["status"]:
+                self._materialize_all()
                 clean_uri = _fast_clean_uri(store, info["remote"])
                 huri = self._hashable_uri(clean_uri)
                 for atracker in list(self._uri_map["put"][huri]):
@@ -1180,26 +1323,127 @@ class LocalTracker(defaultdict):
         """
         return self._grep_stuff("uri", action, skeleton)
 
-    def json_dump(self, filename=_default_json_filename):
+    def _journal_header(self):
+        return json.dumps(
+            dict(
+                op="header",
+                format=self._journal_format,
+                version=self._journal_version,
+            ),
+            sort_keys=True,
+        )
+
+    def _journal_snapshot(self, filename):
+        """Write a full snapshot of the tracker in **filename**."""
+        tmpname = filename + ".tmp"
+        nlines = 1
+        try:
+            with open(tmpname, "w", encoding="utf-8") as fpout:
+                fpout.write(self._journal_header() + "\n")
+                for loc in sorted(self.keys()):
+                    fpout.write(
+                        json.dumps(
+                            dict(
+                                loc=loc,
+                                op="entry",
+                                data=self[loc].dump_as_dict(),
+                            ),
+                            sort_keys=True,
+                        )
+                        + "\n"
+                    )
+                    nlines += 1
+            os.replace(tmpname, filename)
+        except BaseException:
+            if os.path.exists(tmpname):
+                os.unlink(tmpname)
+            raise
+        return nlines
+
+    def _journal_sync(self, filename, nlines):
+        """Remember that the **filename** journal is up to date."""
+        st = os.stat(filename)
+        self._journal_file = filename
+        self._journal_stat = (st.st_dev, st.st_ino, st.st_size)
+        self._journal_lines = nlines
+        self._journal_pending = list()
+
+    def _journal_appendable(self, filename):
+        """Can the pending events be appended to **filename** ?"""
+        if (
+            self._journal_pending is None
+            or filename != self._journal_file
+            or self._journal_lines + len(self._journal_pending)
+            > max(1000, 4 * len(self))
+        ):
+            return False
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return False
+        # Someone else may have modified the file in the meantime
+        return (st.st_dev, st.st_ino, st.st_size) == self._journal_stat
+
+    def json_dump(self, filename=_default_json_filename, compact=False):
         """Dump the object to a JSON file.
 
+        If the previous dump was made in the same file, only the changes
+        that occurred in the meantime are appended to the file. Once in a
+        while (when the journal gets much longer than the number of tracked
+        containers), a full snapshot of the tracker is written instead.
+
         :param filename: Path to the JSON file.
+        :param compact: Always write a full snapshot of the tracker.
         """
-        outdict = {loc: entry.dump_as_dict() for loc, entry in self.items()}
-        with open(filename, "w", encoding="utf-8") as fpout:
-            json.dump(outdict, fpout, indent=2, sort_keys=True)
+        filename = os.path.abspath(filename)
+        if not compact and self._journal_appendable(filename):
+            if self._journal_pending:
+                with open(filename, "a", encoding="utf-8") as fpout:
+                    fpout.write("\n".join(self._journal_pending) + "\n")
+            self._journal_sync(
+                filename, self._journal_lines + len(self._journal_pending)
+            )
+        else:
+            self._journal_sync(filename, self._journal_snapshot(filename))
 
     def json_load(self, filename=_default_json_filename):
         """Restore the object using a JSON file.
 
+        Both the journal format (written by :meth:`json_dump`) and the
+        indented JSON format of previous versions are supported.
+
         :param filename: Path to the JSON file.
         """
+        filename = os.path.abspath(filename)
         with open(filename, encoding="utf-8") as fpin:
-            indict = json.load(fpin)
-        # Start from scratch
-        self.clear()
-        for loc, adict in indict.items():
-            self[loc].load_from_dict(adict)
+            header = fpin.readline()
+            try:
+                header = json.loads(header)
+            except ValueError:
+                header = None
+            if (
+                isinstance(header, dict)
+                and header.get("format") == self._journal_format
+            ):
+                # Start from scratch
+                self.clear()
+                nlines = 1
+                for line in fpin:
+                    nlines += 1
+                    event = json.loads(line)
+                    loc = event["loc"]
+                    if event["op"] == "drop":
+                        self._lazy.pop(loc, None)
+                    else:
+                        self._lazy.setdefault(loc, list()).append(event)
+                self._journal_sync(filename, nlines)
+            else:
+                fpin.seek(0)
+                indict = json.load(fpin)
+                # Start from scratch
+                self.clear()
+                for loc, adict in indict.items():
+                    self._lazy[loc] = [dict(loc=loc, op="entry", data=adict)]
 
     def append(self, othertracker):
         """Append the content of another LocalTracker object into this one."""
@@ -0,0 +1,231 @@
+"""
+Concurrent execution of get-like actions on a list of sections.
+
+The :class:`FetchEngine` class relies on a pool of threads in order to
+perform the ``get`` (or ``earlyget``, ``finaliseget``, ...) actions of
+several :class:`~vortex.layout.dataflow.Section` objects at once. It is
+driven by :func:`vortex.toolbox.add_section` (when ``batch=True`` and
+``fetchworkers`` is greater than 1) and by the
+:meth:`~vortex.layout.dataflow.Sequence.fetch` method.
+
+A few rules are enforced in order to preserve the semantic of the usual
+sequential processing:
+
+* Sections that target the same local container (typically a nominal
+  resource and its alternates) are processed sequentially, in the order
+  they were declared;
+* The number of concurrent actions on a given store (identified by its
+  scheme and netloc) is limited;
+* Results are reported in the order of the input list of sections.
+
+The default settings can be changed in the ``fetching`` section of the
+configuration file::
+
+    [fetching]
+    workers = 8
+    storelimit = 4
+    storelimits = {"vortex.archive.fr" = 2}
+"""
+
+import collections
+import concurrent.futures
+import functools
+import threading
+import time
+
+from bronx.fancies import loggers
+
+from vortex.config import get_from_config_w_default
+
+#: No automatic export.
+__all__ = []
+
+logger = loggers.getLogger(__name__)
+
+
+class FetchEngine:
+    """Perform get-like actions on several sections using a thread pool."""
+
+    def __init__(self, workers=None, storelimit=None, storelimits=None):
+        """
+        :param int workers: The maximum number of worker threads
+        :param int storelimit: The default maximum number of concurrent
+            actions for a given store
+        :param dict storelimits: Specific limits for some stores (the keys
+            are either a store's netloc or a ``scheme://netloc`` string)
+        """
+        self._workers = int(
+            workers or get_from_config_w_default("fetching", "workers", 8)
+        )
+        self._storelimit = int(
+            storelimit
+            or get_from_config_w_default("fetching", "storelimit", 4)
+        )
+        self._storelimits = dict(
+            get_from_config_w_default("fetching", "storelimits", dict())
+        )
+        if storelimits:
+            self._storelimits.update(storelimits)
+        self._semaphores = dict()
+        self._lock = threading.Lock()
+        self._abort_at = None
+        self._stats = collections.Counter()
+
+    @property
+    def workers(self):
+        """The maximum number of worker threads."""
+        return self._workers
+
+    @property
+    def stats(self):
+        """Some statistics on the latest :meth:`run`."""
+        return dict(self._stats)
+
+    def _store_limit(self, storekey):
+        """The maximum number of concurrent actions on **storekey**."""
+        scheme, netloc = storekey
+        for key in ("{:s}://{:s}".format(scheme, netloc), netloc):
+            if key in self._storelimits:
+                return max(1, int(self._storelimits[key]))
+        return max(1, self._storelimit)
+
+    def _store_semaphore(self, storekey):
+        """Return the semaphore associated with **storekey**."""
+        if storekey is None:
+            return None
+        with self._lock:
+            if storekey not in self._semaphores:
+                self._semaphores[storekey] = threading.BoundedSemaphore(
+                    self._store_limit(storekey)
+                )
+            return self._semaphores[storekey]
+
+    @staticmethod
+    def _section_storekey(section):
+        """Find out the (scheme, netloc) pair of the section's store."""
+        try:
+            store = section.rh.store
+        except Exception as e:
+            logger.debug("Unable to create the store (%s).", str(e))
+            store = None
+        if store is None:
+            return None
+        return (str(store.scheme), str(store.netloc))
+
+    @staticmethod
+    def _section_target(section):
+        """Find out the local container targeted by **section**."""
+        try:
+            target = section.rh.container.iotarget()
+        except Exception:
+            target = None
+        return target if isinstance(target, str) else id(section)
+
+    def _count(self, what):
+        with self._lock:
+            self._stats[what] += 1
+
+    def _abort_after(self, i):
+        """Sections located after the **i**-th one will not be processed."""
+        with self._lock:
+            if self._abort_at is None or i < self._abort_at:
+                self._abort_at = i
+
+    def _aborted(self, i):
+        """Should the processing of the **i**-th section be skipped ?"""
+        abort_at = self._abort_at
+        return abort_at is not None and i > abort_at
+
+    def _run_group(self, group, storekeys, callbacks, results):
+        """Process sequentially the sections listed (by index) in **group**."""
+        for i in group:
+            if self._aborted(i):
+                logger.debug("Section no %d skipped (abort).", i + 1)
+                self._count("skipped")
+                continue
+            semaphore = self._store_semaphore(storekeys[i])
+            if semaphore is not None:
+                semaphore.acquire()
+            try:
+                results[i] = callbacks[i]()
+                self._count("done")
+            except Exception as e:
+                results[i] = e
+                self._count("errors")
+                self._abort_after(i)
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+
+    def run(self, sections, callbacks, fatal=True):
+        """Launch **callbacks** concurrently.
+
+        :param list sections: The list of :class:`~vortex.layout.dataflow.Section`
+            objects that are processed
+        :param list callbacks: A list of callables (one for each section) that
+            take no arguments
+        :param bool fatal: If *True*, the first exception (in the order of
+            **sections**) raised by a callback is re-raised. Otherwise, the
+            exception object is returned in place of the result.
+        :return: The list of results (in the order of **sections**). *None* is
+            returned for callbacks that were not launched because an exception
+            occurred in a callback associated with a previous section (all the
+            callbacks associated with the sections that precede the failing one
+            are always launched, like in a sequential processing).
+        """
+        if len(sections) != len(callbacks):
+            raise ValueError("sections and callbacks must have the same size")
+        results = [None] * len(sections)
+        if not sections:
+            return results
+        self._abort_at = None
+        self._stats.clear()
+        groups = collections.OrderedDict()
+        for i, section in enumerate(sections):
+            groups.setdefault(self._section_target(section), list()).append(i)
+        # The store's identification is done once (in the calling thread)
+        storekeys = [self._section_storekey(section) for section in sections]
+        nworkers = max(1, min(self._workers, len(groups)))
+        logger.info(
+            "Processing %d sections (%d local targets) with %d threads.",
+            len(sections),
+            len(groups),
+            nworkers,
+        )
+        t0 = time.monotonic()
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=nworkers, thread_name_prefix="vortex-fetch"
+        ) as executor:
+            futures = [
+                executor.submit(
+                    self._run_group, group, storekeys, callbacks, results
+                )
+                for group in groups.values()
+            ]
+            concurrent.futures.wait(futures)
+        logger.info(
+            "Concurrent processing done in %.2f seconds (%s).",
+            time.monotonic() - t0,
+            ", ".join("{:s}={:d}".format(*kv) for kv in self._stats.items()),
+        )
+        if fatal:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    def run_action(self, sections, action, fatal=True, **kw):
+        """Call the **action** method on each of the **sections**.
+
+        :param list sections: The list of :class:`~vortex.layout.dataflow.Section`
+            objects that are processed
+        :param str action: The name of the method to call (e.g. ``get``)
+        :param bool fatal: see :meth:`run`
+
+        Any additional named argument is passed to the **action** method.
+        """
+        callbacks = [
+            functools.partial(getattr(section, action), **kw)
+            for section in sections
+        ]
+        return self.run(sections, callbacks, fatal=fatal)
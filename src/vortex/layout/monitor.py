@@ -17,7 +17,9 @@ from bronx.fancies import loggers
 from bronx.patterns import observer
 from bronx.stdtypes import date
 
+from vortex.config import get_from_config_w_default
 from vortex.tools.parallelism import ParallelSilencer, ParallelResultParser
+from vortex.util import inotify
 
 logger = loggers.getLogger(__name__)
 
@@ -184,6 +186,8 @@ class ManualInputMonitor(_StateFullMembersList):
         caching_freq=20,
         crawling_threshold=100,
         mute=False,
+        event_driven=None,
+        fallback_factor=None,
     ):
         """
         If the list of inputs is too long (see the *crawling_threshold*
@@ -202,6 +206,15 @@ class ManualInputMonitor(_StateFullMembersList):
             seconds
         :param int crawling_threshold: Maximum number of section statuses to
             update at once
+        :param bool event_driven: Watch the promise files using inotify (if
+            available). The periodic crawl is still performed but, once
+            inotify has actually reported an update of a promise file, its
+            frequency is divided by *fallback_factor*. The default is taken
+            from the ``inputmonitor`` section of the configuration
+            (``event_driven`` key, default ``True``).
+        :param float fallback_factor: Slow down the periodic crawl by this
+            factor when promise files are watched (configuration key
+            ``fallback_factor``, default 3)
 
         :warning: The state of the sections is looked up by a background process.
             Consequently the **stop** method must always be called when the
@@ -214,6 +227,16 @@ class ManualInputMonitor(_StateFullMembersList):
         self._caching_freq = caching_freq
         self._crawling_threshold = crawling_threshold
         self._mute = mute
+        self._event_driven = bool(
+            get_from_config_w_default("inputmonitor", "event_driven", True)
+            if event_driven is None
+            else event_driven
+        )
+        self._fallback_factor = float(
+            get_from_config_w_default("inputmonitor", "fallback_factor", 3)
+            if fallback_factor is None
+            else fallback_factor
+        )
         self._inactive_since = time.time()
         self._last_healthcheck = 0
 
@@ -317,6 +340,70 @@ class ManualInputMonitor(_StateFullMembersList):
             self._append_entry(res["state"], (res["key"], e))
             self._inactive_since = res["timestamp"]
 
+    def _new_watcher(self):
+        """Create the inotify watcher (if sensible)."""
+        if not (self._event_driven and inotify.inotify_available()):
+            return None
+        try:
+            return inotify.DirectoryWatcher()
+        except OSError as e:
+            logger.warning(
+                "Unable to create an inotify watcher (%s). Polling only.",
+                str(e),
+            )
+            return None
+
+    def _watch_expected(self, watcher, watched):
+        """Watch the promise files of the newly expected entries.
+
+        :param dict watched: The promise file of each watched entry (it is
+                             updated in place).
+        """
+        for k, e in self._members[EntrySt.expected].items():
+            if k in watched:
+                continue
+            try:
+                promise = e.section.rh.promise_location
+            except (OSError, ValueError):
+                promise = None
+            if (
+                promise
+                and self._ctx.system.path.isabs(promise)
+                and watcher.watch(self._ctx.system.path.dirname(promise))
+            ):
+                watched[k] = self._ctx.system.path.normpath(promise)
+            else:
+                # This entry will only be checked by the periodic crawl
+                watched[k] = None
+
+    def _check_expected(self, k, e, curtime):
+        """Check if the expected entry **e** became available or failed.
+
+        :return: A result dictionary (or *None* if nothing changed)
+        """
+        e.check_done()
+        # Is the promise file still there or not ?
+        if not e.section.rh.is_grabable():
+            return None
+        with _MonitorSilencer(self._ctx, "inputmonitor_updater") as psi:
+            if e.section.rh.is_grabable(check_exists=True):
+                logger.info(
+                    "The local resource %s becomes available",
+                    e.section.rh.container.localpath(),
+                )
+                # This will crash in case of an error, but this should
+                # not happen since we checked the resource just above
+                e.section.get(incache=True)
+                return psi.export_result(
+                    k, curtime, e.state, self._find_state(e)
+                )
+            else:
+                logger.warning(
+                    "The local resource %s has failed",
+                    e.section.rh.container.localpath(),
+                )
+                return psi.export_result(k, curtime, e.state, EntrySt.failed)
+
     def _background_updater(self):
         """This method loops on itself regularly to update the entry's state."""
 
@@ -324,145 +411,170 @@ class ManualInputMonitor(_StateFullMembersList):
         last_refresh = 0
         kangaroo_idx = 0
 
-        # Stop if we are asked to or if there is nothing more to do
-        while not self._mpquit.is_set() and not (
-            len(self._members[EntrySt.expected]) == 0
-            and len(self._members[EntrySt.ufo]) == 0
-        ):
-            # Tweak the caching_frequency
-            if (
-                len(self._members[EntrySt.ufo])
-                and len(self._members[EntrySt.expected])
-                <= self._crawling_threshold
-                and not len(self._members[EntrySt.available])
+        # Promise files are watched (if possible)
+        watcher = self._new_watcher()
+        watched = dict()
+        changed = set()
+        # Producers on other hosts (e.g. network filesystems) do not generate
+        # inotify events: do not slow down the crawl until some are seen
+        events_seen = False
+
+        try:
+            # Stop if we are asked to or if there is nothing more to do
+            while not self._mpquit.is_set() and not (
+                len(self._members[EntrySt.expected]) == 0
+                and len(self._members[EntrySt.ufo]) == 0
             ):
-                # If UFO are still there and not much resources are expected,
-                # decrease the caching time
-                eff_caching_freq = max(3, self._caching_freq / 5)
-            else:
-                eff_caching_freq = self._caching_freq
-
-            curtime = time.time()
-            # Crawl into the monitored input if sensible
-            if curtime > last_refresh + eff_caching_freq:
-                last_refresh = curtime
-                result_stack = list()
-
-                # Crawl into the ufo list
-                # Always process the first self._crawling_threshold elements
-                for k, e in islice(
-                    self._members[EntrySt.ufo].items(),
-                    self._crawling_threshold,
+                curtime = time.time()
+
+                # Check the entries whose promise file changed
+                if watcher is not None:
+                    self._watch_expected(watcher, watched)
+                    if changed is None:
+                        # Some events were lost: crawl as soon as possible
+                        last_refresh = 0
+                    elif changed:
+                        result_stack = list()
+                        for k, e in list(
+                            self._members[EntrySt.expected].items()
+                        ):
+                            if watched.get(k) in changed:
+                                res = self._check_expected(k, e, curtime)
+                                if res is not None:
+                                    self._mpqueue.put_nowait(res)
+                                    result_stack.append(res)
+                                    events_seen = True
+                        for r in result_stack:
+                            self._key_update(r)
+                            watched.pop(r["key"], None)
+
+                # Tweak the caching_frequency
+                if (
+                    len(self._members[EntrySt.ufo])
+                    and len(self._members[EntrySt.expected])
+                    <= self._crawling_threshold
+                    and not len(self._members[EntrySt.available])
                 ):
-                    if self._mpquit.is_set():  # Are we ordered to stop ?
-                        break
-                    with _MonitorSilencer(
-                        self._ctx, "inputmonitor_updater"
-                    ) as psi:
-                        logger.info(
-                            "First get on local file: %s",
-                            e.section.rh.container.localpath(),
-                        )
-                        e.section.get(
-                            incache=True, fatal=False
-                        )  # Do not crash at this stage
-                        res = psi.export_result(
-                            k, curtime, e.state, self._find_state(e)
-                        )
-                    self._mpqueue.put_nowait(res)
-                    result_stack.append(res)
-
-                # What are the expected elements we will look for ?
-                # 1. The first self._crawling_threshold elements
-                exp_compress = [
-                    1,
-                ] * min(
-                    self._crawling_threshold,
-                    len(self._members[EntrySt.expected]),
-                )
-                # 2. An additional set of self._crawling_threshold rotating elements
-                for i in range(
-                    max(
-                        0,
-                        len(self._members[EntrySt.expected])
-                        - self._crawling_threshold,
-                    )
+                    # If UFO are still there and not much resources are
+                    # expected, decrease the caching time
+                    eff_caching_freq = max(3, self._caching_freq / 5)
+                else:
+                    eff_caching_freq = self._caching_freq
+                if (
+                    events_seen
+                    and watcher is not None
+                    and not len(self._members[EntrySt.ufo])
                 ):
-                    kdiff = i - kangaroo_idx
-                    exp_compress.append(
-                        1
-                        if kdiff >= 0 and kdiff < self._crawling_threshold
-                        else 0
-                    )
+                    # The periodic crawl is only a fallback (e.g. for
+                    # changes made by other hosts on network filesystems)
+                    eff_caching_freq *= self._fallback_factor
+
+                # Crawl into the monitored input if sensible
+                if curtime > last_refresh + eff_caching_freq:
+                    last_refresh = curtime
+                    kangaroo_idx = self._crawl(curtime, kangaroo_idx)
+
+                # Wait for changes (and look carefully into the _mpquit event)
+                if watcher is not None:
+                    changed = watcher.wait(0.25)
+                else:
+                    time.sleep(0.25)
+        finally:
+            if watcher is not None:
+                watcher.close()
 
-                # Crawl into the chosen items of the expected list
-                (visited, found, kangaroo_incr) = (0, 0, 0)
-                for i, (k, e) in enumerate(
-                    compress(
-                        self._members[EntrySt.expected].items(), exp_compress
-                    )
-                ):
-                    if self._mpquit.is_set():  # Are we ordered to stop ?
-                        break
+    def _crawl(self, curtime, kangaroo_idx):
+        """Crawl into the monitored input.
 
-                    # Kangaroo check ?
-                    kangaroo = i >= self._crawling_threshold
-                    kangaroo_incr += int(kangaroo)
-                    if kangaroo and found > self._crawling_threshold / 2:
-                        # If a lot of resources were already found, avoid harassment
-                        break
+        :return: The updated kangaroo index
+        """
+        result_stack = list()
 
-                    logger.debug(
-                        "Checking local file: %s (kangaroo=%s)",
-                        e.section.rh.container.localpath(),
-                        kangaroo,
-                    )
-                    e.check_done()
-                    # Is the promise file still there or not ?
-                    if e.section.rh.is_grabable():
-                        visited += 1
-                        with _MonitorSilencer(
-                            self._ctx, "inputmonitor_updater"
-                        ) as psi:
-                            if e.section.rh.is_grabable(check_exists=True):
-                                logger.info(
-                                    "The local resource %s becomes available",
-                                    e.section.rh.container.localpath(),
-                                )
-                                # This will crash in case of an error, but this should
-                                # not happen since we checked the resource just above
-                                e.section.get(incache=True)
-                                found += 1
-                                res = psi.export_result(
-                                    k, curtime, e.state, self._find_state(e)
-                                )
-                            else:
-                                logger.warning(
-                                    "The local resource %s has failed",
-                                    e.section.rh.container.localpath(),
-                                )
-                                res = psi.export_result(
-                                    k, curtime, e.state, EntrySt.failed
-                                )
-                        self._mpqueue.put_nowait(res)
-                        result_stack.append(res)
-
-                # Update the kangaroo index
-                kangaroo_idx = kangaroo_idx + kangaroo_incr - visited
-                if (
-                    kangaroo_idx
-                    > len(self._members[EntrySt.expected])
-                    - self._crawling_threshold
-                    - 1
-                ):
-                    kangaroo_idx = 0
+        # Crawl into the ufo list
+        # Always process the first self._crawling_threshold elements
+        for k, e in islice(
+            self._members[EntrySt.ufo].items(),
+            self._crawling_threshold,
+        ):
+            if self._mpquit.is_set():  # Are we ordered to stop ?
+                break
+            with _MonitorSilencer(self._ctx, "inputmonitor_updater") as psi:
+                logger.info(
+                    "First get on local file: %s",
+                    e.section.rh.container.localpath(),
+                )
+                e.section.get(
+                    incache=True, fatal=False
+                )  # Do not crash at this stage
+                res = psi.export_result(
+                    k, curtime, e.state, self._find_state(e)
+                )
+            self._mpqueue.put_nowait(res)
+            result_stack.append(res)
+
+        # What are the expected elements we will look for ?
+        # 1. The first self._crawling_threshold elements
+        exp_compress = [
+            1,
+        ] * min(
+            self._crawling_threshold,
+            len(self._members[EntrySt.expected]),
+        )
+        # 2. An additional set of self._crawling_threshold rotating elements
+        for i in range(
+            max(
+                0,
+                len(self._members[EntrySt.expected])
+                - self._crawling_threshold,
+            )
+        ):
+            kdiff = i - kangaroo_idx
+            exp_compress.append(
+                1 if kdiff >= 0 and kdiff < self._crawling_threshold else 0
+            )
+
+        # Crawl into the chosen items of the expected list
+        (visited, found, kangaroo_incr) = (0, 0, 0)
+        for i, (k, e) in enumerate(
+            compress(self._members[EntrySt.expected].items(), exp_compress)
+        ):
+            if self._mpquit.is_set():  # Are we ordered to stop ?
+                break
 
-                # Effectively update the internal _members dictionary
-                for r in result_stack:
-                    self._key_update(r)
+            # Kangaroo check ?
+            kangaroo = i >= self._crawling_threshold
+            kangaroo_incr += int(kangaroo)
+            if kangaroo and found > self._crawling_threshold / 2:
+                # If a lot of resources were already found, avoid harassment
+                break
+
+            logger.debug(
+                "Checking local file: %s (kangaroo=%s)",
+                e.section.rh.container.localpath(),
+                kangaroo,
+            )
+            res = self._check_expected(k, e, curtime)
+            if res is not None:
+                visited += 1
+                found += int(res["state"] != EntrySt.failed)
+                self._mpqueue.put_nowait(res)
+                result_stack.append(res)
+
+        # Update the kangaroo index
+        kangaroo_idx = kangaroo_idx + kangaroo_incr - visited
+        if (
+            kangaroo_idx
+            > len(self._members[EntrySt.expected])
+            - self._crawling_threshold
+            - 1
+        ):
+            kangaroo_idx = 0
+
+        # Effectively update the internal _members dictionary
+        for r in result_stack:
+            self._key_update(r)
 
-            # Do frequent checks to look carefully into the _mpquit event
-            time.sleep(0.25)
+        return kangaroo_idx
 
     def _background_updater_job(self):
         """Start the updater and check for uncatched exceptions."""
@@ -602,6 +714,8 @@ class BasicInputMonitor(ManualInputMonitor):
         caching_freq=20,
         crawling_threshold=100,
         mute=False,
+        event_driven=None,
+        fallback_factor=None,
     ):
         """
         If the list of inputs is too long (see the *crawling_threshold*
@@ -622,6 +736,15 @@ class BasicInputMonitor(ManualInputMonitor):
             seconds
         :param int crawling_threshold: Maximum number of section statuses to
             update at once
+        :param bool event_driven: Watch the promise files using inotify (if
+            available). The periodic crawl is still performed but, once
+            inotify has actually reported an update of a promise file, its
+            frequency is divided by *fallback_factor*. The default is taken
+            from the ``inputmonitor`` section of the configuration
+            (``event_driven`` key, default ``True``).
+        :param float fallback_factor: Slow down the periodic crawl by this
+            factor when promise files are watched (configuration key
+            ``fallback_factor``, default 3)
 
         :warning: The state of the sections is looked up by a background process.
             Consequently the **stop** method must always be called when the
@@ -642,6 +765,8 @@ class BasicInputMonitor(ManualInputMonitor):
             caching_freq=caching_freq,
             crawling_threshold=crawling_threshold,
             mute=mute,
+            event_driven=event_driven,
+            fallback_factor=fallback_factor,
         )
 
 
@@ -0,0 +1,214 @@
+"""
+Defer the import of Vortex's extensions (lazy startup).
+
+By default, ``import vortex`` imports the :mod:`vortex.nwp` package (that
+defines hundreds of footprint classes) and every plugin registered with the
+``vtx`` entry point. Short jobs (or the ``vtx`` command) that do not need
+all of these classes pay for it anyway.
+
+When the lazy startup is activated, these imports are deferred until they
+are actually needed: when the first footprint resolution occurs (the
+``footprints.setup.callback`` hook calls :func:`load`), when the
+:func:`vortex.loaded_plugins` function is called or when the ``vortex.nwp``
+attribute is accessed. In the meantime, the footprint collectors that
+:mod:`vortex.nwp` contributes to are created from a prebuilt manifest (so
+that the ``footprints.proxy`` shortcuts are available right away). The
+manifest is versioned: if it does not match the current version of Vortex,
+the lazy startup is disabled.
+
+The lazy startup is activated with the ``VORTEX_LAZY_IMPORT`` environment
+variable or in the ``startup`` section of the configuration file::
+
+    [startup]
+    lazy_import = true
+
+The manifest must be rebuilt whenever footprint classes are added to (or
+removed from) :mod:`vortex.nwp` and for each new version of Vortex::
+
+    python -c 'import vortex.lazyload as l; l.write_manifest()'
+"""
+
+import importlib
+import importlib.resources
+import json
+import os
+import threading
+import time
+
+from bronx.fancies import loggers
+
+import footprints
+
+from vortex.config import get_from_config_w_default
+from vortex.tools.env import Environment
+
+#: No automatic export
+__all__ = []
+
+logger = loggers.getLogger(__name__)
+
+#: The format identifier of the manifest file
+MANIFEST_FORMAT = "vortex-footprints-manifest"
+
+#: The version of the manifest's format
+MANIFEST_VERSION = 1
+
+#: The name of the manifest file (in the :mod:`vortex.data` package)
+MANIFEST_FILE = "footprints-manifest.json"
+
+#: The packages described in the manifest
+MANIFEST_PACKAGES = ("vortex.nwp",)
+
+_DEFERRED = list()
+
+_DEFERRED_LOCK = threading.RLock()
+
+_LOADING = threading.local()
+
+
+def lazy_startup():
+    """Is the lazy startup activated (environment or configuration) ?"""
+    env = Environment.current()
+    if "VORTEX_LAZY_IMPORT" in env:
+        return env.true("VORTEX_LAZY_IMPORT")
+    return bool(get_from_config_w_default("startup", "lazy_import", False))
+
+
+def read_manifest(version):
+    """Return the manifest's content (or *None* if it is missing or outdated).
+
+    :param str version: The current version of Vortex
+    """
+    try:
+        with importlib.resources.open_text("vortex.data", MANIFEST_FILE) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError) as e:
+        logger.info("The footprints manifest can't be read: %s", str(e))
+        return None
+    if (
+        manifest.get("format") != MANIFEST_FORMAT
+        or manifest.get("version") != MANIFEST_VERSION
+        or manifest.get("vortex") != version
+    ):
+        logger.info(
+            "The footprints manifest does not match Vortex v-%s: ignored",
+            version,
+        )
+        return None
+    return manifest
+
+
+def _classnames(collector):
+    """The full names of the classes registered in **collector**."""
+    return [
+        cls.fullname()
+        for cls in list(collector.items())
+        + list(collector.abstract_classes.items())
+    ]
+
+
+def build_manifest():
+    """Import the :data:`MANIFEST_PACKAGES` and describe their classes."""
+    import vortex
+
+    for package in MANIFEST_PACKAGES:
+        importlib.import_module(package)
+    collectors = dict()
+    for tag, collector in footprints.collectors.items():
+        classes = [
+            clsname
+            for clsname in _classnames(collector)
+            if any(
+                clsname.startswith(package + ".")
+                for package in MANIFEST_PACKAGES
+            )
+        ]
+        if classes:
+            collectors[tag] = sorted(classes)
+    return dict(
+        format=MANIFEST_FORMAT,
+        version=MANIFEST_VERSION,
+        vortex=vortex.__version__,
+        collectors=collectors,
+    )
+
+
+def write_manifest(filename=None):
+    """Build the manifest and save it (in the :mod:`vortex.data` package).
+
+    :param str filename: The output file (instead of the package's one)
+    """
+    if filename is None:
+        import vortex.data
+
+        filename = os.path.join(
+            os.path.dirname(vortex.data.__file__), MANIFEST_FILE
+        )
+    with open(filename, "w", encoding="utf-8") as fhm:
+        json.dump(build_manifest(), fhm, indent=1, sort_keys=True)
+        fhm.write("\n")
+    return filename
+
+
+def defer(loader, version):
+    """Call **loader** when the first footprint resolution occurs.
+
+    The **loader** is called right away if no valid manifest is available.
+
+    :param loader: The function that imports the extensions
+    :param str version: The current version of Vortex
+    :return: *True* if **loader** is actually deferred
+    """
+    manifest = read_manifest(version)
+    if manifest is None:
+        loader()
+        return False
+    for tag in manifest["collectors"]:
+        footprints.collectors.get(tag=tag)
+    with _DEFERRED_LOCK:
+        _DEFERRED.append((loader, manifest))
+    return True
+
+
+def pending():
+    """Are there any deferred imports left ?"""
+    return bool(_DEFERRED)
+
+
+def _check_manifest(manifest):
+    """Warn if some classes listed in the **manifest** were not found."""
+    for tag, classes in manifest["collectors"].items():
+        missing = set(classes) - set(
+            _classnames(footprints.collectors.get(tag=tag))
+        )
+        if missing:
+            logger.warning(
+                "The footprints manifest is outdated (%s collector: %d "
+                + "missing classes). Rebuild it with %s.write_manifest()",
+                tag,
+                len(missing),
+                __name__,
+            )
+
+
+def load():
+    """Run the deferred imports (if any)."""
+    if not _DEFERRED or getattr(_LOADING, "active", False):
+        return
+    with _DEFERRED_LOCK:
+        _LOADING.active = True
+        try:
+            while _DEFERRED:
+                loader, manifest = _DEFERRED[0]
+                t0 = time.perf_counter()
+                try:
+                    loader()
+                finally:
+                    _DEFERRED.pop(0)
+                logger.info(
+                    "Deferred imports done in %.3f seconds",
+                    time.perf_counter() - t0,
+                )
+                _check_manifest(manifest)
+        finally:
+            _LOADING.active = False
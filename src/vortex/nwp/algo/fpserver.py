@@ -6,8 +6,8 @@ configuration).
 import collections
 import functools
 import math
+import os
 import re
-from itertools import filterfalse
 import time
 
 from bronx.compat.functools import cached_property
@@ -40,58 +40,139 @@ class FullPosServerFlyPollPersistantState:
         self.found = collections.defaultdict(list)
 
 
+#: A directory modified less than that many seconds ago is always listed again
+#: (the granularity of modification times may be coarse)
+_FLYPOLL_MTIME_GRACE = 2.0
+
+
+class FullPosServerFlyPoller:
+    """Stateful polling method for the Fullpos server's output files.
+
+    The state of each output directory is kept in memory: a directory is
+    only listed again (with :func:`os.scandir`) when its modification time
+    changes and the state is only saved (in the
+    :data:`fullpos_server_flypoll_pickle` file of each directory) when
+    :meth:`close` is called. The saved state is reloaded whenever another
+    process (e.g. the polling co-process) updates it.
+    """
+
+    def __init__(self, sh):
+        self.sh = sh
+        self._states = dict()
+        self._stamps = dict()
+        self._listed = dict()
+        self._candidates = collections.defaultdict(dict)
+        self._matchers = dict()
+
+    def _stamp(self, directory):
+        """The modification time of the saved state (or *None*)."""
+        try:
+            return os.stat(
+                os.path.join(directory, fullpos_server_flypoll_pickle)
+            ).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _state(self, directory):
+        """The state of **directory** (reloaded if it changed on disk)."""
+        stamp = self._stamp(directory)
+        if directory not in self._states or stamp != self._stamps[directory]:
+            if directory not in self._states:
+                self.sh.mkdir(directory)
+            if stamp is None:
+                self._states[directory] = FullPosServerFlyPollPersistantState()
+            else:
+                self._states[directory] = self.sh.pickle_load(
+                    os.path.join(directory, fullpos_server_flypoll_pickle)
+                )
+            self._stamps[directory] = stamp
+        return self._states[directory]
+
+    def _matcher(self, outputprefix):
+        """The compiled regex for the **outputprefix** output files."""
+        if outputprefix not in self._matchers:
+            self._matchers[outputprefix] = re.compile(
+                r"^{:s}\w*\+(\d+(?::\d\d)?)(?:\.\w+)?$".format(outputprefix)
+            )
+        return self._matchers[outputprefix]
+
+    def _scan(self, directory, outputprefix):
+        """The output files of **directory** (sorted by term)."""
+        key = (directory, outputprefix)
+        mtime = os.stat(directory).st_mtime
+        if self._listed.get(key) != mtime or (
+            time.time() - mtime <= _FLYPOLL_MTIME_GRACE
+        ):
+            self._listed[key] = mtime
+            pre = self._matcher(outputprefix)
+            candidates = self._candidates[key]
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name in candidates or entry.name.endswith(".d"):
+                        continue
+                    candidate = pre.match(entry.name)
+                    if candidate is not None:
+                        candidates[entry.name] = Time(candidate.group(1))
+        return self._candidates[key]
+
+    def __call__(
+        self, outputprefix, termfile, directories=(".",), **kwargs
+    ):  # @UnusedVariable
+        """Check sub-**directories** to determine wether new output files are available or not."""
+        new = list()
+        for directory in directories:
+            fpoll_st = self._state(directory)
+            termpath = os.path.join(directory, termfile)
+            if not os.path.exists(termpath):
+                continue
+            with open(termpath) as wfh:
+                rawcursor = wfh.readline().rstrip("\n")
+            try:
+                cursor = Time(rawcursor)
+            except TypeError:
+                logger.warning(
+                    'Unable to convert "%s" to a Time object', rawcursor
+                )
+                return new
+            previous = fpoll_st.cursor[outputprefix]
+            lnew = [
+                name
+                for name, ctime in self._scan(directory, outputprefix).items()
+                if previous < ctime <= cursor
+            ]
+            fpoll_st.cursor[outputprefix] = cursor
+            fpoll_st.found[outputprefix].extend(lnew)
+            new.extend(
+                [
+                    self.sh.path.normpath(self.sh.path.join(directory, anew))
+                    for anew in lnew
+                ]
+            )
+        return new
+
+    def close(self):
+        """Save the state of each of the polled directories."""
+        for directory, fpoll_st in self._states.items():
+            self.sh.pickle_dump(
+                fpoll_st,
+                os.path.join(directory, fullpos_server_flypoll_pickle),
+            )
+            self._stamps[directory] = self._stamp(directory)
+
+
 def fullpos_server_flypoll(
     sh, outputprefix, termfile, directories=(".",), **kwargs
 ):  # @UnusedVariable
-    """Check sub-**directories** to determine wether new output files are available or not."""
-    new = list()
-    for directory in directories:
-        with sh.cdcontext(directory, create=True):
-            if sh.path.exists(fullpos_server_flypoll_pickle):
-                fpoll_st = sh.pickle_load(fullpos_server_flypoll_pickle)
-            else:
-                fpoll_st = FullPosServerFlyPollPersistantState()
-            try:
-                if sh.path.exists(termfile):
-                    with open(termfile) as wfh:
-                        rawcursor = wfh.readline().rstrip("\n")
-                    try:
-                        cursor = Time(rawcursor)
-                    except TypeError:
-                        logger.warning(
-                            'Unable to convert "%s" to a Time object',
-                            rawcursor,
-                        )
-                        return new
-                    pre = re.compile(
-                        r"^{:s}\w*\+(\d+(?::\d\d)?)(?:\.\w+)?$".format(
-                            outputprefix
-                        )
-                    )
-                    candidates = [pre.match(f) for f in sh.listdir()]
-                    lnew = list()
-                    for candidate in filterfalse(
-                        lambda c: c is None, candidates
-                    ):
-                        if candidate.group(0).endswith(".d"):
-                            continue
-                        ctime = Time(candidate.group(1))
-                        if (
-                            ctime > fpoll_st.cursor[outputprefix]
-                            and ctime <= cursor
-                        ):
-                            lnew.append(candidate.group(0))
-                    fpoll_st.cursor[outputprefix] = cursor
-                    fpoll_st.found[outputprefix].extend(lnew)
-                    new.extend(
-                        [
-                            sh.path.normpath(sh.path.join(directory, anew))
-                            for anew in lnew
-                        ]
-                    )
-            finally:
-                sh.pickle_dump(fpoll_st, fullpos_server_flypoll_pickle)
-    return new
+    """Check sub-**directories** to determine wether new output files are available or not.
+
+    This is a one-shot version of :class:`FullPosServerFlyPoller` (the state
+    is read and saved on each call).
+    """
+    poller = FullPosServerFlyPoller(sh)
+    try:
+        return poller(outputprefix, termfile, directories=directories)
+    finally:
+        poller.close()
 
 
 class FullposServerDiscoveredInputs:
@@ -763,16 +844,10 @@ class FullPosServer(IFSParallel):
         if self.promises:
             seen = pollingcb(outputs_mapping)
             for afile in seen:
-                candidates = [
-                    x
-                    for x in self.promises
-                    if x.rh.container.abspath
-                    == self.system.path.abspath(afile)
-                ]
-                if candidates:
+                bingo = self.promise_lookup(afile)
+                if bingo is not None:
                     logger.info("The output data is promised <%s>", afile)
-                    bingo = candidates.pop()
-                    bingo.put(incache=True)
+                    self.flyput_promise(bingo)
 
     def prepare(self, rh, opts):
         """Various sanity checks + namelist tweaking."""
@@ -1054,7 +1129,7 @@ class FullPosServer(IFSParallel):
         for directory in set(self.outdirectories):
             sh.mkdir(directory)  # Create possible output directories
         if self.flypoll == "internal":
-            self.io_poll_method = functools.partial(fullpos_server_flypoll, sh)
+            self.io_poll_method = FullPosServerFlyPoller(sh)
             self.io_poll_kwargs["termfile"] = sh.path.basename(
                 self._MODELSIDE_TERMFILE
             )
@@ -1301,3 +1376,5 @@ class FullPosServer(IFSParallel):
         )
         self._init_poll_and_move(outputs_mapping)
         self._poll_and_move(outputs_mapping)
+        if self.flypoll == "internal":
+            self.io_poll_method.close()
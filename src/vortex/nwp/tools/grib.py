@@ -9,6 +9,11 @@ from bronx.fancies import loggers
 from vortex import sessions
 from vortex.algo.components import AlgoComponentError
 from vortex.layout.contexts import Context
+from vortex.tools.grib import (
+    GRIBIndexError,
+    copy_byte_ranges,
+    grib_message_index,
+)
 
 #: No automatic export
 __all__ = []
@@ -169,6 +174,80 @@ class GRIBFilter(_GenericFilter):
                 fmt="grib",
             )
 
+    def _fast_fid(self, msg):
+        """The fid of a raw GRIB message (formatted like epygram's fids)."""
+        return {"GRIB{:d}".format(msg.edition): msg.fid}
+
+    def _fast_filtering_ok(self, index):
+        """Can the filters be applied on the raw messages' keys ?
+
+        The filters must only rely on keys that are available for any of
+        the messages.
+        """
+        for msg in index:
+            fid_format = "GRIB{:d}".format(msg.edition)
+            for a_filter in self._filters:
+                if a_filter.get("fid_format") != fid_format:
+                    return False
+                for a_dict in a_filter.get(
+                    "fields_include", []
+                ) + a_filter.get("fields_exclude", []):
+                    if not all(
+                        [
+                            k.startswith("comment") or k in msg.fid
+                            for k in a_dict
+                        ]
+                    ):
+                        return False
+        return True
+
+    def _fast_filtering(self, gribparts, outfile_fmt):
+        """Filter the raw GRIB messages (without epygram).
+
+        :return: The list of output files (or *None* if some of the filters
+                 require a full decoding of the messages)
+        """
+        try:
+            indexes = [grib_message_index(a_part) for a_part in gribparts]
+        except (GRIBIndexError, OSError) as e:
+            logger.info("Unable to index the GRIB messages: %s", str(e))
+            return None
+        if not all([self._fast_filtering_ok(index) for index in indexes]):
+            return None
+        logger.info("Filtering the raw GRIB messages (no decoding).")
+
+        out_filelist = [
+            outfile_fmt.format(filtername=a_filter["filter_name"])
+            for a_filter in self._filters
+        ]
+        if self.concatenate:
+            out_filelist.append(
+                outfile_fmt.format(filtername=self.CONCATENATE_FILTER)
+            )
+        out_data = [open(f_name, "wb") for f_name in out_filelist]
+        try:
+            for a_part, index in zip(gribparts, indexes):
+                ranges = [list() for _ in out_data]
+                for msg in index:
+                    thefid = self._fast_fid(msg)
+                    for i, a_filter in enumerate(self._filters):
+                        if self._filter_process(thefid, a_filter):
+                            logger.debug(
+                                "Select succeed for filter %s: %s",
+                                a_filter["filter_name"],
+                                thefid,
+                            )
+                            ranges[i].append((msg.offset, msg.length))
+                    if self.concatenate:
+                        ranges[-1].append((msg.offset, msg.length))
+                with open(a_part, "rb") as a_in_data:
+                    for a_out_data, a_ranges in zip(out_data, ranges):
+                        copy_byte_ranges(a_in_data, a_out_data, a_ranges)
+        finally:
+            for a_out_data in out_data:
+                a_out_data.close()
+        return out_filelist
+
     def __call__(self, gribfile, outfile_fmt, intent="in"):
         """Apply the various filters on *gribfile*.
 
@@ -193,30 +272,35 @@ class GRIBFilter(_GenericFilter):
             else:
                 raise ValueError("Set concatenate=True or provide a filter.")
 
+        if self._xgrib_support and self._sh.is_xgrib(gribfile):
+            gribparts = [
+                self._sh.path.realpath(a_gribfile)
+                for a_gribfile in self._sh.xgrib_index_get(gribfile)
+            ]
+        else:
+            gribparts = [
+                self._sh.path.realpath(gribfile),
+            ]
+
+        # Try to filter the raw messages (no decoding at all)
+        out_filelist = self._fast_filtering(gribparts, outfile_fmt)
+        if out_filelist is not None:
+            return out_filelist
+
         # Open the input file using Epygram
         from ..util import usepygram
 
         if not usepygram.epygram_checker.is_available(version="1.0.0"):
             raise AlgoComponentError("Epygram (v1.0.0) needs to be available")
 
-        if self._xgrib_support and self._sh.is_xgrib(gribfile):
-            idx = self._sh.xgrib_index_get(gribfile)
-            in_data = [
-                footprints.proxy.dataformat(
-                    filename=self._sh.path.realpath(a_gribfile),
-                    openmode="r",
-                    format="GRIB",
-                )
-                for a_gribfile in idx
-            ]
-        else:
-            in_data = [
-                footprints.proxy.dataformat(
-                    filename=self._sh.path.realpath(gribfile),
-                    openmode="r",
-                    format="GRIB",
-                ),
-            ]
+        in_data = [
+            footprints.proxy.dataformat(
+                filename=a_gribfile,
+                openmode="r",
+                format="GRIB",
+            )
+            for a_gribfile in gribparts
+        ]
 
         # Open output files
         out_data = list()
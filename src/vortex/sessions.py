@@ -266,6 +266,8 @@ class Ticket(getbytag.GetByTag):
             )
         else:
             self._closed = date.now()
+            if hasattr(self._system, "ftp_session_pool_clear"):
+                self._system.ftp_session_pool_clear()
             logger.debug(
                 "Close session %s ( time = %s )", self.tag, self.duration()
             )
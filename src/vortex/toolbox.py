@@ -7,6 +7,7 @@ of the :mod:`vortex` toolbox.
 """
 
 from contextlib import contextmanager
+import functools
 import re
 import traceback
 
@@ -18,6 +19,8 @@ import footprints
 
 from vortex import sessions, data, proxy
 from vortex.layout.dataflow import stripargs_section, intent, ixo, Section
+from vortex.layout.fetching import FetchEngine
+from vortex.util.fpcache import resolution_cache
 
 #: Automatic export of superstar interface.
 __all__ = ["rload", "rget", "rput"]
@@ -59,6 +62,13 @@ active_metadatacheck = True
 active_incache = False
 #: Use the earlyget feature during :func:`input` calls
 active_batchinputs = True
+#: Number of threads used to fetch resources when **batch** is active
+#: (1 means that resources are fetched one after the other, see
+#: :class:`~vortex.layout.fetching.FetchEngine`)
+active_fetchworkers = 1
+#: Memoize the classes picked up by :func:`rload` (see
+#: :class:`~vortex.util.fpcache.FootprintResolutionCache`)
+active_resolvecache = True
 
 #: History recording
 history = History(tag="rload")
@@ -79,6 +89,9 @@ def show_toolbox_settings(ljust=24):
             "clear",
             "metadatacheck",
             "incache",
+            "batchinputs",
+            "fetchworkers",
+            "resolvecache",
         )
     ]:
         kval = globals().get(key, None)
@@ -139,11 +152,18 @@ def rload(*args, **kw):
     if rd:
         history.append(rd.copy())
     rhx = []
+    rcache = resolution_cache()
+    rcache.active = active_resolvecache
     for x in footprints.util.expand(rd):
-        picked_up = proxy.containers.pickup(  # @UndefinedVariable
-            *proxy.providers.pickup_and_cache(  # @UndefinedVariable
-                *proxy.resources.pickup_and_cache(x)  # @UndefinedVariable
-            )
+        picked_up, _ = rcache.pickup_and_cache(
+            proxy.containers,  # @UndefinedVariable
+            *rcache.pickup_and_cache(
+                proxy.providers,  # @UndefinedVariable
+                *rcache.pickup_and_cache(
+                    proxy.resources,  # @UndefinedVariable
+                    x,
+                ),
+            ),
         )
         logger.debug("Resource desc %s", picked_up)
         picked_rh = data.handlers.Handler(picked_up)
@@ -239,6 +259,11 @@ def add_section(section, args, kw):
           it might have been fetched during a previous step). (default: *False*).
         * **incache**: It *True*, archive stores will not be used at all (only cache
           stores will be used). (The default is given by :data:`active_incache`).
+        * **batch**: If *True*, the ``earlyget`` mechanism is used in order to
+          request all of the resources at once (input sections only).
+        * **fetchworkers**: When **batch** is *True*, the number of threads used to
+          actually fetch the resources concurrently. (The default is given by
+          :data:`active_fetchworkers`).
 
     2. **kw** is then looked for items relevant to the
        :class:`~vortex.layout.dataflow.Section` constructor (``role``, ``intent``,
@@ -260,18 +285,20 @@ def add_section(section, args, kw):
     complete = kw.pop("complete", False)
     insitu = kw.get("insitu", False)
     batch = kw.pop("batch", False)
+    fetchworkers = kw.pop("fetchworkers", active_fetchworkers)
     lastfatal = kw.pop("lastfatal", None)
 
     if complete:
         kw["fatal"] = False
 
     if batch:
-        if section not in ("input", "excutable"):
+        if section not in ("input", "executable"):
             logger.info(
                 "batch=True is not implemented for section=%s. overwriting to batch=Fase.",
                 section,
             )
             batch = False
+    concurrent = batch and fetchworkers is not None and fetchworkers > 1
 
     # Second, retrieve arguments that could be used by the now command
     cmdopts = dict(
@@ -375,8 +402,9 @@ def add_section(section, args, kw):
                                     doitmethod
                                 )
                             )
+                        # The early actions only register delayed requests
+                        # (that are not thread-safe): they stay sequential
                         for ir, newsection in enumerate(newsections):
-                            rhandler = newsection.rh
                             batchflags[ir] = getattr(
                                 newsection, "early" + doitmethod
                             )(**cmdopts)
@@ -416,6 +444,36 @@ def add_section(section, args, kw):
                                     "Finalising all of the delayed actions..."
                                 )
                             t.context.delayedactions_hub.finalise(*tofinalise)
+                    # Perform the actual actions concurrently (the results are
+                    # processed and displayed in the loop below)
+                    if concurrent:
+                        if talkative:
+                            t.sh.subtitle(
+                                "Concurrent {:s} for all resources.".format(
+                                    doitmethod
+                                )
+                            )
+                        fetcher = FetchEngine(workers=fetchworkers)
+                        fetchcbs = list()
+                        for ir, newsection in enumerate(newsections):
+                            if do_quick_insitu and quickget[ir]:
+                                fetchcbs.append(lambda: True)
+                            elif batchflags[ir]:
+                                fetchcbs.append(
+                                    getattr(
+                                        newsection, "finalise" + doitmethod
+                                    )
+                                )
+                            else:
+                                fetchcbs.append(
+                                    functools.partial(
+                                        getattr(newsection, doitmethod),
+                                        **cmdopts,
+                                    )
+                                )
+                        fetched = fetcher.run(
+                            newsections, fetchcbs, fatal=False
+                        )
                     secok = list()
                     for ir, newsection in enumerate(newsections):
                         rhandler = newsection.rh
@@ -439,9 +497,15 @@ def add_section(section, args, kw):
                         ok = do_quick_insitu and quickget[ir]
                         if batchflags[ir]:
                             actual_doitmethod = "finalise" + doitmethod
-                            ok = ok or getattr(newsection, actual_doitmethod)()
                         else:
                             actual_doitmethod = doitmethod
+                        if concurrent:
+                            if isinstance(fetched[ir], Exception):
+                                raise fetched[ir]
+                            ok = ok or fetched[ir]
+                        elif batchflags[ir]:
+                            ok = ok or getattr(newsection, actual_doitmethod)()
+                        else:
                             ok = ok or getattr(newsection, actual_doitmethod)(
                                 **cmdopts
                             )
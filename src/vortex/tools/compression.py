@@ -2,15 +2,39 @@
 Stream/File compression tools.
 
 The user interface for such tools is the :class:`CompressionPipeline`.
+
+Whenever possible, the data are compressed/uncompressed within the Python
+process using the :mod:`zlib`, :mod:`bz2`, :mod:`lzma` or ``zstandard``
+(if installed) packages. Otherwise, external commands (e.g. ``gzip``) are
+run through pipes. Large inputs may be compressed by several threads: the
+input data are split into blocks that are compressed independently (the
+result is a valid multi-member/multi-stream file that can be uncompressed
+by the usual tools).
+
+The default settings can be changed in the ``compression`` section of the
+configuration file::
+
+    [compression]
+    inprocess = true
+    threads = 2
+    threads_threshold = 67108864
+    blocksize = 16777216
 """
 
+import bz2
+import collections
+import concurrent.futures
 from contextlib import contextmanager
 import io
 import functools
+import lzma
 import operator
+import zlib
 
 import footprints
 from bronx.fancies import loggers
+
+from vortex.config import get_from_config_w_default
 from vortex.util.iosponge import IoSponge
 
 
@@ -19,6 +43,159 @@ __all__ = []
 
 logger = loggers.getLogger(__name__)
 
+try:
+    import zstandard
+
+    NO_ZSTANDARD = False
+except ImportError:
+    NO_ZSTANDARD = True
+
+#: Size of the chunks read from input streams (in-process compression)
+_CHUNKSIZE = 1024 * 1024
+
+
+class _CompressingReader(io.RawIOBase):
+    """A readable stream that returns the compressed data of a *source* stream.
+
+    If a :class:`concurrent.futures.Executor` object is provided, blocks of
+    data are compressed concurrently (see
+    :meth:`CompressionUnit.compress_block`).
+    """
+
+    def __init__(
+        self, unit, source, executor=None, blocksize=None, inflight=2
+    ):
+        """
+        :param CompressionUnit unit: The compression unit
+        :param source: The input stream
+        :param executor: Compress blocks of data concurrently
+        :param int blocksize: The size of the blocks
+        :param int inflight: The maximum number of blocks being compressed
+        """
+        super().__init__()
+        self._unit = unit
+        # If a text stream is provided, use the underlying binary stream
+        self._source = getattr(source, "buffer", source)
+        self._executor = executor
+        self._blocksize = blocksize
+        self._inflight = inflight
+        self._futures = collections.deque()
+        self._compressor = None if executor else unit.compressor()
+        self._inbuf = bytearray(_CHUNKSIZE)
+        self._inview = memoryview(self._inbuf)
+        self._pending = memoryview(b"")
+        self._source_eof = False
+        self._eof = False
+        self.consumed = 0
+        self.produced = 0
+
+    def readable(self):
+        return True
+
+    def _read_source(self):
+        """Read a chunk of data (in the internal buffer if possible)."""
+        if hasattr(self._source, "readinto"):
+            n = self._source.readinto(self._inbuf)
+            return self._inview[:n] if n else None
+        data = self._source.read(_CHUNKSIZE)
+        return data if data else None
+
+    def _fill(self):
+        """Compress some more data."""
+        if self._executor is None:
+            data = self._read_source()
+            if data is None:
+                out = self._compressor.flush()
+                self._eof = True
+            else:
+                self.consumed += len(data)
+                out = self._compressor.compress(data)
+        else:
+            while not self._source_eof and len(self._futures) < self._inflight:
+                block = self._source.read(self._blocksize)
+                if not block:
+                    self._source_eof = True
+                    break
+                self.consumed += len(block)
+                self._futures.append(
+                    self._executor.submit(self._unit.compress_block, block)
+                )
+            if self._futures:
+                out = self._futures.popleft().result()
+            else:
+                out = b""
+                self._eof = True
+        self.produced += len(out)
+        self._pending = memoryview(out)
+
+    def readinto(self, b):
+        while not len(self._pending) and not self._eof:
+            self._fill()
+        n = min(len(b), len(self._pending))
+        b[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    @property
+    def ratio(self):
+        """The compression ratio observed so far (*None* if unknown)."""
+        return self.produced / self.consumed if self.consumed else None
+
+    def close(self):
+        for future in self._futures:
+            future.cancel()
+        self._futures.clear()
+        super().close()
+
+
+class _DecompressingWriter(io.RawIOBase):
+    """A writable stream that uncompresses data and writes them to *target*."""
+
+    def __init__(self, unit, target):
+        super().__init__()
+        self._unit = unit
+        self._target = target
+        self._decompressor = unit.decompressor()
+        self._started = False
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        data = b
+        while len(data):
+            self._started = True
+            out = self._decompressor.decompress(data)
+            if out:
+                self._target.write(out)
+            if self._decompressor.eof:
+                # Multi-member/Multi-stream data: start over
+                data = self._decompressor.unused_data
+                self._decompressor = self._unit.decompressor()
+                self._started = False
+            else:
+                data = b""
+        return len(b)
+
+    def finish(self):
+        """Flush the remaining data and check that the input was complete.
+
+        :return: *False* if the compressed data were truncated.
+        """
+        ok = True
+        if self._started:
+            flush = getattr(self._decompressor, "flush", None)
+            if flush is not None:
+                out = flush()
+                if out:
+                    self._target.write(out)
+            if not self._decompressor.eof:
+                logger.error("Truncated %s compressed data.", self._unit.kind)
+                ok = False
+        if isinstance(self._target, _DecompressingWriter):
+            ok = self._target.finish() and ok
+        return ok
+
 
 class CompressionPipeline:
     """Main interface to data compression algorithms."""
@@ -39,6 +216,22 @@ class CompressionPipeline:
         """
         self._units = list()
         self._sh = system
+        self._inprocess = get_from_config_w_default(
+            "compression", "inprocess", True
+        )
+        self._threads = int(
+            get_from_config_w_default("compression", "threads", 2)
+        )
+        self._threads_threshold = int(
+            get_from_config_w_default(
+                "compression", "threads_threshold", 64 * 1024 * 1024
+            )
+        )
+        self._blocksize = int(
+            get_from_config_w_default(
+                "compression", "blocksize", 16 * 1024 * 1024
+            )
+        )
         self.description_string = compression
         for c in [c for c in compression.split("|") if c]:
             c_raw = c.split("&")
@@ -66,6 +259,13 @@ class CompressionPipeline:
         """The list of compression tools forming the compression pipeline."""
         return self._units
 
+    @property
+    def inprocess(self):
+        """Are the data (un)compressed within the Python process ?"""
+        return bool(self._inprocess) and all(
+            [u.inprocess_available for u in self.units]
+        )
+
     @property
     def _rawftp_shell(self):
         """The name of the corresponding rawftp specialshell (if relevant)."""
@@ -139,6 +339,14 @@ class CompressionPipeline:
         be properly closed
         """
         with self._openstream(local) as stream:
+            if self.inprocess:
+                with self._inprocess_compress2stream(stream) as lstream:
+                    yield (
+                        IoSponge(lstream, guessed_size=lstream.estimated_size)
+                        if iosponge
+                        else lstream
+                    )
+                return
             estimated_size = (
                 self._inputstream_size(stream) * self.compression_factor
             )
@@ -154,6 +362,51 @@ class CompressionPipeline:
                 yield lstream
             self._genericstream_close(processes)
 
+    @contextmanager
+    def _inprocess_compress2stream(self, stream):
+        """Compress *stream* within the Python process.
+
+        The returned stream has an ``estimated_size`` method that estimates
+        the size of the compressed data given the compression ratio observed
+        so far (or :attr:`compression_factor` if nothing was read yet).
+        """
+        input_size = self._inputstream_size(stream)
+        executor = None
+        if self._threads > 1 and input_size >= self._threads_threshold:
+            executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._threads,
+                thread_name_prefix="vortex-compress",
+            )
+        readers = list()
+        lstream = stream
+        try:
+            for i, unit in enumerate(self.units):
+                readers.append(
+                    _CompressingReader(
+                        unit,
+                        lstream,
+                        executor=executor if i == 0 else None,
+                        blocksize=self._blocksize,
+                        inflight=2 * self._threads,
+                    )
+                )
+                lstream = readers[-1]
+            bstream = io.BufferedReader(lstream, buffer_size=_CHUNKSIZE)
+
+            def estimated_size():
+                ratios = [r.ratio for r in readers]
+                if any([r is None for r in ratios]):
+                    return input_size * self.compression_factor
+                return input_size * functools.reduce(operator.mul, ratios, 1.0)
+
+            bstream.estimated_size = estimated_size
+            yield bstream
+        finally:
+            for reader in readers:
+                reader.close()
+            if executor is not None:
+                executor.shutdown(wait=True)
+
     def _xcopyfileobj(self, in_fh, out_fh):
         try:
             self._sh.copyfileobj(in_fh, out_fh)
@@ -197,6 +450,13 @@ class CompressionPipeline:
         will be properly closed.
         """
         with self._openstream(destination, "wb") as dstream:
+            if self.inprocess:
+                writer = dstream
+                for unit in self.units:
+                    writer = _DecompressingWriter(unit, writer)
+                yield writer
+                writer.finish()
+                return
             processes = list()
             instream = True
             nunits = len(self.units)
@@ -247,6 +507,32 @@ class CompressionUnit(footprints.FootprintBase):
         """The rawftp's speciall shell that may carry out a comparable compression."""
         return None
 
+    @property
+    def inprocess_available(self):
+        """Is it possible to (un)compress data within the Python process ?"""
+        return False
+
+    def compressor(self):
+        """Return an in-process compressor object.
+
+        It must provide the ``compress`` and ``flush`` methods (see
+        :class:`zlib.Compress`).
+        """
+        raise NotImplementedError()
+
+    def decompressor(self):
+        """Return an in-process decompressor object.
+
+        It must provide the ``decompress`` method and the ``eof`` and
+        ``unused_data`` attributes (see :class:`bz2.BZ2Decompressor`).
+        """
+        raise NotImplementedError()
+
+    def compress_block(self, data):
+        """Compress a block of data at once (within the Python process)."""
+        compressor = self.compressor()
+        return compressor.compress(data) + compressor.flush()
+
     def _run_in_pipe(self, sh, cmd, stream, outstream=True):
         """Run *cmd* with the piped input *stream*."""
         p = sh.popen(cmd, stdin=stream, stdout=outstream, bufsize=8192)
@@ -280,6 +566,19 @@ class GzipCompressionUnit(CompressionUnit):
         ),
     )
 
+    @property
+    def inprocess_available(self):
+        return True
+
+    def compressor(self):
+        # 16 + zlib.MAX_WBITS: write a gzip header and trailer
+        return zlib.compressobj(
+            self.complevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+
+    def decompressor(self):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
     def compress(self, sh, stream):
         """Compress the input *stream*. Returns a Popen object."""
         return self._run_in_pipe(
@@ -312,6 +611,16 @@ class Bzip2CompressionUnit(CompressionUnit):
         ),
     )
 
+    @property
+    def inprocess_available(self):
+        return True
+
+    def compressor(self):
+        return bz2.BZ2Compressor(self.complevel)
+
+    def decompressor(self):
+        return bz2.BZ2Decompressor()
+
     def compress(self, sh, stream):
         """Compress the input *stream*. Returns a Popen object."""
         return self._run_in_pipe(
@@ -323,3 +632,103 @@ class Bzip2CompressionUnit(CompressionUnit):
         return self._run_in_pipe(
             sh, ["bunzip2", "--stdout"], stream, outstream
         )
+
+
+class XzCompressionUnit(CompressionUnit):
+    _footprint = dict(
+        info="Compress/Uncompress a stream using xz",
+        attr=dict(
+            kind=dict(values=["xz", "lzma"]),
+            suffix=dict(
+                default="xz",
+            ),
+            complevel=dict(
+                info="The xz algorithm compression level (see 'man xz')",
+                type=int,
+                values=range(0, 10),
+                default=6,
+                optional=True,
+            ),
+            cfactor=dict(
+                default=0.8,
+            ),
+        ),
+    )
+
+    @property
+    def inprocess_available(self):
+        return True
+
+    def compressor(self):
+        return lzma.LZMACompressor(
+            format=lzma.FORMAT_XZ, preset=self.complevel
+        )
+
+    def decompressor(self):
+        return lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+
+    def compress(self, sh, stream):
+        """Compress the input *stream*. Returns a Popen object."""
+        return self._run_in_pipe(
+            sh, ["xz", "--stdout", "-{!s}".format(self.complevel)], stream
+        )
+
+    def uncompress(self, sh, stream, outstream=True):
+        """Uncompress the input *stream*. Returns a Popen object."""
+        return self._run_in_pipe(sh, ["unxz", "--stdout"], stream, outstream)
+
+
+class ZstdCompressionUnit(CompressionUnit):
+    """Zstandard compression.
+
+    The data are (un)compressed within the Python process if the
+    ``zstandard`` package is installed. Otherwise, the ``zstd`` command
+    is used.
+    """
+
+    _footprint = dict(
+        info="Compress/Uncompress a stream using zstd",
+        attr=dict(
+            kind=dict(values=["zstd", "zst"]),
+            suffix=dict(
+                default="zst",
+            ),
+            complevel=dict(
+                info="The zstd algorithm compression level (see 'man zstd')",
+                type=int,
+                values=range(1, 20),
+                default=3,
+                optional=True,
+            ),
+            cfactor=dict(
+                default=0.85,
+            ),
+        ),
+    )
+
+    @property
+    def inprocess_available(self):
+        return not NO_ZSTANDARD
+
+    def compressor(self):
+        return zstandard.ZstdCompressor(level=self.complevel).compressobj()
+
+    def decompressor(self):
+        return zstandard.ZstdDecompressor().decompressobj()
+
+    def compress_block(self, data):
+        return zstandard.ZstdCompressor(level=self.complevel).compress(data)
+
+    def compress(self, sh, stream):
+        """Compress the input *stream*. Returns a Popen object."""
+        return self._run_in_pipe(
+            sh,
+            ["zstd", "--stdout", "--quiet", "-{!s}".format(self.complevel)],
+            stream,
+        )
+
+    def uncompress(self, sh, stream, outstream=True):
+        """Uncompress the input *stream*. Returns a Popen object."""
+        return self._run_in_pipe(
+            sh, ["zstd", "-d", "--stdout", "--quiet"], stream, outstream
+        )
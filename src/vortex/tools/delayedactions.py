@@ -56,6 +56,7 @@ from collections import namedtuple, defaultdict
 import multiprocessing
 import os
 import tempfile
+import threading
 import time
 
 from bronx.fancies import loggers
@@ -596,6 +597,73 @@ class RawFtpDelayedGetHandler(AbstractFtpArchiveDelayedGetHandler):
         return rc
 
 
+class FtpDelayedGetHandler(AbstractFtpArchiveDelayedGetHandler):
+    """
+    Accumulate "GET" requests for several files and fetch them concurrently
+    using Vortex's FTP client (see :meth:`vortex.tools.systems.OSExtended.batchftget`).
+
+    :note: The *request* needs to be a two-elements tuple where the first element
+           is the path to the file that shoudl be fetched and the second element
+           the file format.
+    :note: The **result** returned by the :meth:`retrieve` method will be the
+           path to the temporary file where the resource has been fetched.
+    """
+
+    _footprint = dict(
+        info="Fetch multiple files using several FTP connections.",
+        attr=dict(
+            raw=dict(
+                values=[
+                    False,
+                ],
+            ),
+        ),
+    )
+
+    @property
+    def resultid_stamp(self):
+        bangfmt = (
+            "{0.logname:s}@{0.storage:s}" if self.logname else "{0.storage:s}"
+        )
+        return ("ftget_" + bangfmt).format(self)
+
+    def finalise(self, *r_ids):  # @UnusedVariable
+        """Given a **r_ids** list of delayed action IDs, wait upon actions completion."""
+        todo = defaultdict(list)
+        for k, v in self._resultsmap.items():
+            if v.status == d_action_status.void:
+                todo[v.request[1]].append(k)
+        rc = True
+        hostname, port = self._ftp_hostinfos
+        for a_fmt, a_todolist in todo.items():
+            logger.info(
+                "Running a batch FTP get for format=%s (%d files).",
+                str(a_fmt),
+                len(a_todolist),
+            )
+            try:
+                rc = self.system.batchftget(
+                    [self._resultsmap[k].request[0] for k in a_todolist],
+                    [self._resultsmap[k].result for k in a_todolist],
+                    hostname=hostname,
+                    logname=self.logname,
+                    port=port,
+                    fmt=a_fmt,
+                )
+            except OSError:
+                rc = [
+                    None,
+                ] * len(a_todolist)
+            for i, k in enumerate(a_todolist):
+                if rc[i] is True:
+                    self._resultsmap[k].mark_as_done()
+                elif rc[i] is False:
+                    self._resultsmap[k].mark_as_failed()
+                else:
+                    self._resultsmap[k].mark_as_unclear()
+        return rc
+
+
 class PrivateDelayedActionsHub:
     """
     Manages all of the delayed actions request by forwarding them to the appropriate
@@ -604,6 +672,10 @@ class PrivateDelayedActionsHub:
     If no, :class:`AbstractDelayedActionsHandler` class is able to handle
     the delayed action, just returns ``None`` to inform the caller that the
     requested action can't be performed
+
+    The hub (and the handlers it manages) may be used from several threads:
+    a lock serialises the registration, finalisation and retrieval of the
+    delayed actions.
     """
 
     def __init__(self, sh, contextrundir):
@@ -620,6 +692,7 @@ class PrivateDelayedActionsHub:
         self._delayedactionshandlers = set()
         self._obsboard = observer.SecludedObserverBoard()
         self._resultsmap = dict()
+        self._lock = threading.RLock()
 
     @property
     def observerboard(self):
@@ -668,6 +741,11 @@ class PrivateDelayedActionsHub:
         :param dict kwargs: Any argument that will be used to create the
                             :class:`AbstractDelayedActionsHandler` object
         """
+        with self._lock:
+            return self._register(request, **kwargs)
+
+    def _register(self, request, **kwargs):
+        """Actually register a new delayed action (the lock must be held)."""
         # Prestaging tool descriptions
         myhandler_desc = dict(
             system=self._sh,
@@ -715,36 +793,40 @@ class PrivateDelayedActionsHub:
     def dirty(self):
         """Is there any of the hub's delayed actions that needs finalising ?"""
         dirtyflag = False
-        for ahandler in self._delayedactionshandlers:
-            dirtyflag = dirtyflag or ahandler.dirty
+        with self._lock:
+            for ahandler in self._delayedactionshandlers:
+                dirtyflag = dirtyflag or ahandler.dirty
         return dirtyflag
 
     def finalise(self, *r_ids):
         """Given a **r_ids** list of delayed action IDs, wait upon actions completion."""
-        todo = defaultdict(set)
-        for r_id in r_ids:
-            todo[self._resultsmap[r_id]].add(r_id)
-        for ahandler, r_ids in todo.items():
-            ahandler.finalise(*list(r_ids))
+        with self._lock:
+            todo = defaultdict(set)
+            for r_id in r_ids:
+                todo[self._resultsmap[r_id]].add(r_id)
+            for ahandler, r_ids in todo.items():
+                ahandler.finalise(*list(r_ids))
 
     def retrieve(self, resultid, bareobject=False):
         """Given a **resultid** delayed action ID, returns the corresponding result."""
-        try:
-            res = self._resultsmap[resultid].retrieve(
-                resultid, bareobject=bareobject
-            )
-        finally:
-            del self._resultsmap[resultid]
+        with self._lock:
+            try:
+                res = self._resultsmap[resultid].retrieve(
+                    resultid, bareobject=bareobject
+                )
+            finally:
+                del self._resultsmap[resultid]
         return res
 
     def clear(self):
         """Destroy all of the associated handlers and reset everything."""
-        for a_handler in self._delayedactionshandlers:
-            a_handler.destroy()
-        self._delayedactionshandlers = set()
-        self._obsboard = observer.SecludedObserverBoard()
-        self._resultsmap = dict()
-        self._stagedir = None
+        with self._lock:
+            for a_handler in self._delayedactionshandlers:
+                a_handler.destroy()
+            self._delayedactionshandlers = set()
+            self._obsboard = observer.SecludedObserverBoard()
+            self._resultsmap = dict()
+            self._stagedir = None
 
     def __repr__(self):
         return "{:s} | n_delayedactionshandlers={:d}>".format(
@@ -0,0 +1,284 @@
+"""
+Compute and remember the hash sums (digests) of files.
+
+Verifying the hash sum of large files (e.g. model states) is expensive. This
+module provides two ways of avoiding unnecessary reads:
+
+* The :class:`DigestCache` class remembers the digests that were already
+  computed. A digest is indexed by the file's inode and is considered valid
+  as long as the file's size and modification time are unchanged. Since
+  cache gets usually create hardlinks, the digest of a file fetched from a
+  cache is computed only once (or even never if it was computed when the
+  file was put in the cache). There is one such object per session (see
+  the :func:`digest_cache` function).
+* Within a :func:`streaming_digests` context, the data transfers performed
+  by the current thread compute the digest of the data while they are
+  written (see :class:`StreamingDigest`). When the transfer is done, the
+  digest is recorded in the :class:`DigestCache` object. Currently, this
+  is supported by the FTP ``get`` method of
+  :class:`~vortex.tools.net.ExtendedFtplib`.
+
+Example::
+
+    >>> from vortex.tools import digests
+    >>> dcache = digests.digest_cache()
+
+    # The first call reads the file, the next ones do not (unless the file
+    # is modified)
+
+    >>> dcache.file2hash('my_input_file', 'md5')  # doctest: +SKIP
+    >>> dcache.file2hash('my_input_file', 'md5')  # doctest: +SKIP
+
+    # Compare with a reference hash sum (path to a file, File-like object or
+    # string)
+
+    >>> dcache.filecheck('my_input_file', 'md5',
+    ...                  'my_input_file.md5')  # doctest: +SKIP
+
+The default settings can be changed in the ``digests`` section of the
+configuration file::
+
+    [digests]
+    active = true
+    maxsize = 10000
+"""
+
+import collections
+import contextlib
+import hashlib
+import io
+import os
+import threading
+
+from bronx.fancies import loggers
+from bronx.patterns import getbytag
+from bronx.system import hash as hashutils
+
+from vortex import sessions
+from vortex.config import get_from_config_w_default
+
+#: No automatic export
+__all__ = []
+
+logger = loggers.getLogger(__name__)
+
+
+class DigestCache(getbytag.GetByTag):
+    """Remember the hash sums (digests) of files.
+
+    Entries are indexed by the file's device, inode and hash algorithm. An
+    entry is used only if the file's size and modification time did not
+    change since the digest was computed. At most ``maxsize`` entries are
+    kept (the least recently used entries are discarded).
+
+    Methods accept either paths or File-like objects. For File-like objects,
+    the digest is always computed (using
+    :class:`bronx.system.hash.HashAdapter`).
+    """
+
+    def __init__(self, active=None, maxsize=None):
+        """
+        :param bool active: Is the cache used at all ?
+        :param int maxsize: The maximum number of entries
+        """
+        self.active = bool(
+            get_from_config_w_default("digests", "active", True)
+            if active is None
+            else active
+        )
+        self.maxsize = int(
+            get_from_config_w_default("digests", "maxsize", 10000)
+            if maxsize is None
+            else maxsize
+        )
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._stats = collections.Counter()
+
+    @property
+    def stats(self):
+        """A dictionary with the number of hits, misses and records."""
+        with self._lock:
+            return dict(self._stats)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    @staticmethod
+    def _keys(st, algorithm):
+        return (
+            (st.st_dev, st.st_ino, algorithm),
+            (st.st_size, st.st_mtime_ns),
+        )
+
+    def lookup(self, path, algorithm):
+        """Return the **algorithm** digest of **path** if known (*None* otherwise)."""
+        if not self.active:
+            return None
+        try:
+            key, validity = self._keys(os.stat(path), algorithm)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == validity:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+            return None
+
+    def _record(self, st, algorithm, digest):
+        key, validity = self._keys(st, algorithm)
+        with self._lock:
+            self._entries[key] = (validity, digest)
+            self._entries.move_to_end(key)
+            self._stats["records"] += 1
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def record(self, path, algorithm, digest):
+        """Remember that **digest** is the **algorithm** digest of **path**."""
+        if not self.active:
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        self._record(st, algorithm, digest)
+
+    def invalidate(self, path):
+        """Forget about the digests of **path**."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            for key in [
+                k for k in self._entries if k[:2] == (st.st_dev, st.st_ino)
+            ]:
+                del self._entries[key]
+
+    def clear(self):
+        """Forget about everything."""
+        with self._lock:
+            self._entries.clear()
+
+    def file2hash(self, input_file, algorithm):
+        """Return the **algorithm** digest of **input_file**.
+
+        :param input_file: Path to a file or opened File-like object
+        """
+        hadapter = hashutils.HashAdapter(algorithm)
+        if not isinstance(input_file, str):
+            return hadapter.file2hash(input_file)
+        digest = self.lookup(input_file, algorithm)
+        if digest is None:
+            st = os.stat(input_file)
+            digest = hadapter.file2hash(input_file)
+            # Do not record anything if the file was modified in the meantime
+            if self.active and self._keys(
+                os.stat(input_file), algorithm
+            ) == self._keys(st, algorithm):
+                self._record(st, algorithm, digest)
+        return digest
+
+    def file2hash_fh(self, input_file, algorithm):
+        """Return a File-like object that contains the **algorithm** digest.
+
+        :param input_file: Path to a file or opened File-like object
+        """
+        return io.BytesIO(
+            self.file2hash(input_file, algorithm).encode(encoding="utf-8")
+        )
+
+    def filecheck(self, input_file, algorithm, reference):
+        """Check if **input_file** checks out with the hash given in **reference**.
+
+        :param input_file: Path to a file or opened File-like object
+        :param reference: Reference hash data (path to a file, opened
+            File-like object or string that contains the reference hash sum)
+        """
+        return _CachedHashAdapter(self, algorithm).filecheck(
+            input_file, reference
+        )
+
+
+class _CachedHashAdapter(hashutils.HashAdapter):
+    """A :class:`~bronx.system.hash.HashAdapter` backed by a DigestCache."""
+
+    def __init__(self, dcache, algorithm):
+        super().__init__(algorithm)
+        self._dcache = dcache
+
+    def file2hash(self, input_file):
+        return self._dcache.file2hash(input_file, self.algorithm)
+
+
+def digest_cache():
+    """Return the :class:`DigestCache` object of the current session."""
+    return DigestCache(tag=sessions.current().tag)
+
+
+class StreamingDigest:
+    """Compute the digest of the data that are written to a file."""
+
+    def __init__(self, algorithm):
+        """
+        :param str algorithm: The name of the hash algorithm
+        """
+        self.algorithm = algorithm
+        self._hash = hashlib.new(algorithm)
+
+    def update(self, data):
+        """Take into account the next block of data."""
+        self._hash.update(data)
+
+    def wrap(self, write):
+        """Wrap the **write** callback in order to hash the written data."""
+
+        def hashing_write(data):
+            self._hash.update(data)
+            return write(data)
+
+        return hashing_write
+
+    @property
+    def digest(self):
+        """The digest of the data seen so far."""
+        return self._hash.hexdigest()
+
+    def record(self, path):
+        """Record the digest of **path** (once it has been fully written)."""
+        digest_cache().record(path, self.algorithm, self.digest)
+
+
+_STREAMING = threading.local()
+
+
+@contextlib.contextmanager
+def streaming_digests(algorithm):
+    """Within this context, compute the digests of the transferred data.
+
+    It only applies to the current thread. If **algorithm** is *None*,
+    nothing is done.
+    """
+    previous = getattr(_STREAMING, "algorithm", None)
+    _STREAMING.algorithm = algorithm
+    try:
+        yield
+    finally:
+        _STREAMING.algorithm = previous
+
+
+def streaming_digest():
+    """Return a new :class:`StreamingDigest` object (if requested).
+
+    :return: *None* if the current thread is not within a
+             :func:`streaming_digests` context.
+    """
+    algorithm = getattr(_STREAMING, "algorithm", None)
+    if algorithm is None or not digest_cache().active:
+        return None
+    return StreamingDigest(algorithm)
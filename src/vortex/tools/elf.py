@@ -0,0 +1,434 @@
+"""
+Find out the shared libraries needed by an ELF binary (without spawning ldd).
+
+The :func:`elf_dynamic_info` function reads the dynamic section of an ELF
+file (``DT_NEEDED``, ``DT_RPATH`` and ``DT_RUNPATH`` entries). The
+:class:`LddResolver` class mimics the dynamic linker's search algorithm in
+order to find the path to each of the (direct or indirect) dependencies:
+
+    * The ``DT_RPATH`` of the loading object and of its loaders (unless
+      the loading object has a ``DT_RUNPATH``);
+    * The ``LD_LIBRARY_PATH`` environment variable;
+    * The ``DT_RUNPATH`` of the loading object;
+    * The directories listed in ``/etc/ld.so.conf`` (i.e. the directories
+      indexed in the ld.so cache);
+    * The system's default directories.
+
+Libraries whose ELF class or machine do not match the loading object are
+skipped (as the dynamic linker does).
+
+The results are remembered in a persistent cache (a JSON file). Entries are
+indexed by the binary's device, inode, size and modification time (and by
+the value of ``LD_LIBRARY_PATH``). The binary's path is only part of the
+key if the search depends on it (``$ORIGIN`` or relative paths). Results
+with unresolved libraries are never cached and the cache only keeps the
+most recent entries. The cache file location and size may be changed in
+the ``ldd`` section of the configuration file::
+
+    [ldd]
+    native = true
+    cachefile = "~/.vortex.d/ldd_cache.json"
+    cachesize = 256
+"""
+
+import collections
+import glob
+import json
+import os
+import struct
+import tempfile
+import threading
+
+from bronx.fancies import loggers
+
+from vortex.config import get_from_config_w_default
+
+#: No automatic export
+__all__ = []
+
+logger = loggers.getLogger(__name__)
+
+_PT_DYNAMIC = 2
+_PT_INTERP = 3
+_PT_LOAD = 1
+
+_DT_NULL = 0
+_DT_NEEDED = 1
+_DT_STRTAB = 5
+_DT_RPATH = 15
+_DT_RUNPATH = 29
+
+
+class ELFError(ValueError):
+    """The file is not a (dynamically linked) ELF file."""
+
+    pass
+
+
+#: The dynamic linking information of an ELF file
+ELFDynamicInfo = collections.namedtuple(
+    "ELFDynamicInfo",
+    ["elfclass", "machine", "interpreter", "needed", "rpath", "runpath"],
+)
+
+
+def elf_dynamic_info(path):
+    """Read the dynamic linking information of the **path** ELF file.
+
+    :raise ELFError: if **path** is not a dynamically linked ELF file
+    """
+    with open(path, "rb") as fhe:
+        ident = fhe.read(16)
+        if len(ident) < 16 or ident[:4] != b"\x7fELF":
+            raise ELFError("{:s} is not an ELF file".format(path))
+        elfclass = ident[4]
+        if elfclass not in (1, 2) or ident[5] not in (1, 2):
+            raise ELFError("{:s}: unsupported ELF class".format(path))
+        endian = "<" if ident[5] == 1 else ">"
+        if elfclass == 2:
+            ehdr = struct.Struct(endian + "HHIQQQIHHHHHH")
+            phdr = struct.Struct(endian + "IIQQQQQQ")
+            dyn = struct.Struct(endian + "qQ")
+        else:
+            ehdr = struct.Struct(endian + "HHIIIIIHHHHHH")
+            phdr = struct.Struct(endian + "IIIIIIII")
+            dyn = struct.Struct(endian + "iI")
+        (_, machine, _, _, phoff, _, _, _, phentsize, phnum, _, _, _) = (
+            ehdr.unpack(fhe.read(ehdr.size))
+        )
+        loads = list()
+        dynamic = None
+        interpreter = None
+        for i in range(phnum):
+            fhe.seek(phoff + i * phentsize)
+            raw = phdr.unpack(fhe.read(phdr.size))
+            if elfclass == 2:
+                p_type, _, p_offset, p_vaddr, _, p_filesz, _, _ = raw
+            else:
+                p_type, p_offset, p_vaddr, _, p_filesz, _, _, _ = raw
+            if p_type == _PT_LOAD:
+                loads.append((p_vaddr, p_offset, p_filesz))
+            elif p_type == _PT_DYNAMIC:
+                dynamic = (p_offset, p_filesz)
+            elif p_type == _PT_INTERP:
+                fhe.seek(p_offset)
+                interpreter = os.fsdecode(fhe.read(p_filesz).rstrip(b"\0"))
+        if dynamic is None:
+            raise ELFError("{:s} is not dynamically linked".format(path))
+
+        def vaddr2offset(vaddr):
+            for l_vaddr, l_offset, l_filesz in loads:
+                if l_vaddr <= vaddr < l_vaddr + l_filesz:
+                    return vaddr - l_vaddr + l_offset
+            raise ELFError("{:s}: inconsistent dynamic section".format(path))
+
+        fhe.seek(dynamic[0])
+        rawdyn = fhe.read(dynamic[1])
+        entries = list()
+        strtab = None
+        for i in range(len(rawdyn) // dyn.size):
+            tag, value = dyn.unpack_from(rawdyn, i * dyn.size)
+            if tag == _DT_NULL:
+                break
+            if tag == _DT_STRTAB:
+                strtab = vaddr2offset(value)
+            elif tag in (_DT_NEEDED, _DT_RPATH, _DT_RUNPATH):
+                entries.append((tag, value))
+        if strtab is None:
+            raise ELFError("{:s}: no string table".format(path))
+
+        def readstr(offset):
+            fhe.seek(strtab + offset)
+            chunks = list()
+            while True:
+                chunk = fhe.read(256)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                if b"\0" in chunk:
+                    break
+            return os.fsdecode(b"".join(chunks).split(b"\0", 1)[0])
+
+        values = collections.defaultdict(list)
+        for tag, value in entries:
+            values[tag].append(readstr(value))
+    return ELFDynamicInfo(
+        elfclass,
+        machine,
+        interpreter,
+        values[_DT_NEEDED],
+        ":".join(values[_DT_RPATH]),
+        ":".join(values[_DT_RUNPATH]),
+    )
+
+
+def _ldsoconf_dirs(conffile="/etc/ld.so.conf", seen=None):
+    """The directories listed in the ld.so configuration files."""
+    seen = set() if seen is None else seen
+    if conffile in seen:
+        return []
+    seen.add(conffile)
+    dirs = list()
+    try:
+        with open(conffile, encoding="utf-8", errors="ignore") as fhc:
+            lines = fhc.readlines()
+    except OSError:
+        return dirs
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        if line.startswith("include"):
+            pattern = line.split(None, 1)[-1]
+            if not os.path.isabs(pattern):
+                pattern = os.path.join(os.path.dirname(conffile), pattern)
+            for included in sorted(glob.glob(pattern)):
+                dirs.extend(_ldsoconf_dirs(included, seen))
+        elif not line.startswith("hwcap"):
+            dirs.append(line)
+    return dirs
+
+
+def _expand_dst(paths, origin, elfclass):
+    """Split a search path and expand the dynamic string tokens."""
+    expanded = list()
+    for path in paths.split(":") if paths else []:
+        if not path:
+            continue
+        for token, value in (
+            ("ORIGIN", origin),
+            ("LIB", "lib64" if elfclass == 2 else "lib"),
+            ("PLATFORM", os.uname().machine),
+        ):
+            path = path.replace("${" + token + "}", value)
+            path = path.replace("$" + token, value)
+        expanded.append(path)
+    return expanded
+
+
+class LddResolver:
+    """Find the shared libraries needed by ELF binaries (like ldd does)."""
+
+    _DEFAULT_DIRS = {
+        2: ["/lib64", "/usr/lib64", "/lib", "/usr/lib"],
+        1: ["/lib", "/usr/lib"],
+    }
+
+    def __init__(self, cachefile=None, maxsize=256):
+        """
+        :param str cachefile: Path to the persistent cache (*None* to disable
+                              the persistent cache)
+        :param int maxsize: The maximum number of entries in the cache (the
+                            oldest entries are discarded first)
+        """
+        self.cachefile = cachefile
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._cache = None
+        self._infos = dict()
+        self._sysdirs = None
+
+    @property
+    def sysdirs(self):
+        """The directories that are searched after the RUNPATH."""
+        if self._sysdirs is None:
+            self._sysdirs = _ldsoconf_dirs()
+        return self._sysdirs
+
+    def _load_cache(self):
+        if self._cache is None:
+            self._cache = dict()
+            if self.cachefile and os.path.exists(self.cachefile):
+                try:
+                    with open(self.cachefile, encoding="utf-8") as fhc:
+                        self._cache = json.load(fhc)
+                except (OSError, ValueError) as e:
+                    logger.warning(
+                        "Unable to read the ldd cache file %s: %s",
+                        self.cachefile,
+                        str(e),
+                    )
+        return self._cache
+
+    def _save_cache(self):
+        if not self.cachefile:
+            return
+        try:
+            cachedir = os.path.dirname(self.cachefile) or "."
+            os.makedirs(cachedir, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", dir=cachedir, delete=False, encoding="utf-8"
+            ) as fhc:
+                json.dump(self._cache, fhc)
+            os.replace(fhc.name, self.cachefile)
+        except OSError as e:
+            logger.warning(
+                "Unable to update the ldd cache file %s: %s",
+                self.cachefile,
+                str(e),
+            )
+
+    def _info(self, path):
+        """The (memoized) dynamic linking information of **path**."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        key = (path, st.st_dev, st.st_ino, st.st_mtime_ns)
+        info = self._infos.get(key)
+        if info is None:
+            try:
+                info = elf_dynamic_info(path)
+            except (ELFError, OSError, struct.error):
+                info = False
+            self._infos[key] = info
+        return info
+
+    def _compatible(self, path, requester):
+        """Is **path** an ELF shared library that **requester** may load ?"""
+        if not os.path.isfile(path):
+            return False
+        try:
+            with open(path, "rb") as fhe:
+                ident = fhe.read(20)
+        except OSError:
+            return False
+        if len(ident) < 20 or ident[:4] != b"\x7fELF":
+            return False
+        endian = "<" if ident[5] == 1 else ">"
+        machine = struct.unpack(endian + "H", ident[18:20])[0]
+        return ident[4] == requester.elfclass and machine == requester.machine
+
+    def _search(self, name, info, origin, rpaths, ld_library_path):
+        """Find the **name** library requested by an object."""
+        if "/" in name:
+            return name if os.path.exists(name) else None
+        dirs = list()
+        if not info.runpath:
+            dirs.extend(rpaths)
+        dirs.extend(_expand_dst(ld_library_path, origin, info.elfclass))
+        dirs.extend(_expand_dst(info.runpath, origin, info.elfclass))
+        dirs.extend(self.sysdirs)
+        dirs.extend(self._DEFAULT_DIRS[info.elfclass])
+        for a_dir in dirs:
+            candidate = os.path.join(a_dir, name)
+            if self._compatible(candidate, info):
+                return candidate
+        return None
+
+    def _resolve(self, filename, ld_library_path):
+        """Walk through the dependencies tree (breadth first)."""
+        info = self._info(filename)
+        if not info:
+            return None
+        interpreter = os.path.basename(info.interpreter or "")
+        libs = dict()
+        # Each item: (path, info, the RPATHs of the loaders)
+        todo = collections.deque([(filename, info, [])])
+        while todo:
+            path, info, loader_rpaths = todo.popleft()
+            origin = os.path.dirname(os.path.abspath(path))
+            rpaths = (
+                _expand_dst(info.rpath, origin, info.elfclass) + loader_rpaths
+            )
+            for name in info.needed:
+                if name in libs or name == interpreter:
+                    continue
+                if name.startswith("ld-linux") or name.startswith("ld64.so"):
+                    continue
+                libpath = self._search(
+                    name, info, origin, rpaths, ld_library_path
+                )
+                libs[name] = libpath
+                if libpath is not None:
+                    libinfo = self._info(libpath)
+                    if libinfo:
+                        todo.append((libpath, libinfo, rpaths))
+        return libs
+
+    @staticmethod
+    def _location_dependent(info, ld_library_path):
+        """Does the search depend on the binary's location (or on the cwd) ?"""
+        for paths in (info.rpath, info.runpath, ld_library_path):
+            for path in paths.split(":") if paths else []:
+                if "$ORIGIN" in path or "${ORIGIN}" in path:
+                    return True
+                if path and not path.startswith("/"):
+                    return True
+        return False
+
+    def _key(self, filename, ld_library_path):
+        st = os.stat(filename)
+        info = self._info(filename)
+        location = (
+            os.path.realpath(filename)
+            if info and self._location_dependent(info, ld_library_path)
+            else ""
+        )
+        return json.dumps(
+            [
+                location,
+                st.st_dev,
+                st.st_ino,
+                st.st_size,
+                st.st_mtime_ns,
+                ld_library_path or "",
+            ]
+        )
+
+    def ldd(self, filename, ld_library_path=None):
+        """Return the mapping between library names and their physical paths.
+
+        Results with unresolved libraries are not cached (the missing
+        libraries may be installed later on).
+
+        :param str filename: Path to the ELF binary
+        :param str ld_library_path: The value of LD_LIBRARY_PATH
+        :return: *None* if **filename** is not a dynamically linked ELF file
+        """
+        key = self._key(filename, ld_library_path)
+        with self._lock:
+            cache = self._load_cache()
+            libs = cache.get(key)
+            if libs is not None and all(
+                [p is not None and os.path.exists(p) for p in libs.values()]
+            ):
+                return dict(libs)
+            libs = self._resolve(filename, ld_library_path)
+            if libs is not None and all(
+                [p is not None for p in libs.values()]
+            ):
+                cache.pop(key, None)
+                cache[key] = libs
+                # Forget about the oldest entries
+                for oldkey in list(cache)[: max(0, len(cache) - self.maxsize)]:
+                    del cache[oldkey]
+                self._save_cache()
+            return None if libs is None else dict(libs)
+
+
+_RESOLVER = None
+_RESOLVER_LOCK = threading.Lock()
+
+
+def ldd_resolver():
+    """Return the process-wide :class:`LddResolver` object.
+
+    :return: *None* if the native resolution is deactivated.
+    """
+    global _RESOLVER
+    with _RESOLVER_LOCK:
+        if _RESOLVER is None:
+            if get_from_config_w_default("ldd", "native", True):
+                cachefile = get_from_config_w_default(
+                    "ldd", "cachefile", "~/.vortex.d/ldd_cache.json"
+                )
+                _RESOLVER = LddResolver(
+                    os.path.expanduser(cachefile) if cachefile else None,
+                    maxsize=int(
+                        get_from_config_w_default("ldd", "cachesize", 256)
+                    ),
+                )
+            else:
+                _RESOLVER = False
+        return _RESOLVER or None
@@ -32,6 +32,174 @@ def current():
     return Environment.current()
 
 
+class _DeletedVariable:
+    """Marks a variable that was deleted (in a layer of variables)."""
+
+    def __repr__(self):
+        return "<deleted>"
+
+    def __reduce__(self):
+        return "_DELETED"
+
+
+_DELETED = _DeletedVariable()
+
+_MISSING = object()
+
+
+class _FrozenLayer:
+    """A set of variables that will never be modified.
+
+    A layer only holds the variables that changed with respect to its
+    parent layer (deleted variables are associated with ``_DELETED``).
+    Layers are shared by several :class:`_EnvPool` objects.
+    """
+
+    __slots__ = ("data", "parent", "depth", "_flat")
+
+    def __init__(self, data, parent=None):
+        self.data = data
+        self.parent = parent
+        self.depth = 1 if parent is None else parent.depth + 1
+        self._flat = None
+
+    def lookup(self, varname):
+        """The value of **varname** (``_MISSING`` if it is not defined)."""
+        layer = self
+        while layer is not None:
+            value = layer.data.get(varname, _MISSING)
+            if value is not _MISSING:
+                return _MISSING if value is _DELETED else value
+            layer = layer.parent
+        return _MISSING
+
+    def flat(self):
+        """A dictionary of the variables (it must not be modified)."""
+        if self._flat is None:
+            layers = list()
+            layer = self
+            while layer is not None:
+                if layer._flat is not None:
+                    layers.append(layer._flat)
+                    break
+                layers.append(layer.data)
+                layer = layer.parent
+            flat = dict()
+            for data in reversed(layers):
+                for k, v in data.items():
+                    if v is _DELETED:
+                        flat.pop(k, None)
+                    else:
+                        flat[k] = v
+            self._flat = flat
+        return self._flat
+
+
+class _EnvPool(collections.abc.MutableMapping):
+    """The pool of variables of an :class:`Environment` object.
+
+    Cloning a pool (see :meth:`fork`) does not copy anything: the variables
+    defined so far are frozen in a :class:`_FrozenLayer` object that is
+    shared by the original pool and the new one. Then, each of the pools
+    only records its own changes (copy-on-write). When too many layers
+    are stacked up, they are merged.
+    """
+
+    __slots__ = ("_own", "_top", "_flat")
+
+    #: The maximum number of stacked layers
+    _MAXDEPTH = 8
+
+    def __init__(self, initial=None, top=None):
+        self._own = dict() if initial is None else dict(initial)
+        self._top = top
+        self._flat = None
+
+    def lookup(self, varname):
+        """The value of **varname** (``_MISSING`` if it is not defined)."""
+        value = self._own.get(varname, _MISSING)
+        if value is _MISSING:
+            return _MISSING if self._top is None else self._top.lookup(varname)
+        return _MISSING if value is _DELETED else value
+
+    def __getitem__(self, varname):
+        value = self.lookup(varname)
+        if value is _MISSING:
+            raise KeyError(varname)
+        return value
+
+    def __setitem__(self, varname, value):
+        self._own[varname] = value
+        self._flat = None
+
+    def __delitem__(self, varname):
+        if self.lookup(varname) is _MISSING:
+            raise KeyError(varname)
+        if self._top is not None and self._top.lookup(varname) is not _MISSING:
+            self._own[varname] = _DELETED
+        else:
+            del self._own[varname]
+        self._flat = None
+
+    def __contains__(self, varname):
+        return self.lookup(varname) is not _MISSING
+
+    def get(self, varname, default=None):
+        value = self.lookup(varname)
+        return default if value is _MISSING else value
+
+    def flat(self):
+        """A dictionary of the variables (it must not be modified)."""
+        if self._flat is None:
+            if self._top is None:
+                self._flat = self._own
+            elif not self._own:
+                self._flat = self._top.flat()
+            else:
+                flat = dict(self._top.flat())
+                for k, v in self._own.items():
+                    if v is _DELETED:
+                        flat.pop(k, None)
+                    else:
+                        flat[k] = v
+                self._flat = flat
+        return self._flat
+
+    def __len__(self):
+        return len(self.flat())
+
+    def __iter__(self):
+        return iter(list(self.flat()))
+
+    def keys(self):
+        return self.flat().keys()
+
+    def values(self):
+        return self.flat().values()
+
+    def items(self):
+        return self.flat().items()
+
+    def clear(self):
+        self._own = dict()
+        self._top = None
+        self._flat = None
+
+    def fork(self):
+        """Return a new pool with the same variables."""
+        if self._own:
+            if self._top is not None and self._top.depth >= self._MAXDEPTH:
+                self._top = _FrozenLayer(dict(self.flat()))
+            else:
+                self._top = _FrozenLayer(self._own, self._top)
+            self._own = dict()
+            self._flat = None
+        return self.__class__(top=self._top)
+
+    def __repr__(self):
+        return "{:s}({!r})".format(self.__class__.__name__, dict(self.flat()))
+
+
 class Environment:
     """
     Advanced handling of environment features. Either for binding to the system
@@ -82,7 +250,7 @@ class Environment:
         self.__dict__["_history"] = PrivateHistory() if history else None
         self.__dict__["_verbose"] = verbose
         self.__dict__["_frozen"] = collections.deque()
-        self.__dict__["_pool"] = dict()
+        self.__dict__["_pool"] = _EnvPool()
         self.__dict__["_mods"] = set()
         self.__dict__["_sh"] = None
         self.__dict__["_os"] = list()
@@ -102,14 +270,15 @@ class Environment:
                         self._current_active, contextlock
                     )
                 else:
-                    self._pool.update(os.environ)
+                    self.__dict__["_pool"] = _EnvPool(os.environ)
         self.__dict__["_noexport"] = [x.upper() for x in noexport]
         self.active(active)
 
     def _env_clone_internals(self, env, contextlock):
         self.__dict__["_os"] = env.osstack()
         self.__dict__["_os"].append(env)
-        self._pool.update(env.items())
+        # Copy-on-write: nothing is actually copied
+        self.__dict__["_pool"] = env._pool.fork()
         if contextlock is not None:
             self.__dict__["_contextlock"] = contextlock
         else:
@@ -200,12 +369,10 @@ class Environment:
         Also used as internal for attribute access or dictionary access.
         """
         varname = str(varname)
-        if varname in self._pool:
-            return self._pool[varname]
-        elif varname.upper() in self._pool:
-            return self._pool[varname.upper()]
-        else:
-            return None
+        value = self._pool.lookup(varname)
+        if value is _MISSING:
+            value = self._pool.lookup(varname.upper())
+        return None if value is _MISSING else value
 
     def __getitem__(self, varname):
         return self.getvar(varname)
@@ -275,6 +442,22 @@ class Environment:
         """Returns the reference of the internal pool of variables."""
         return self._pool
 
+    def osexport(self):
+        """Returns the variables as they would be exported in the system environment.
+
+        The result is a dictionary of strings that must not be modified.
+        """
+        flat = self._pool.flat()
+        if not self._noexport and all(
+            [isinstance(v, str) for v in flat.values()]
+        ):
+            return flat
+        return {
+            k: (v if isinstance(v, str) else json.dumps(v, cls=ShellEncoder))
+            for k, v in flat.items()
+            if k not in self._noexport
+        }
+
     def get(self, *args):
         """Proxy to the dictionary ``get`` mechanism on the internal pool of variables."""
         return self._pool.get(str(args[0]).upper(), *args[1:])
@@ -416,11 +599,13 @@ class Environment:
             self.__class__._current_active = self
             osrewind = self.__class__._current_active
         if osrewind:
-            os.environ.clear()
-            for k in filter(
-                lambda x: x not in osrewind._noexport, osrewind._pool.keys()
-            ):
-                os.environ[k] = osrewind.native(k)
+            # Only update the variables that actually change
+            exported = osrewind.osexport()
+            for k in [k for k in os.environ if k not in exported]:
+                del os.environ[k]
+            for k, v in exported.items():
+                if os.environ.get(k) != v:
+                    os.environ[k] = v
         return active
 
     def naked(self):
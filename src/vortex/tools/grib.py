@@ -8,8 +8,17 @@ It provides shell addons to deal with:
 
 It also provdes an AlgoComponent's Mixin to properly setup the environment
 when using the grib_api or ecCodes libraries.
+
+The :func:`grib_message_index` function scans GRIB files (without decoding
+any data) and returns the position of each message together with a few
+identifying keys (see :class:`GRIBMessageInfo`). The :func:`copy_byte_ranges`
+function copies parts of a file using the ``copy_file_range`` or
+``sendfile`` system calls (whenever possible).
 """
 
+import collections
+import mmap
+import os
 from pathlib import Path
 from urllib import parse as urlparse
 
@@ -32,6 +41,184 @@ __all__ = []
 logger = loggers.getLogger(__name__)
 
 
+class GRIBIndexError(ValueError):
+    """The GRIB file can't be indexed (corrupted or unsupported message)."""
+
+    pass
+
+
+#: The position and identifying keys of a GRIB message (the ``fid`` keys are
+#: named after the ecCodes keys and hold the same integer values; the
+#: ``centre`` is the originating centre's code)
+GRIBMessageInfo = collections.namedtuple(
+    "GRIBMessageInfo", ["offset", "length", "edition", "centre", "fid"]
+)
+
+#: GRIB1 level types that describe a layer (the level is not a single value)
+_GRIB1_LAYERS = frozenset(
+    (101, 104, 106, 108, 110, 112, 114, 116, 120, 121, 128, 141)
+)
+
+#: GRIB2 product definition templates that start as template 4.0 does
+_GRIB2_HLEVEL_TEMPLATES = frozenset((0, 1, 2, 8, 11, 12))
+
+
+def _uint(buf, offset, size):
+    return int.from_bytes(buf[offset : offset + size], "big")
+
+
+def _grib2_signed(buf, offset, size):
+    """Decode a GRIB2 signed integer (the sign is the leftmost bit).
+
+    :return: *None* if the value is missing (all bits set to 1)
+    """
+    value = _uint(buf, offset, size)
+    if value == (1 << (8 * size)) - 1:
+        return None
+    sign = 1 << (8 * size - 1)
+    return -(value & (sign - 1)) if value & sign else value
+
+
+def _grib1_message(buf, offset):
+    """Decode the GRIB1 message's length and identifying keys."""
+    length = _uint(buf, offset + 4, 3)
+    if length & 0x800000:
+        raise GRIBIndexError("Large GRIB1 messages are not supported")
+    sec1 = offset + 8
+    fid = dict(
+        editionNumber=1,
+        table2Version=buf[sec1 + 3],
+        generatingProcessIdentifier=buf[sec1 + 5],
+        indicatorOfParameter=buf[sec1 + 8],
+        indicatorOfTypeOfLevel=buf[sec1 + 9],
+    )
+    if fid["indicatorOfTypeOfLevel"] in _GRIB1_LAYERS:
+        fid["topLevel"] = buf[sec1 + 10]
+        fid["bottomLevel"] = buf[sec1 + 11]
+    else:
+        fid["level"] = _uint(buf, sec1 + 10, 2)
+    return length, buf[sec1 + 4], fid
+
+
+def _grib2_message(buf, offset):
+    """Decode the GRIB2 message's length and identifying keys."""
+    length = _uint(buf, offset + 8, 8)
+    fid = dict(editionNumber=2, discipline=buf[offset + 6])
+    end = offset + length - 4
+    sec = offset + 16
+    nfields = 0
+    centre = None
+    while sec < end:
+        seclen = _uint(buf, sec, 4)
+        secnum = buf[sec + 4]
+        if seclen < 5 or sec + seclen > end:
+            raise GRIBIndexError("Corrupted GRIB2 section")
+        if secnum == 1:
+            centre = _uint(buf, sec + 5, 2)
+        elif secnum == 4:
+            nfields += 1
+            template = _uint(buf, sec + 7, 2)
+            fid["productDefinitionTemplateNumber"] = template
+            fid["parameterCategory"] = buf[sec + 9]
+            fid["parameterNumber"] = buf[sec + 10]
+            if template in _GRIB2_HLEVEL_TEMPLATES:
+                fid["typeOfFirstFixedSurface"] = buf[sec + 22]
+                # Missing values are left out: filters on these keys will
+                # not be processed on the raw messages
+                for key, value in (
+                    (
+                        "scaleFactorOfFirstFixedSurface",
+                        _grib2_signed(buf, sec + 23, 1),
+                    ),
+                    (
+                        "scaledValueOfFirstFixedSurface",
+                        _grib2_signed(buf, sec + 24, 4),
+                    ),
+                ):
+                    if value is not None:
+                        fid[key] = value
+                fid["typeOfSecondFixedSurface"] = buf[sec + 28]
+        sec += seclen
+    if nfields != 1:
+        raise GRIBIndexError("GRIB2 messages with several fields")
+    return length, centre, fid
+
+
+def grib_message_index(path):
+    """Scan the **path** GRIB file and return a list of GRIBMessageInfo.
+
+    Data are not decoded: only the identification and product definition
+    sections are looked at.
+
+    :raise GRIBIndexError: if a message is corrupted or not supported
+    """
+    index = list()
+    with open(path, "rb") as fhg:
+        try:
+            buf = mmap.mmap(fhg.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file
+            return index
+    with buf:
+        size = len(buf)
+        offset = buf.find(b"GRIB")
+        while offset >= 0:
+            if offset + 16 > size:
+                raise GRIBIndexError("Truncated GRIB message")
+            edition = buf[offset + 7]
+            if edition == 1:
+                length, centre, fid = _grib1_message(buf, offset)
+            elif edition == 2:
+                length, centre, fid = _grib2_message(buf, offset)
+            else:
+                raise GRIBIndexError(
+                    "Unsupported GRIB edition: {:d}".format(edition)
+                )
+            if (
+                offset + length > size
+                or buf[offset + length - 4 : offset + length] != b"7777"
+            ):
+                raise GRIBIndexError("Truncated GRIB message")
+            index.append(GRIBMessageInfo(offset, length, edition, centre, fid))
+            offset = buf.find(b"GRIB", offset + length)
+    return index
+
+
+def copy_byte_ranges(infile, outfile, ranges):
+    """Copy some parts of **infile** at the end of **outfile**.
+
+    :param infile: The input file object (opened in binary mode)
+    :param outfile: The output file object (opened in binary mode)
+    :param ranges: A list of (offset, length) tuples. Contiguous ranges are
+                   merged prior to the copy.
+    """
+    merged = list()
+    for offset, length in ranges:
+        if merged and merged[-1][0] + merged[-1][1] == offset:
+            merged[-1][1] += length
+        else:
+            merged.append([offset, length])
+    outfile.flush()
+    infd = infile.fileno()
+    outfd = outfile.fileno()
+    for offset, length in merged:
+        while length > 0:
+            try:
+                if hasattr(os, "copy_file_range"):
+                    done = os.copy_file_range(infd, outfd, length, offset)
+                else:
+                    done = os.sendfile(outfd, infd, offset, length)
+            except OSError:
+                # e.g. cross-device copies with old kernels
+                done = 0
+            if not done:
+                infile.seek(offset)
+                done = outfile.write(infile.read(min(length, 16777216)))
+                outfile.flush()
+            offset += done
+            length -= done
+
+
 def use_in_shell(sh, **kw):
     """Extend current shell with the LFI interface defined by optional arguments."""
     kw["shell"] = sh
@@ -198,13 +385,19 @@ class GRIB_Tool(addons.FtrawEnableAddon):
             total += size
         return total
 
+    def _pack_inprocess(self, source, destination):
+        """Concatenate the parts of the **source** multipart GRIB."""
+        for a_mpart in self._std_grib_index_get(source):
+            with open(a_mpart, "rb") as fdin:
+                size = os.fstat(fdin.fileno()).st_size
+                copy_byte_ranges(fdin, destination, [(0, size)])
+
     def xgrib_pack(self, source, destination, intent="in"):
         """Manually pack a multi GRIB."""
         if isinstance(destination, str):
             tmpfile = self.sh.safe_fileaddsuffix(destination)
             with open(tmpfile, "wb") as fd:
-                p = self._pack_stream(source, stdout=fd)
-            self.sh.pclose(p)
+                self._pack_inprocess(source, fd)
             if intent == "in":
                 self.sh.chmod(tmpfile, 0o444)
             return self.sh.move(tmpfile, destination)
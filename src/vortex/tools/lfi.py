@@ -7,9 +7,19 @@ It provides shell addons to deal with:
     * Splitted FA files (as produced by the Arpege/IFS IO server)
     * The ability to compare Fa or LFI files
 
+The index of LFI files (FA files are LFI files) is read in-process by the
+:class:`LFIIndex` and :class:`LFIMultipartIndex` classes (for multipart
+``LFI_ALTM`` files): listing or comparing such files does not require the
+``lfitools`` binaries. Files that are not recognised are still processed by
+the external tools.
+
 """
 
+import ast
+import mmap
+import os
 import re
+import struct
 
 import footprints
 
@@ -104,6 +114,344 @@ class LFI_Status:
         return bool(self.rc in self.ok)
 
 
+#: The first bytes of multipart LFI files
+LFI_ALTM_MAGIC = b"LFI_ALTM"
+
+
+class LFIFormatError(ValueError):
+    """The file is not a (supported) LFI file."""
+
+    pass
+
+
+class LFIIndex:
+    """Read the index of an LFI file (using mmap).
+
+    An LFI file is made of physical records of ``reclen`` big-endian 8-byte
+    words. The first record is the header. Its first 22 words are used:
+
+        * word 1: the physical records length (in words)
+        * word 2: the length of the article names (16 characters)
+        * word 4: the length of the header (22 words)
+        * word 5: the number of physical records in the file
+        * word 6: the number of used index slots (articles and holes)
+        * word 8: the length of the longest article (in words)
+        * word 9: the total length of the articles (in words)
+        * word 13: the number of slots in an index page
+        * word 21: the number of holes
+
+    An index page is made of two records: the names of the articles
+    (16 characters each) and the pointers of the articles (2 words each: the
+    length of the article and its 1-based position in the file, both in
+    words). The first index page is made of the second and third records.
+    The 1-based record numbers of the names of the next index pages are
+    stored at the end of the header (the second page's one in the header's
+    last word, the third page's one in the previous word, ...). The pointers
+    record follows the names record. Holes (i.e. deleted or moved articles)
+    have blank names and unused slots are named ``**FIN D'INDEX**``.
+
+    Multipart LFI files start with ``LFI_ALTM``: it is a text file that lists
+    the paths of the actual LFI files (relative to the multipart file's
+    directory) and, for each article, the index of the LFI file that holds
+    it. Such files are read by :class:`LFIMultipartIndex` objects: use the
+    :func:`lfi_index` function to get the appropriate object.
+
+    The index is checked thoroughly (against the header's counts): if
+    anything looks wrong, a :class:`LFIFormatError` exception is raised (and
+    the caller is expected to fall back to the ``lfitools`` binaries).
+    """
+
+    WORD = 8
+    NAMELEN = 16
+    HEADERLEN = 22
+    ENDOFINDEX = "**FIN D'INDEX**"
+
+    def __init__(self, path):
+        """
+        :param str path: Path to the LFI file
+        :raise LFIFormatError: if the index can't be read
+        """
+        self.path = path
+        self._articles = None
+        try:
+            with open(path, "rb") as fhl:
+                if fhl.read(8) == LFI_ALTM_MAGIC:
+                    raise LFIFormatError(
+                        "{:s}: multipart LFI file".format(path)
+                    )
+                fhl.seek(0)
+                try:
+                    self._mm = mmap.mmap(
+                        fhl.fileno(), 0, access=mmap.ACCESS_READ
+                    )
+                except ValueError:
+                    raise LFIFormatError("{:s}: empty file".format(path))
+        except OSError as e:
+            raise LFIFormatError("{:s}: {!s}".format(path, e))
+        try:
+            self._articles = self._read_index()
+        except (LFIFormatError, struct.error, UnicodeDecodeError) as e:
+            self.close()
+            if isinstance(e, LFIFormatError):
+                raise
+            raise LFIFormatError("{:s}: {!s}".format(path, e))
+
+    def _words(self, offset, count):
+        return struct.unpack_from(
+            ">{:d}q".format(count), self._mm, offset * self.WORD
+        )
+
+    def _read_index(self):
+        size = len(self._mm)
+        if size < self.HEADERLEN * self.WORD:
+            raise LFIFormatError("{:s}: bad file size".format(self.path))
+        header = self._words(0, self.HEADERLEN)
+        reclen = header[0]
+        if reclen < self.HEADERLEN or size % (reclen * self.WORD):
+            raise LFIFormatError(
+                "{:s}: bad physical record length".format(self.path)
+            )
+        nrecords = size // (reclen * self.WORD)
+        nslots = reclen * self.WORD // self.NAMELEN
+        nused = header[5]
+        npages = max(1, -(-nused // nslots))
+        if (
+            header[1] != self.NAMELEN
+            or header[3] != self.HEADERLEN
+            or header[4] != nrecords
+            or header[12] != nslots
+            or not 0 <= header[20] <= nused
+            or npages > reclen - self.HEADERLEN
+            or nrecords < 3
+        ):
+            raise LFIFormatError("{:s}: bad header".format(self.path))
+        # The 0-based record number of the names of each index page
+        pages = [1]
+        if npages > 1:
+            pages.extend(
+                [
+                    r - 1
+                    for r in reversed(
+                        self._words(reclen - npages + 1, npages - 1)
+                    )
+                ]
+            )
+        if len(set(pages)) != npages or not all(
+            [1 <= r < nrecords - 1 for r in pages]
+        ):
+            raise LFIFormatError(
+                "{:s}: bad index pages location".format(self.path)
+            )
+        sizew = size // self.WORD
+        recbytes = reclen * self.WORD
+        articles = dict()
+        nholes = 0
+        for ipage, record in enumerate(pages):
+            nnames = min(nslots, nused - ipage * nslots)
+            names = self._mm[
+                record * recbytes : record * recbytes + nnames * self.NAMELEN
+            ]
+            pointers = self._words((record + 1) * reclen, 2 * nnames)
+            for i in range(nnames):
+                name = names[i * self.NAMELEN : (i + 1) * self.NAMELEN]
+                name = name.decode("ascii").rstrip(" ")
+                if not name:
+                    nholes += 1
+                    continue
+                if name == self.ENDOFINDEX or not name.isprintable():
+                    raise LFIFormatError(
+                        "{:s}: bad article name".format(self.path)
+                    )
+                length, position = pointers[2 * i : 2 * i + 2]
+                if (
+                    length < 0
+                    or position < 3 * reclen + 1
+                    or position - 1 + length > sizew
+                    or name in articles
+                ):
+                    raise LFIFormatError(
+                        "{:s}: bad pointers for article {:s}".format(
+                            self.path, name
+                        )
+                    )
+                articles[name] = (length, position)
+        lengths = [length for length, _ in articles.values()]
+        if (
+            nholes != header[20]
+            or sum(lengths) != header[8]
+            or max(lengths, default=0) != header[7]
+        ):
+            raise LFIFormatError(
+                "{:s}: the index does not match the header".format(self.path)
+            )
+        return articles
+
+    @property
+    def articles(self):
+        """A dictionary of (length, position) tuples (in words, 1-based)."""
+        return dict(self._articles)
+
+    def table(self):
+        """The list of (name, length, position) tuples (in the index order).
+
+        This is what the ``lfilist`` tool prints.
+        """
+        return [(k, v[0], v[1]) for k, v in self._articles.items()]
+
+    def _extent(self, name):
+        """The mmap object, offset and size (in bytes) of the **name** article."""
+        length, position = self._articles[name]
+        return self._mm, (position - 1) * self.WORD, length * self.WORD
+
+    def read(self, name):
+        """Return the data of the **name** article."""
+        mm, offset, size = self._extent(name)
+        return mm[offset : offset + size]
+
+    def same_article(self, name, other, chunksize=1048576):
+        """Is the **name** article identical in **other** (another index) ?
+
+        The data are compared chunk by chunk.
+        """
+        mm, offset, size = self._extent(name)
+        omm, ooffset, osize = other._extent(name)
+        if size != osize:
+            return False
+        for i in range(0, size, chunksize):
+            csize = min(chunksize, size - i)
+            if (
+                mm[offset + i : offset + i + csize]
+                != omm[ooffset + i : ooffset + i + csize]
+            ):
+                return False
+        return True
+
+    def close(self):
+        mm = getattr(self, "_mm", None)
+        if mm is not None:
+            mm.close()
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exctype, excvalue, exctb):
+        self.close()
+
+
+class LFIMultipartIndex(LFIIndex):
+    """Read the index of a multipart (``LFI_ALTM``) LFI file.
+
+    The index file looks like::
+
+        LFI_ALTM
+        <number of LFI files> <length of the longest path>
+        <path of the first LFI file>
+        ...
+        <number of articles> <length of the article names>
+        <0-based number of the LFI file> <article name>
+        ...
+
+    The positions of the articles are given in the LFI file that holds them.
+    """
+
+    def __init__(self, path):
+        """
+        :param str path: Path to the multipart LFI file
+        :raise LFIFormatError: if the index can't be read
+        """
+        self.path = path
+        self._articles = None
+        self._parts = list()
+        try:
+            with open(path, "rb") as fhl:
+                lines = fhl.read().decode("ascii").split("\n")
+        except (OSError, UnicodeDecodeError) as e:
+            raise LFIFormatError("{:s}: {!s}".format(path, e))
+        try:
+            self._articles = self._read_altm(lines)
+        except (LFIFormatError, ValueError, IndexError) as e:
+            self.close()
+            if isinstance(e, LFIFormatError):
+                raise
+            raise LFIFormatError("{:s}: {!s}".format(path, e))
+
+    def _read_altm(self, lines):
+        if lines[0] != LFI_ALTM_MAGIC.decode():
+            raise LFIFormatError(
+                "{:s}: not a multipart file".format(self.path)
+            )
+        nfiles = int(lines[1].split()[0])
+        dirname = os.path.dirname(self.path)
+        for part in lines[2 : 2 + nfiles]:
+            self._parts.append(LFIIndex(os.path.join(dirname, part)))
+        narticles, namelen = [int(x) for x in lines[2 + nfiles].split()]
+        entries = lines[3 + nfiles : 3 + nfiles + narticles]
+        if len(self._parts) != nfiles or len(entries) != narticles:
+            raise LFIFormatError("{:s}: truncated file".format(self.path))
+        if any(lines[3 + nfiles + narticles :]):
+            raise LFIFormatError("{:s}: trailing data".format(self.path))
+        articles = dict()
+        for entry in entries:
+            ipart, name = entry.split(" ", 1)
+            ipart = int(ipart)
+            name = name[:namelen].rstrip(" ")
+            if not 0 <= ipart < nfiles or name in articles:
+                raise LFIFormatError(
+                    "{:s}: bad entry for article {:s}".format(self.path, name)
+                )
+            try:
+                articles[name] = (ipart,) + self._parts[ipart]._articles[name]
+            except KeyError:
+                raise LFIFormatError(
+                    "{:s}: article {:s} is missing in {:s}".format(
+                        self.path, name, self._parts[ipart].path
+                    )
+                )
+        return articles
+
+    @property
+    def parts(self):
+        """The paths of the actual LFI files."""
+        return [part.path for part in self._parts]
+
+    @property
+    def articles(self):
+        """A dictionary of (length, position) tuples (in words, 1-based).
+
+        The positions are given in the LFI file that holds the article.
+        """
+        return {k: v[1:] for k, v in self._articles.items()}
+
+    def table(self):
+        """The list of (name, length, position) tuples (in the index order).
+
+        This is what the ``lfilist`` tool prints.
+        """
+        return [(k, v[1], v[2]) for k, v in self._articles.items()]
+
+    def _extent(self, name):
+        return self._parts[self._articles[name][0]]._extent(name)
+
+    def close(self):
+        for part in self._parts:
+            part.close()
+        self._parts = list()
+
+
+def lfi_index(path):
+    """Return the appropriate index object (single-part or multipart LFI file).
+
+    :raise LFIFormatError: if the index can't be read
+    """
+    try:
+        with open(path, "rb") as fhl:
+            multipart = fhl.read(8) == LFI_ALTM_MAGIC
+    except OSError as e:
+        raise LFIFormatError("{:s}: {!s}".format(path, e))
+    return LFIMultipartIndex(path) if multipart else LFIIndex(path)
+
+
 class LFI_Tool_Raw(addons.FtrawEnableAddon):
     """
     Interface to LFI commands through Perl wrappers.
@@ -146,6 +494,13 @@ class LFI_Tool_Raw(addons.FtrawEnableAddon):
             toolkind=dict(
                 default="lfitools",
             ),
+            native=dict(
+                info="Read the index of single-part LFI files in-process.",
+                type=bool,
+                optional=True,
+                default=True,
+                doc_visibility=footprints.doc.visibility.ADVANCED,
+            ),
         ),
     )
 
@@ -185,9 +540,19 @@ class LFI_Tool_Raw(addons.FtrawEnableAddon):
         rc = False
         if source and isinstance(source, str) and self.sh.path.exists(source):
             with open(source, "rb") as fd:
-                rc = fd.read(8) == b"LFI_ALTM"
+                rc = fd.read(8) == LFI_ALTM_MAGIC
         return rc
 
+    def _native_index(self, lfifile):
+        """Return an index object (or *None* if not applicable)."""
+        if not self.native:
+            return None
+        try:
+            return lfi_index(lfifile)
+        except LFIFormatError as e:
+            logger.debug("Falling back to the lfitools binaries: %s", str(e))
+            return None
+
     def _std_table(self, lfifile, **kw):
         """
         List of contents of a lfi-file.
@@ -196,13 +561,26 @@ class LFI_Tool_Raw(addons.FtrawEnableAddon):
           * lfifile : lfi file name
 
         """
+        lfindex = self._native_index(lfifile)
+        if lfindex is not None:
+            with lfindex:
+                table = lfindex.table()
+            return LFI_Status(
+                rc=0,
+                stdout=["[{!r}, {:d}, {:d}],".format(*x) for x in table],
+                result=table,
+            )
         cmd = ["lfilist", lfifile]
         kw["output"] = True
         rawout = self._spawn(cmd, **kw)
         return LFI_Status(
             rc=0,
             stdout=rawout,
-            result=[tuple(eval(x)[0]) for x in rawout if x.startswith("[")],
+            result=[
+                tuple(ast.literal_eval(x)[0])
+                for x in rawout
+                if x.startswith("[")
+            ],
         )
 
     fa_table = lfi_table = _std_table
@@ -220,6 +598,11 @@ class LFI_Tool_Raw(addons.FtrawEnableAddon):
           * skipfields : LFI fields not to be compared
           * skiplength : Offset at which the comparison starts for each LFI fields
         """
+        if not (kw.get("skipfields", 0) or kw.get("skiplength", 0)):
+            st = self._native_diff(lfi1, lfi2)
+            if st is not None:
+                return st
+
         cmd = ["lfidiff", "--lfi-file-1", lfi1, "--lfi-file-2", lfi2]
 
         maxprint = kw.pop("maxprint", 2)
@@ -256,6 +639,38 @@ class LFI_Tool_Raw(addons.FtrawEnableAddon):
 
     fa_diff = lfi_diff = _std_diff
 
+    def _native_diff(self, lfi1, lfi2):
+        """In-process comparison of two LFI files.
+
+        :return: *None* if one of the files is not supported
+        """
+        lfindex1 = self._native_index(lfi1)
+        if lfindex1 is None:
+            return None
+        with lfindex1:
+            lfindex2 = self._native_index(lfi2)
+            if lfindex2 is None:
+                return None
+            with lfindex2:
+                names1 = [x[0] for x in lfindex1.table()]
+                names2 = [x[0] for x in lfindex2.table()]
+                set1, set2 = set(names1), set(names2)
+                deleted = [x for x in names1 if x not in set2]
+                created = [x for x in names2 if x not in set1]
+                updated = [
+                    x
+                    for x in names1
+                    if x in set2 and not lfindex1.same_article(x, lfindex2)
+                ]
+        trfields = Tracker(deleted=deleted, created=created, updated=updated)
+        trfields.unchanged = set1 - set(trfields)
+        rawout = (
+            [" -- " + x for x in deleted]
+            + [" ++ " + x for x in created]
+            + [" != " + x for x in updated]
+        )
+        return LFI_Status(rc=int(bool(rawout)), stdout=rawout, result=trfields)
+
     def fa_empty(self, fa1, fa2, **kw):
         """
         Create an empty FA file
@@ -5,6 +5,9 @@ Any "name building" object, must conform to the :class:`AbstractVortexNameBuilde
 abstract class interface.
 """
 
+import collections
+import threading
+
 from bronx.fancies import loggers
 import footprints
 from footprints import proxy as fpx
@@ -21,6 +24,22 @@ class VortexNameBuilderError(ValueError):
     pass
 
 
+def _freeze(value):
+    """Return a hashable version of **value** (used as a cache key).
+
+    :raise TypeError: if some part of **value** is not hashable.
+    """
+    if isinstance(value, dict):
+        return (
+            dict,
+            tuple(sorted([(k, _freeze(v)) for k, v in value.items()])),
+        )
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple([_freeze(v) for v in value]))
+    hash(value)
+    return (type(value), value)
+
+
 class AbstractVortexNameBuilder(footprints.FootprintBase):
     """Abstract class for any name building class."""
 
@@ -86,6 +105,14 @@ class AbstractVortexNameBuilder(footprints.FootprintBase):
         """Returns a pathname given the **d** info dictionary."""
         raise NotImplementedError("This is an abstract method !")
 
+    def pack_basenames(self, ds):
+        """Returns the list of basenames given a list of info dictionaries."""
+        return [self.pack_basename(d) for d in ds]
+
+    def pack_pathnames(self, ds):
+        """Returns the list of pathnames given a list of info dictionaries."""
+        return [self.pack_pathname(d) for d in ds]
+
 
 # Activate the footprint's fasttrack on the resources collector
 vbcollect = footprints.collectors.get(tag="vortexnamebuilder")
@@ -144,11 +171,102 @@ class AbstractVortexNameBuilderProxy(AbstractVortexNameBuilder):
         return self._pick_actual_builder(components).pack_pathname(d)
 
 
+class _TracingDict(dict):
+    """A dictionary that keeps track of the keys that are looked at."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.accessed = set()
+        self.exhaustive = False
+
+    def __getitem__(self, key):
+        self.accessed.add(key)
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        self.accessed.add(key)
+        return super().__contains__(key)
+
+    def get(self, key, default=None):
+        self.accessed.add(key)
+        return super().get(key, default)
+
+    def __iter__(self):
+        self.exhaustive = True
+        return super().__iter__()
+
+    def keys(self):
+        self.exhaustive = True
+        return super().keys()
+
+    def values(self):
+        self.exhaustive = True
+        return super().values()
+
+    def items(self):
+        self.exhaustive = True
+        return super().items()
+
+    def copy(self):
+        self.exhaustive = True
+        return super().copy()
+
+
+#: Marks a missing key in the cache keys
+_MISSING = object()
+
+
 class AbstractActualVortexNameBuilder(AbstractVortexNameBuilder):
-    """Abstract class for any "concrete" builder object (as opposed to proxies)."""
+    """Abstract class for any "concrete" builder object (as opposed to proxies).
+
+    For each (what, style) pair, a formatting plan is compiled: the packing
+    method and the list of the description's keys that it actually looks at.
+    The most recently built names are remembered (at most
+    :attr:`_PACKED_CACHE_SIZE` of them) and indexed by the values of these
+    keys: identical descriptions are not packed twice.
+    """
 
     _abstract = True
 
+    #: The maximum number of remembered basenames/pathnames
+    _PACKED_CACHE_SIZE = 2048
+
+    def __init__(self, *args, **kw):
+        self._plans = dict()
+        self._packed = collections.OrderedDict()
+        self._packed_lock = threading.Lock()
+        super().__init__(*args, **kw)
+
+    def __getstate__(self):
+        d = super().__getstate__()
+        # The lock can't be pickled: start from a clean slate
+        for k in ("_plans", "_packed", "_packed_lock"):
+            d.pop(k, None)
+        return d
+
+    def __setstate__(self, state):
+        self._plans = dict()
+        self._packed = collections.OrderedDict()
+        self._packed_lock = threading.Lock()
+        super().__setstate__(state)
+
+    def setdefault(self, **kw):
+        """Update or set new default values as the background description used in packing."""
+        super().setdefault(**kw)
+        with self._packed_lock:
+            self._packed.clear()
+
+    def _plan(self, what, style):
+        """Return the packing method and keys for **what** and **style**."""
+        plan = self._plans.get((what, style))
+        if plan is None:
+            plan = (
+                getattr(self, "_pack_{!s}_{!s}".format(what, style)),
+                (),
+            )
+            self._plans[(what, style)] = plan
+        return plan
+
     def _pack_generic(self, d, what, default="std"):
         """
         Build the resource vortex basename/pathname or whatever according to
@@ -157,12 +275,47 @@ class AbstractActualVortexNameBuilder(AbstractVortexNameBuilder):
         components = dict()
         components.update(self._default)
         components.update(d)
+        style = components.get("style", default)
+        packstyle, keys = self._plan(what, style)
+
+        key = None
+        if keys is not None:
+            try:
+                key = (what, style) + tuple(
+                    [_freeze(components.get(k, _MISSING)) for k in keys]
+                )
+            except TypeError:
+                pass
+        if key is not None:
+            with self._packed_lock:
+                packed = self._packed.get(key)
+                if packed is not None:
+                    self._packed.move_to_end(key)
+                    return (
+                        list(packed) if isinstance(packed, tuple) else packed
+                    )
 
-        packstyle = getattr(
-            self,
-            "_pack_{!s}_{!s}".format(what, components.get("style", default)),
-        )
-        return packstyle(components)
+        tcomponents = _TracingDict(components)
+        packed = packstyle(tcomponents)
+
+        if tcomponents.exhaustive:
+            # The whole description is used: nothing can be remembered
+            self._plans[(what, style)] = (packstyle, None)
+        elif not tcomponents.accessed.issubset(keys):
+            # The plan is not complete yet (a new branch of the packing code
+            # was used): extend it
+            self._plans[(what, style)] = (
+                packstyle,
+                tuple(sorted(tcomponents.accessed.union(keys))),
+            )
+        elif key is not None:
+            with self._packed_lock:
+                self._packed[key] = (
+                    tuple(packed) if isinstance(packed, list) else packed
+                )
+                while len(self._packed) > self._PACKED_CACHE_SIZE:
+                    self._packed.popitem(last=False)
+        return packed
 
     def pack_basename(self, d):
         """Build the resource vortex basename according to ``style`` value."""
@@ -18,6 +18,7 @@ import shlex
 import socket
 import stat
 import struct
+import threading
 import time
 from urllib import request as urlrequest
 from urllib import parse as urlparse
@@ -27,6 +28,7 @@ from bronx.net.netrc import netrc
 from bronx.syntax.decorators import nicedeco, secure_getattr
 
 from vortex.config import get_from_config_w_default, ConfigurationError
+from vortex.tools import digests
 
 #: No automatic export
 __all__ = []
@@ -326,8 +328,14 @@ class ExtendedFtplib:
             xdestination = False
         logger.info("FTP <get:{:s}>".format(source))
         rc = False
+        sdigest = digests.streaming_digest() if xdestination else None
         try:
-            self.retrbinary("RETR " + source, target.write)
+            self.retrbinary(
+                "RETR " + source,
+                target.write
+                if sdigest is None
+                else sdigest.wrap(target.write),
+            )
             if xdestination:
                 target.seek(0, io.SEEK_END)
                 if self.size(source) == target.tell():
@@ -342,6 +350,8 @@ class ExtendedFtplib:
                 # If the ftp GET fails, a zero size file is here: remove it
                 if not rc:
                     self.system.remove(destination)
+                elif sdigest is not None:
+                    sdigest.record(destination)
         return rc
 
     def put(self, source, destination, size=None, exact=False):
@@ -1021,6 +1031,32 @@ class PooledResetableAutoRetriesFtp(ResetableAutoRetriesFtp):
             "Pooled FTP init <host:%s> <pool:%s>", self.host, repr(pool)
         )
 
+    def healthcheck(self):
+        """Check that the underlying FTP connection is still alive (NOOP).
+
+        If the connection is broken, it is dropped: a new connection will be
+        transparently opened (and logged in) with the next FTP command.
+
+        :return: *False* if the connection had to be dropped.
+        """
+        if self._internal_ftp is None or self._internal_ftp.closed:
+            return True
+        try:
+            self._internal_ftp.voidcmd("NOOP")
+        except (EOFError, OSError, ftplib.Error) as e:
+            logger.info(
+                "The FTP connection to %s is broken (%s). Dropping it.",
+                self.host,
+                str(e),
+            )
+            try:
+                self._internal_ftp.close()
+            except (EOFError, OSError, ftplib.Error):
+                pass
+            self._initialise()
+            return False
+        return True
+
     def forceclose(self):
         """Really quit the ftp session."""
         if self._internal_ftp is not None:
@@ -1050,7 +1086,20 @@ class FtpConnectionPool:
     number of clients which avoids multiple connect/login sequences (that are
     time consuming). On the other hand, the user must be cautious when using this
     class since having numerous long standing opened connections can harm the
-    remote FTP hosts.
+    remote FTP hosts. Consequently:
+
+        * At most *maxspare* spare clients are kept for a given
+          *hostname*/*port*/*logname* triplet (additional clients are closed
+          when given back);
+        * Spare clients that have not been used for more than *idletimeout*
+          seconds are closed;
+        * Spare clients that have not been used for more than *checkdelay*
+          seconds are checked (using the NOOP FTP command) before being
+          dispensed. If the connection is broken, a new connection is
+          transparently established.
+
+    The pool may be used concurrently by several threads (however, a given
+    FTP client object must not be shared between threads).
     """
 
     #: The FTP client class that will be used
@@ -1059,40 +1108,114 @@ class FtpConnectionPool:
     #: warning are issued)
     _REUSABLE_THRESHOLD = 10
 
-    def __init__(self, system, nrcfile=None, ignoreproxy=False):
+    def __init__(
+        self,
+        system,
+        nrcfile=None,
+        ignoreproxy=False,
+        maxspare=None,
+        idletimeout=None,
+        checkdelay=None,
+    ):
         """
         :param ~vortex.tools.systems.OSExtended system: The system object to work with.
         :param str nrcfile: The path to the .netrc file (if `None` the ~/.netrc default is used)
         :param bool ignoreproxy: Forcibly ignore any proxy related environment variables
+        :param int maxspare: The maximum number of spare clients for a given
+            *hostname*/*port*/*logname* triplet
+        :param float idletimeout: Spare clients are closed after this delay
+            (in seconds)
+        :param float checkdelay: Spare clients are checked before being
+            re-used if they have been idle for more than this delay (in seconds)
         """
         self._system = system
         self._nrcfile = nrcfile
         self._ignoreproxy = ignoreproxy
+        self._maxspare = int(
+            maxspare
+            if maxspare is not None
+            else get_from_config_w_default("ftp", "pool_maxspare", 4)
+        )
+        self._idletimeout = float(
+            idletimeout
+            if idletimeout is not None
+            else get_from_config_w_default("ftp", "pool_idletimeout", 300)
+        )
+        self._checkdelay = float(
+            checkdelay
+            if checkdelay is not None
+            else get_from_config_w_default("ftp", "pool_checkdelay", 10)
+        )
+        self._lock = threading.RLock()
         self._reusable = collections.defaultdict(collections.deque)
         self._created = 0
         self._reused = 0
         self._givenback = 0
+        self._reconnected = 0
+        self._discarded = 0
 
     @property
     def poolsize(self):
         """The number of spare FTP clients."""
-        return sum([len(hpool) for hpool in self._reusable.values()])
+        with self._lock:
+            return sum([len(hpool) for hpool in self._reusable.values()])
+
+    @property
+    def stats(self):
+        """A dictionary that summarises the connection pool activity."""
+        with self._lock:
+            return dict(
+                poolsize=self.poolsize,
+                created=self._created,
+                reused=self._reused,
+                givenback=self._givenback,
+                reconnected=self._reconnected,
+                discarded=self._discarded,
+            )
 
     def __str__(self):
         """Print a summary of the connection pool activity."""
-        out = "Current connection pool size: {:d}\n".format(self.poolsize)
-        out += "  # of created objects: {:d}\n".format(self._created)
-        out += "  # of re-used objects: {:d}\n".format(self._reused)
-        out += "  # of given back objects: {:d}\n".format(self._givenback)
-        if self.poolsize:
-            out += "\nDetailed list of current spare clients:\n"
-            for ident, hpool in self._reusable.items():
-                for client in hpool:
-                    out += "  - {id[1]:s}@{id[0]:s}: {cl!r}\n".format(
-                        id=ident, cl=client
-                    )
+        with self._lock:
+            out = "Current connection pool size: {:d}\n".format(self.poolsize)
+            out += "  # of created objects: {:d}\n".format(self._created)
+            out += "  # of re-used objects: {:d}\n".format(self._reused)
+            out += "  # of given back objects: {:d}\n".format(self._givenback)
+            out += "  # of reconnections: {:d}\n".format(self._reconnected)
+            out += "  # of discarded objects: {:d}\n".format(self._discarded)
+            if self.poolsize:
+                out += "\nDetailed list of current spare clients:\n"
+                for ident, hpool in self._reusable.items():
+                    for client, _ in hpool:
+                        out += "  - {id[2]:s}@{id[0]:s}: {cl!r}\n".format(
+                            id=ident, cl=client
+                        )
         return out
 
+    def _expire(self):
+        """Remove the spare clients that have been idle for too long.
+
+        :return: The list of expired clients (that need to be closed).
+        """
+        expired = list()
+        limit = time.monotonic() - self._idletimeout
+        for hpool in self._reusable.values():
+            while hpool and hpool[0][1] < limit:
+                expired.append(hpool.popleft()[0])
+        self._discarded += len(expired)
+        return expired
+
+    @staticmethod
+    def _destroy(clients):
+        """Close the **clients** FTP sessions."""
+        for client in clients:
+            logger.debug(
+                "Destroying client for %s@%s", client.logname, client.host
+            )
+            try:
+                client.forceclose()
+            except (EOFError, OSError, ftplib.Error) as e:
+                logger.debug("Ignored error while closing: %s", str(e))
+
     def deal(
         self,
         hostname,
@@ -1103,14 +1226,25 @@ class FtpConnectionPool:
     ):
         """Retrieve an FTP client for the *hostname*/*logname* pair."""
         p_logname, _ = netrc_lookup(logname, hostname, nrcfile=self._nrcfile)
-        if self._reusable[(hostname, port, p_logname)]:
-            ftpc = self._reusable[(hostname, port, p_logname)].pop()
+        ftpc = None
+        with self._lock:
+            expired = self._expire()
+            hpool = self._reusable[(hostname, port, p_logname)]
+            if hpool:
+                ftpc, since = hpool.pop()
+                self._reused += 1
+        # Network related stuff is done outside of the lock
+        self._destroy(expired)
+        if ftpc is not None:
+            if time.monotonic() - since > self._checkdelay:
+                if not ftpc.healthcheck():
+                    with self._lock:
+                        self._reconnected += 1
             ftpc.reset()
             logger.debug("Re-using a client: %s", repr(ftpc))
             if not delayed:
                 # If requested, ensure that we are logged in
                 ftpc.delayedlogin()
-            self._reused += 1
             return ftpc
         else:
             ftpc = self._FTPCLIENT_CLASS(
@@ -1124,7 +1258,8 @@ class FtpConnectionPool:
             rc = ftpc.fastlogin(p_logname, delayed=delayed)
             if rc:
                 logger.debug("Creating a new client: %s", repr(ftpc))
-                self._created += 1
+                with self._lock:
+                    self._created += 1
                 return ftpc
             else:
                 logger.warning(
@@ -1145,34 +1280,49 @@ class FtpConnectionPool:
         its `close` method is called.
         """
         assert isinstance(client, self._FTPCLIENT_CLASS)
-        self._reusable[(client.host, client.port, client.logname)].append(
-            client
-        )
-        self._givenback += 1
+        with self._lock:
+            expired = self._expire()
+            hpool = self._reusable[(client.host, client.port, client.logname)]
+            self._givenback += 1
+            if len(hpool) >= self._maxspare:
+                # Too many spare clients: the oldest one is discarded
+                expired.append(hpool.popleft()[0])
+                self._discarded += 1
+            hpool.append((client, time.monotonic()))
+            poolsize = self.poolsize
         logger.debug(
             "Spare client for %s@%s:%d has been stored (poolsize=%d).",
             client.logname,
             client.host,
             client.port,
-            self.poolsize,
+            poolsize,
         )
-        if self.poolsize >= self._REUSABLE_THRESHOLD:
+        self._destroy(expired)
+        if poolsize >= self._REUSABLE_THRESHOLD:
             logger.warning(
                 "The FTP pool is too big ! (%d  >= %d). Here are the details:\n%s",
-                self.poolsize,
+                poolsize,
                 self._REUSABLE_THRESHOLD,
                 str(self),
             )
 
+    def expire(self):
+        """Destroy the spare FTP clients that have been idle for too long."""
+        with self._lock:
+            expired = self._expire()
+        self._destroy(expired)
+
     def clear(self):
         """Destroy all the spare FTP clients."""
-        for hpool in self._reusable.values():
-            for client in hpool:
-                logger.debug(
-                    "Destroying client for %s@%s", client.logname, client.host
-                )
-                client.forceclose()
-            hpool.clear()
+        with self._lock:
+            clients = [
+                client
+                for hpool in self._reusable.values()
+                for client, _ in hpool
+            ]
+            for hpool in self._reusable.values():
+                hpool.clear()
+        self._destroy(clients)
 
 
 class Ssh:
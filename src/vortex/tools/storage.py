@@ -29,7 +29,9 @@ unchanged.
 """
 
 import contextlib
+import errno
 import ftplib
+import os
 import re
 import time
 from datetime import datetime
@@ -38,9 +40,12 @@ import footprints
 from bronx.fancies import loggers
 from bronx.stdtypes.history import History
 from bronx.syntax.decorators import nicedeco
+from bronx.system import hash as hashutils
 from vortex import sessions
+from vortex.tools import digests
 from vortex.tools.actions import actiond as ad
 from vortex.tools.delayedactions import d_action_status
+from vortex.tools.touches import deferred_touches
 
 from vortex import config
 
@@ -288,6 +293,167 @@ class Storage(footprints.FootprintBase):
         return self._actual_delete(item, **kwargs)
 
 
+# Content-addressed storage of files within a cache
+# -------------------------------------------------
+
+
+class DedupBlobStore:
+    """A content-addressed store of files (blobs) hosted in a cache entry.
+
+    Each file inserted in the cache is stored once, in a read-only blob
+    whose name is the file's hash sum (computed using
+    :class:`bronx.system.hash.HashAdapter`). The cache's path entries are
+    hardlinks to the blobs. Consequently, identical files inserted under
+    several paths only use up disk space once, and inserting a file that
+    is already stored in the cache only costs the hash sum computation.
+
+    The blobs are stored in the ``.blobs/<algorithm>`` subdirectory of the
+    cache entry. Blobs are never removed when a path entry is deleted: the
+    :meth:`gc` method should be called regularly in order to remove the
+    blobs that are not referenced anymore (see the ``vtx cache-gc``
+    command).
+    """
+
+    _BLOBS_DIR = ".blobs"
+
+    _BLOB_RE = re.compile(r"^[0-9a-f]+$")
+
+    #: Leftover temporary files are removed by :meth:`gc` after this delay
+    _TMP_EXPIRATION = 86400
+
+    def __init__(self, sh, entry, algorithm="sha256"):
+        """
+        :param vortex.tools.systems.OSExtended sh: The current usable System object
+        :param str entry: The absolute path to the cache space
+        :param str algorithm: The hash algorithm used to name the blobs
+        """
+        self._sh = sh
+        self._entry = entry
+        self._hadapter = hashutils.HashAdapter(algorithm)
+
+    @property
+    def algorithm(self):
+        """The hash algorithm used to name the blobs."""
+        return self._hadapter.algorithm
+
+    @property
+    def blobsroot(self):
+        """The directory where blobs are stored (for any hash algorithm)."""
+        return self._sh.path.join(
+            self._sh.path.expanduser(self._entry), self._BLOBS_DIR
+        )
+
+    def blobpath(self, digest):
+        """The path to the blob associated with a given **digest**."""
+        return self._sh.path.join(
+            self.blobsroot, self.algorithm, digest[:2], digest
+        )
+
+    def accepts(self, local, fmt=None):
+        """Tells whether **local** can be inserted in the blob store.
+
+        Directories, File-like objects and formats that rely on a dedicated
+        copy method (e.g. ``grib_cp``) are not supported.
+        """
+        return (
+            isinstance(local, str)
+            and self._sh.path.isfile(local)
+            and not hasattr(self._sh, str(fmt).lower() + "_cp")
+        )
+
+    def _new_blob(self, local, blob, intent):
+        """Create the **blob** file from the **local** file."""
+        tmpblob = self._sh.safe_fileaddsuffix(blob)
+        rc = self._sh.cp(
+            local,
+            tmpblob,
+            intent=intent,
+            smartcp_threshold=HARDLINK_THRESHOLD,
+        )
+        if rc:
+            self._sh.readonly(tmpblob)
+            try:
+                os.link(tmpblob, blob)
+            except FileExistsError:
+                # Concurrent insertion of the same data
+                pass
+        self._sh.remove(tmpblob)
+        return rc
+
+    def _link_blob(self, blob, destination):
+        """Atomically replace **destination** by a hardlink to **blob**."""
+        if not self._sh.filecocoon(destination):
+            logger.error("Could not create a cocoon for file %s", destination)
+            return False
+        tmpdestination = self._sh.safe_fileaddsuffix(destination)
+        try:
+            os.link(blob, tmpdestination)
+        except OSError as e:
+            if e.errno != errno.EMLINK:
+                raise
+            logger.warning("Too many links for blob %s: copying it.", blob)
+            return self._sh.rawcp(blob, destination)
+        return self._sh.move(tmpdestination, destination)
+
+    def insert(self, local, destination, intent="in"):
+        """Insert the **local** file under the **destination** path entry.
+
+        :return: A ``(rc, digest, reused)`` tuple where **reused** tells
+                 whether an existing blob was used.
+        """
+        digest = digests.digest_cache().file2hash(local, self.algorithm)
+        blob = self.blobpath(digest)
+        reused = True
+        for _ in range(2):
+            if not self._sh.path.exists(blob):
+                reused = False
+                if not self._new_blob(local, blob, intent):
+                    return False, digest, reused
+            if self._sh.path.exists(destination) and self._sh.path.samefile(
+                destination, blob
+            ):
+                logger.debug("Already stored: %s (%s)", destination, digest)
+                return True, digest, reused
+            try:
+                return self._link_blob(blob, destination), digest, reused
+            except FileNotFoundError:
+                # The blob was garbage collected in the meantime: retry
+                logger.info("Blob %s vanished. Retrying.", blob)
+        return False, digest, reused
+
+    def gc(self, dryrun=False):
+        """Remove the blobs that are not referenced by any path entry.
+
+        :param bool dryrun: Just compute statistics (nothing is removed)
+        :return: A dictionary with the number of removed blobs (**removed**),
+                 the number of freed bytes (**freed**) and the number of
+                 remaining blobs (**kept**)
+        """
+        stats = dict(removed=0, freed=0, kept=0)
+        if not self._sh.path.isdir(self.blobsroot):
+            return stats
+        tmplimit = time.time() - self._TMP_EXPIRATION
+        for blob in self._sh.ffind(self.blobsroot):
+            try:
+                st = self._sh.stat(blob)
+            except OSError:
+                continue
+            if self._BLOB_RE.match(self._sh.path.basename(blob)):
+                unreferenced = st.st_nlink <= 1
+            else:
+                # Leftover of an interrupted insertion
+                unreferenced = st.st_mtime < tmplimit
+            if not unreferenced:
+                stats["kept"] += 1
+                continue
+            logger.debug("Removing unreferenced blob: %s", blob)
+            if not dryrun:
+                self._sh.remove(blob)
+            stats["removed"] += 1
+            stats["freed"] += st.st_size
+        return stats
+
+
 # Defining the two main flavours of storage places
 # -----------------------------------------------
 
@@ -330,12 +496,27 @@ class Cache(Storage):
                 optional=True,
                 default=600.0,  # 10 minutes
             ),
+            dedup=dict(
+                info=(
+                    "Store files in a content-addressed blob store "
+                    + "(if None, use the configuration file's setting)."
+                ),
+                type=bool,
+                optional=True,
+                default=None,
+            ),
+            dedup_hash=dict(
+                info="The hash algorithm used to name the blobs.",
+                optional=True,
+                default=None,
+                values=[None] + sorted(hashutils.HashAdapter.algorithms()),
+            ),
         ),
     )
 
     def __init__(self, *kargs, **kwargs):
         super().__init__(*kargs, **kwargs)
-        self._touch_tracker = dict()
+        self._dedup_store = None
 
     @property
     def realkind(self):
@@ -346,6 +527,25 @@ class Cache(Storage):
         """The identifier of this cache place."""
         return "{:s}_{:s}".format(self.realkind, self.entry)
 
+    @property
+    def dedup_store(self):
+        """The content-addressed blob store (*None* if deduplication is off)."""
+        dedup = self.dedup
+        if dedup is None:
+            dedup = config.get_from_config_w_default("cache", "dedup", False)
+        if not dedup:
+            return None
+        if self._dedup_store is None:
+            self._dedup_store = DedupBlobStore(
+                self.sh,
+                self.entry,
+                algorithm=self.dedup_hash
+                or config.get_from_config_w_default(
+                    "cache", "dedup_hash", "sha256"
+                ),
+            )
+        return self._dedup_store
+
     def _formatted_path(self, subpath, **kwargs):  # @UnusedVariable
         return self.sh.path.join(self.entry, subpath.lstrip("/"))
 
@@ -356,26 +556,16 @@ class Cache(Storage):
         """
         entry = self.sh.path.expanduser(self.entry)
         files = self.sh.ffind(entry)
-        return [f[len(entry) :] for f in files]
-
-    def _xtouch(self, path):
-        """
-        Perform a touch operation only if the last one, on te same path, was
-        less than `self.rtouchdelay` seconds ago.
-        """
-        ts = time.time()
-        ts_delay = ts - self._touch_tracker.get(path, 0)
-        if ts_delay > self.rtouchdelay:
-            logger.debug("Touching: %s (delay was %.2f)", path, ts_delay)
-            self.sh.touch(path)
-            self._touch_tracker[path] = ts
-        else:
-            logger.debug("Skipping touch: %s (delay was %.2f)", path, ts_delay)
+        blobs = self.sh.path.join(entry, DedupBlobStore._BLOBS_DIR, "")
+        return [f[len(entry) :] for f in files if not f.startswith(blobs)]
 
     def _recursive_touch(self, rc, item, writing=False):
         """Make recursive touches on parent directories.
 
-        It might be useful for cleaning scripts.
+        It might be useful for cleaning scripts. The touches are deferred
+        (see :mod:`vortex.tools.touches`): a given directory is touched at
+        most once per batch of operations and not if it was touched less
+        than `self.rtouchdelay` seconds ago.
         """
         if self.rtouch and (not self.readonly) and rc:
             items = item.lstrip("/").split("/")
@@ -383,10 +573,19 @@ class Cache(Storage):
             if writing:
                 # It's useless to touch the rightmost directory
                 items = items[:-1] if len(items) > 1 else []
-            for index in range(len(items), self.rtouchskip, -1):
-                self._xtouch(
-                    self._formatted_path(self.sh.path.join(*items[:index]))
-                )
+            deferred_touches().request(
+                [
+                    self.sh.path.expanduser(
+                        self._formatted_path(self.sh.path.join(*items[:index]))
+                    )
+                    for index in range(len(items), self.rtouchskip, -1)
+                ],
+                mindelay=self.rtouchdelay,
+            )
+
+    def flush_touches(self):
+        """Perform the pending touches on parent directories (if any)."""
+        deferred_touches().flush()
 
     def _actual_fullpath(self, item, **kwargs):
         """Return the path/URI to the **item**'s storage location."""
@@ -429,19 +628,25 @@ class Cache(Storage):
         tpath = self._formatted_path(item)
         if not self.sh.path.exists(self.entry):
             self.sh.mkdir(self.entry)
+        extras = dict(intent=intent, fmt=fmt)
+        dstore = self.dedup_store
         if tpath is not None:
-            rc = self.sh.cp(
-                local,
-                tpath,
-                intent=intent,
-                fmt=fmt,
-                smartcp_threshold=HARDLINK_THRESHOLD,
-            )
+            if dstore is not None and dstore.accepts(local, fmt=fmt):
+                rc, digest, reused = dstore.insert(local, tpath, intent=intent)
+                extras.update(digest=digest, reused=reused)
+            else:
+                rc = self.sh.cp(
+                    local,
+                    tpath,
+                    intent=intent,
+                    fmt=fmt,
+                    smartcp_threshold=HARDLINK_THRESHOLD,
+                )
         else:
             logger.warning("No target location for < %s >", item)
             rc = False
         self._recursive_touch(rc, item, writing=True)
-        return rc, dict(intent=intent, fmt=fmt)
+        return rc, extras
 
     def _actual_retrieve(self, item, local, **kwargs):
         """Retrieve an **item** from the current storage place."""
@@ -644,6 +849,11 @@ class Archive(AbstractArchive):
             key="usejeeves",
             default=False,
         )
+        self.default_batchget = config.get_from_config_w_default(
+            section="ftp",
+            key="batch_earlyget",
+            default=False,
+        )
 
     @property
     def _ftp_hostinfos(self):
@@ -763,20 +973,32 @@ class Archive(AbstractArchive):
         """
         If FtServ/ftraw is used, trigger a delayed action in order to fetch
         several files at once.
+
+        Otherwise, if ``batchget`` is *True* (default: the ``batch_earlyget``
+        setting of the ``ftp`` configuration section), trigger a delayed
+        action in order to fetch several files concurrently using Vortex's
+        FTP client.
         """
         cpipeline = kwargs.get("compressionpipeline", None)
         if self.sh.rawftget_worthy(item, local, cpipeline):
-            return self.context.delayedactions_hub.register(
-                (item, kwargs.get("fmt", "foo")),
-                kind="archive",
-                storage=self.storage,
-                goal="get",
-                tube="ftp",
-                raw=True,
-                logname=kwargs.get("username", None),
-            )
+            raw = True
+        elif (
+            kwargs.get("batchget", self.default_batchget)
+            and cpipeline is None
+            and isinstance(local, str)
+        ):
+            raw = False
         else:
             return None
+        return self.context.delayedactions_hub.register(
+            (item, kwargs.get("fmt", "foo")),
+            kind="archive",
+            storage=self.storage,
+            goal="get",
+            tube="ftp",
+            raw=raw,
+            logname=kwargs.get("username", None),
+        )
 
     def _ftpfinaliseretrieve(
         self, item, local, retrieve_id, **kwargs
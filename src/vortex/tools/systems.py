@@ -19,6 +19,7 @@ When working with System objects, preferentialy use high-level methods such as
 
 """
 
+import concurrent.futures
 import contextlib
 import errno
 import filecmp
@@ -63,6 +64,7 @@ from bronx.system.memory import LinuxMemInfo
 from bronx.system.numa import LibNumaNodesInfo
 from vortex.gloves import Glove
 from vortex.syntax.stdattrs import DelayedInit
+from vortex.tools import elf
 from vortex.tools.compression import CompressionPipeline
 from vortex.tools.env import Environment
 from vortex.tools.net import AssistedSsh, AutoRetriesFtp, DEFAULT_FTP_PORT
@@ -159,6 +161,10 @@ class CopyTreeError(OSError):
     pass
 
 
+#: Statistics on the latest copy (or hardlink) of a directory tree
+TreeCopyStats = namedtuple("TreeCopyStats", ("files", "bytes", "seconds"))
+
+
 class CdContext:
     """
     Context manager for temporarily changing the working directory.
@@ -793,6 +799,12 @@ class OSExtended(System):
     _abstract = True
     _footprint = dict(info="Abstract extended base system")
 
+    #: Protects the creation/destruction of the session wide FTP pool
+    _SESSION_FTPPOOL_LOCK = threading.Lock()
+    #: Limits the number of concurrent batch FTP transfers for a given host
+    _BATCHFTP_SEMAPHORES = dict()
+    _BATCHFTP_LOCK = threading.Lock()
+
     def __init__(self, *args, **kw):
         """
         Before going through parent initialisation (see :class:`System`),
@@ -810,6 +822,10 @@ class OSExtended(System):
             * **ftpflavour** - The default Vortex's FTP client behaviour
               (default: `FTP_FLAVOUR.CONNECTION_POOLS`). See the :meth:`ftp` method
               for more details.
+            * **ftpsessionpool** - Use a session wide FTP connection pool when
+              no :meth:`ftppool` context manager is active (default: the
+              ``session_pool`` setting of the ``ftp`` configuration section,
+              *True* if not specified).
         """
         logger.debug("Abstract System init %s", self.__class__)
         self._rmtreemin = kw.pop("rmtreemin", 3)
@@ -821,11 +837,17 @@ class OSExtended(System):
         # FTP stuff again
         self.ftpflavour = kw.pop("ftpflavour", FTP_FLAVOUR.CONNECTION_POOLS)
         self._current_ftppool = None
+        self.ftpsessionpool = kw.pop(
+            "ftpsessionpool",
+            config.get_from_config_w_default("ftp", "session_pool", True),
+        )
+        self._session_ftppool = None
         # Some internal variables used by particular methods
         self._ftspool_cache = None
         self._frozen_target = None
         # Hardlinks behaviour...
         self.allow_cross_users_links = True
+        self._treecopy_stats = None
         # Go for the superclass' constructor
         super().__init__(*args, **kw)
         # Initialise possibly missing objects
@@ -1663,8 +1685,18 @@ class OSExtended(System):
         in order to dispense FTP clients.
 
         When the context manager is exited, the FTP connection pool is destroyed
-        (and all the space FTP clients are closed).
+        (and all the space FTP clients are closed). However, if
+        `self.ftpsessionpool` is *True*, the session wide FTP connection pool
+        is used instead (see :meth:`ftp_session_pool`) and only the clients that
+        have been idle for too long are closed when the context manager exits.
         """
+        if self.ftpsessionpool and nrcfile is None:
+            pool = self.ftp_session_pool()
+            try:
+                yield pool
+            finally:
+                pool.expire()
+            return
         pool_control = self._current_ftppool is None
         if pool_control:
             self._current_ftppool = FtpConnectionPool(self, nrcfile=nrcfile)
@@ -1675,6 +1707,41 @@ class OSExtended(System):
                 self._current_ftppool.clear()
                 self._current_ftppool = None
 
+    def ftp_session_pool(self):
+        """The session wide FTP connection pool (created on demand).
+
+        It is used by the :meth:`ftp` method when `self.ftpsessionpool` is
+        *True*, which allows FTP connections to be re-used across stores and
+        archives lookups. It is cleared by :meth:`ftp_session_pool_clear`
+        (when the Vortex session is closed).
+
+        The connections of the pool can't be shared with a forked process:
+        in a child process, the parent's pool is discarded (without closing
+        its connections, that still belong to the parent process) and a new
+        one is created.
+        """
+        with self._SESSION_FTPPOOL_LOCK:
+            if (
+                self._session_ftppool is not None
+                and self._session_ftppool[0] != os.getpid()
+            ):
+                logger.debug("Discarding the parent's session FTP pool.")
+                self._session_ftppool = None
+            if self._session_ftppool is None:
+                self._session_ftppool = (os.getpid(), FtpConnectionPool(self))
+            return self._session_ftppool[1]
+
+    def ftp_session_pool_clear(self):
+        """Destroy the session wide FTP connection pool (if any)."""
+        with self._SESSION_FTPPOOL_LOCK:
+            owned = self._session_ftppool
+            self._session_ftppool = None
+        # The parent's pool is left alone in a forked process
+        if owned is not None and owned[0] == os.getpid():
+            pool = owned[1]
+            logger.debug("Clearing the session FTP pool:\n%s", str(pool))
+            pool.clear()
+
     def fix_fthostname(self, hostname, fatal=True):
         """If *hostname* is None, tries to find a default value for it."""
         if hostname is None:
@@ -1726,19 +1793,21 @@ class OSExtended(System):
               is returned. If the :meth:`ftp` method is called from within a context
               manager created by the :meth:`ftppool`, a
               :class:`~vortex.tools.net.FtpConnectionPool` object is used in order
-              to create and re-use FTP connections; Otherwise a "usual"
+              to create and re-use FTP connections; Otherwise, if
+              `self.ftpsessionpool` is *True*, the session wide FTP connection
+              pool is used (see :meth:`ftp_session_pool`). Otherwise a "usual"
               :class:`~vortex.tools.net.AutoRetriesFtp` is returned.
         """
         logname = self.fix_ftuser(hostname, logname)
         if port is None:
             port = DEFAULT_FTP_PORT
-        if (
-            self.ftpflavour == FTP_FLAVOUR.CONNECTION_POOLS
-            and self._current_ftppool is not None
-        ):
-            return self._current_ftppool.deal(
-                hostname, logname, port=port, delayed=delayed
-            )
+        pool = None
+        if self.ftpflavour == FTP_FLAVOUR.CONNECTION_POOLS:
+            pool = self._current_ftppool
+            if pool is None and self.ftpsessionpool:
+                pool = self.ftp_session_pool()
+        if pool is not None:
+            return pool.deal(hostname, logname, port=port, delayed=delayed)
         else:
             ftpclass = (
                 AutoRetriesFtp
@@ -2329,6 +2398,109 @@ class OSExtended(System):
                 fmt=fmt,
             )
 
+    def _batchftget_semaphore(self, hostname, port):
+        """The semaphore that limits concurrent transfers with **hostname**."""
+        with self._BATCHFTP_LOCK:
+            if (hostname, port) not in self._BATCHFTP_SEMAPHORES:
+                hostlimits = config.get_from_config_w_default(
+                    "ftp", "batch_hostlimits", dict()
+                )
+                limit = hostlimits.get(
+                    "{:s}:{:d}".format(hostname, port),
+                    hostlimits.get(
+                        hostname,
+                        config.get_from_config_w_default(
+                            "ftp", "batch_connections", 4
+                        ),
+                    ),
+                )
+                self._BATCHFTP_SEMAPHORES[(hostname, port)] = (
+                    threading.BoundedSemaphore(max(1, int(limit))),
+                    max(1, int(limit)),
+                )
+            return self._BATCHFTP_SEMAPHORES[(hostname, port)]
+
+    def batchftget(
+        self,
+        source,
+        destination,
+        hostname=None,
+        logname=None,
+        port=DEFAULT_FTP_PORT,
+        cpipeline=None,
+        fmt=None,
+        retries=None,
+    ):
+        """Get a list of files using several FTP connections concurrently.
+
+        :param source: A list of remote paths to get data
+        :param destination: A list of paths to the filenames where to put
+            the data
+        :param str hostname: The target hostname (see :class:`~vortex.tools.net.StdFtp`
+            for the default)
+        :param str logname: the target logname (see :class:`~vortex.tools.net.StdFtp`
+            for the default)
+        :param int port: the port number on the remote host.
+        :param CompressionPipeline cpipeline: If not *None*, the object used to
+            uncompress the data during the file transfer.
+        :param str fmt: The format of data.
+        :param int retries: The number of additional attempts for a failed
+            transfer (default: the ``batch_retries`` setting of the ``ftp``
+            configuration section, 1 if not specified).
+        :return: The list of return codes (one for each of the **source**)
+
+        The files are spread over several threads that use FTP clients
+        dispensed by a connection pool (see :meth:`ftppool`). The number of
+        concurrent transfers with a given host is limited (whatever the number
+        of simultaneous calls to this method): see the ``batch_connections``
+        and ``batch_hostlimits`` settings of the ``ftp`` configuration section.
+        """
+        hostname = self.fix_fthostname(hostname)
+        if port is None:
+            port = DEFAULT_FTP_PORT
+        if retries is None:
+            retries = config.get_from_config_w_default(
+                "ftp", "batch_retries", 1
+            )
+        semaphore, limit = self._batchftget_semaphore(hostname, port)
+
+        def _get_one(s, d):
+            rc = False
+            for attempt in range(int(retries) + 1):
+                if attempt:
+                    logger.warning(
+                        "FTP batch get of %s failed. Retrying (%d/%d).",
+                        s,
+                        attempt,
+                        retries,
+                    )
+                with semaphore:
+                    try:
+                        rc = self.ftget(
+                            s,
+                            d,
+                            hostname=hostname,
+                            logname=logname,
+                            port=port,
+                            cpipeline=cpipeline,
+                            fmt=fmt,
+                        )
+                    except (OSError, EOFError) as e:
+                        logger.warning("An FTP error occured: %s", str(e))
+                        rc = False
+                if rc:
+                    break
+            return bool(rc)
+
+        with self.ftppool():
+            workers = min(limit, len(source))
+            if workers <= 1:
+                return [_get_one(s, d) for s, d in zip(source, destination)]
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="vortex-ftpbatch"
+            ) as executor:
+                return list(executor.map(_get_one, source, destination))
+
     def smartbatchftget(
         self,
         source,
@@ -2355,6 +2527,7 @@ class OSExtended(System):
         :param CompressionPipeline cpipeline: If not *None*, the object used to
             uncompress the data during the file transfer.
         :param str fmt: The format of data.
+        :return: The list of return codes (one for each of the **source**)
         """
         if all(
             [
@@ -2373,21 +2546,15 @@ class OSExtended(System):
                 fmt=fmt,
             )
         else:
-            rc = True
-            if port is None:
-                port = DEFAULT_FTP_PORT
-            with self.ftppool():
-                for s, d in zip(source, destination):
-                    rc = rc and self.ftget(
-                        s,
-                        d,
-                        hostname=hostname,
-                        logname=logname,
-                        port=port,
-                        cpipeline=cpipeline,
-                        fmt=fmt,
-                    )
-            return rc
+            return self.batchftget(
+                source,
+                destination,
+                hostname=hostname,
+                logname=logname,
+                port=port,
+                cpipeline=cpipeline,
+                fmt=fmt,
+            )
 
     def ssh(self, hostname, logname=None, *args, **kw):
         """Return an :class:`~vortex.tools.net.AssistedSsh` object.
@@ -2569,12 +2736,180 @@ class OSExtended(System):
         else:
             return None
 
+    @property
+    def treecopy_stats(self):
+        """Statistics on the latest copy (or hardlink) of a directory tree.
+
+        :rtype: TreeCopyStats
+        """
+        return self._treecopy_stats
+
+    #: Filesystems where concurrent metadata operations pay off
+    _NETWORK_FSTYPES = frozenset(
+        [
+            "beegfs",
+            "ceph",
+            "cifs",
+            "fuse.glusterfs",
+            "fuse.sshfs",
+            "glusterfs",
+            "gpfs",
+            "lustre",
+            "nfs",
+            "nfs4",
+            "panfs",
+            "smb3",
+            "wekafs",
+        ]
+    )
+
+    _FSTYPES_CACHE = dict()
+
+    def _fstype(self, path):
+        """The type of the filesystem **path** belongs to (*None* if unknown)."""
+        try:
+            dev = self._os.stat(path).st_dev
+        except OSError:
+            return None
+        if dev not in self._FSTYPES_CACHE:
+            fstype = None
+            devid = "{:d}:{:d}".format(os.major(dev), os.minor(dev))
+            try:
+                with open("/proc/self/mountinfo", encoding="utf-8") as fhmi:
+                    for line in fhmi:
+                        fields = line.split(" - ", 1)
+                        if len(fields) == 2 and fields[0].split()[2] == devid:
+                            fstype = fields[1].split()[0]
+            except (OSError, IndexError):
+                pass
+            self._FSTYPES_CACHE[dev] = fstype
+        return self._FSTYPES_CACHE[dev]
+
+    def _treecopy_workers(self, *paths):
+        """The number of threads used to process a tree located on **paths**."""
+        if any([self._fstype(p) in self._NETWORK_FSTYPES for p in paths]):
+            return int(
+                config.get_from_config_w_default("treecopy", "workers", 8)
+            )
+        return int(
+            config.get_from_config_w_default("treecopy", "local_workers", 1)
+        )
+
+    def _treecopy_run(self, what, action, jobs, paths=()):
+        """Apply **action** to each of the **jobs** (concurrently if possible).
+
+        The number of threads is given by the ``workers`` setting of the
+        ``treecopy`` configuration section if one of the **paths** is on a
+        network (or parallel) filesystem, and by the ``local_workers``
+        setting otherwise. Small trees (less than ``min_files`` files) are
+        processed serially.
+
+        :param str what: A description of the operation (for logging)
+        :param action: A callable that returns a (rc, nbytes) tuple
+        :param list jobs: The list of arguments tuples for **action**
+        :param list paths: The source and destination of the tree
+        :return: The list of return codes
+        """
+        t0 = time.time()
+        workers = min(self._treecopy_workers(*paths), len(jobs))
+        if workers <= 1 or len(jobs) < int(
+            config.get_from_config_w_default("treecopy", "min_files", 32)
+        ):
+            results = [action(*job) for job in jobs]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="vortex-treecopy"
+            ) as executor:
+                results = list(executor.map(lambda job: action(*job), jobs))
+        stats = TreeCopyStats(
+            len(results), sum([r[1] for r in results]), time.time() - t0
+        )
+        self._treecopy_stats = stats
+        logger.info(
+            "%s: %d files (%d bytes) in %.3fs (%.0f files/s, %.2f MiB/s)",
+            what,
+            stats.files,
+            stats.bytes,
+            stats.seconds,
+            stats.files / max(stats.seconds, 1e-6),
+            stats.bytes / max(stats.seconds, 1e-6) / 1048576,
+        )
+        return [r[0] for r in results]
+
+    def _copyfile_data(self, source, destination):
+        """Copy the data of the **source** file (copy_file_range if possible).
+
+        copy_file_range lets the filesystem perform the copy (e.g. server-side
+        copies on network filesystems or reflinks on copy-on-write
+        filesystems).
+
+        :return: The number of bytes copied
+        """
+        st = self._os.stat(source)
+        if not stat.S_ISREG(st.st_mode) or not hasattr(
+            self._os, "copy_file_range"
+        ):
+            # Will raise a SpecialFileError for unsupported file types
+            self._sh.copyfile(source, destination)
+            return st.st_size
+        with open(source, "rb") as fsrc, open(destination, "wb") as fdst:
+            offset = 0
+            while True:
+                try:
+                    done = self._os.copy_file_range(
+                        fsrc.fileno(), fdst.fileno(), 1 << 30, offset, offset
+                    )
+                except OSError as e:
+                    if offset == 0 and e.errno in (
+                        errno.EXDEV,
+                        errno.ENOSYS,
+                        errno.EINVAL,
+                        errno.EOPNOTSUPP,
+                        errno.EPERM,
+                    ):
+                        # Not supported by the filesystem (or the kernel)
+                        self._sh.copyfileobj(fsrc, fdst)
+                        return st.st_size
+                    raise
+                if not done:
+                    break
+                offset += done
+        return offset
+
+    def _copydatatree_walk(self, src, dst, keep_symlinks_below, files, errors):
+        """Create the **dst** directory tree and list the files to copy."""
+        entries = list(self._os.scandir(src))
+        self._os.makedirs(dst)
+        for entry in entries:
+            srcname = entry.path
+            dstname = self._os.path.join(dst, entry.name)
+            try:
+                if entry.is_dir():
+                    self._copydatatree_walk(
+                        srcname, dstname, keep_symlinks_below, files, errors
+                    )
+                elif entry.is_symlink():
+                    linkto = self._validate_symlink_below(
+                        srcname, keep_symlinks_below
+                    )
+                    if linkto is not None:
+                        self._os.symlink(linkto, dstname)
+                    else:
+                        files.append((srcname, dstname))
+                else:
+                    files.append((srcname, dstname))
+            except OSError as why:
+                errors.append((srcname, dstname, str(why)))
+
     def _copydatatree(self, src, dst, keep_symlinks_below=None):
         """Recursively copy a directory tree using copyfile.
 
         This is a variant of shutil's copytree. But, unlike with copytree,
         only data are copied (the permissions, access times, ... are ignored).
 
+        The directory tree is created first, then the files are copied
+        concurrently (see :meth:`_treecopy_run`).
+
         The destination directory must not already exist.
         """
         self.stderr("_copydatatree", src, dst)
@@ -2582,36 +2917,22 @@ class OSExtended(System):
             keep_symlinks_below = keep_symlinks_below or self.path.realpath(
                 self.path.abspath(src)
             )
-            names = self._os.listdir(src)
-            self._os.makedirs(dst)
-            errors = []
-            for name in names:
-                srcname = self._os.path.join(src, name)
-                dstname = self._os.path.join(dst, name)
+            files = list()
+            errors = list()
+            self._copydatatree_walk(
+                src, dst, keep_symlinks_below, files, errors
+            )
+
+            def _copy_one(srcname, dstname):
                 try:
-                    if self.path.isdir(srcname):
-                        self._copydatatree(
-                            srcname,
-                            dstname,
-                            keep_symlinks_below=keep_symlinks_below,
-                        )
-                    elif self._os.path.islink(srcname):
-                        linkto = self._validate_symlink_below(
-                            srcname, keep_symlinks_below
-                        )
-                        if linkto is not None:
-                            self._os.symlink(linkto, dstname)
-                        else:
-                            self._sh.copyfile(srcname, dstname)
-                    else:
-                        # Will raise a SpecialFileError for unsupported file types
-                        self._sh.copyfile(srcname, dstname)
-                # catch the Error from the recursive copytree so that we can
-                # continue with other files
-                except CopyTreeError as err:
-                    errors.extend(err.args[0])
+                    return True, self._copyfile_data(srcname, dstname)
                 except OSError as why:
                     errors.append((srcname, dstname, str(why)))
+                    return False, 0
+
+            self._treecopy_run(
+                "_copydatatree " + src, _copy_one, files, paths=(src, dst)
+            )
             if errors:
                 raise CopyTreeError(errors)
         return dst
@@ -2773,6 +3094,44 @@ class OSExtended(System):
             rc = self.path.samefile(source, destination)
         return rc
 
+    def _hardlink_walk(
+        self, source, destination, keep_symlinks_below, files, dirs
+    ):
+        """Create the **destination** directory tree and list the files to link."""
+        entries = list(self._os.scandir(source))
+        self._os.makedirs(destination)
+        dirs.append((source, destination))
+        for entry in entries:
+            srcname = entry.path
+            dstname = self._os.path.join(destination, entry.name)
+            if entry.is_symlink():
+                linkto = self._validate_symlink_below(
+                    srcname, keep_symlinks_below
+                )
+                if linkto is None:
+                    link_target = self.path.join(
+                        self.path.dirname(srcname),
+                        self._os.readlink(srcname),
+                    )
+                    if self.path.isdir(link_target):
+                        self._hardlink_walk(
+                            link_target,
+                            dstname,
+                            keep_symlinks_below,
+                            files,
+                            dirs,
+                        )
+                    else:
+                        files.append((link_target, dstname))
+                else:
+                    self._os.symlink(linkto, dstname)
+            elif entry.is_dir():
+                self._hardlink_walk(
+                    srcname, dstname, keep_symlinks_below, files, dirs
+                )
+            else:
+                files.append((srcname, dstname))
+
     def hardlink(
         self,
         source,
@@ -2810,64 +3169,44 @@ class OSExtended(System):
             )
             with self.mute_stderr():
                 # Mimics 'cp -al'
-                names = self._os.listdir(source)
-                self._os.makedirs(destination)
-                rc = True
-                for name in names:
-                    srcname = self._os.path.join(source, name)
-                    dstname = self._os.path.join(destination, name)
-                    if self._os.path.islink(srcname):
-                        linkto = self._validate_symlink_below(
-                            srcname, keep_symlinks_below
-                        )
-                        if linkto is None:
-                            link_target = self.path.join(
-                                self.path.dirname(srcname),
-                                self._os.readlink(srcname),
-                            )
-                            rc = self.hardlink(
-                                link_target,
-                                dstname,
-                                link_threshold=link_threshold,
-                                readonly=readonly,
-                                securecopy=securecopy,
-                                keep_symlinks_below=keep_symlinks_below,
-                            )
-                        else:
-                            self._os.symlink(linkto, dstname)
-                    elif self.path.isdir(srcname):
-                        rc = self.hardlink(
-                            srcname,
-                            dstname,
-                            link_threshold=link_threshold,
-                            readonly=readonly,
-                            securecopy=securecopy,
-                            keep_symlinks_below=keep_symlinks_below,
+                files = list()
+                dirs = list()
+                self._hardlink_walk(
+                    source, destination, keep_symlinks_below, files, dirs
+                )
+
+                def _link_one(srcname, dstname):
+                    st = self._os.stat(srcname)
+                    if link_threshold and st.st_size < link_threshold:
+                        rc = self._rawcp_instead_of_hardlink(
+                            srcname, dstname, securecopy=securecopy
                         )
                     else:
-                        if (
-                            link_threshold
-                            and self.size(srcname) < link_threshold
-                        ):
-                            rc = self._rawcp_instead_of_hardlink(
-                                srcname, dstname, securecopy=securecopy
-                            )
-                        else:
-                            rc = self._safe_hardlink(
-                                srcname, dstname, securecopy=securecopy
-                            )
-                        if readonly and rc:
-                            self.readonly(dstname)
+                        rc = self._safe_hardlink(
+                            srcname, dstname, securecopy=securecopy
+                        )
+                    if readonly and rc:
+                        self.readonly(dstname)
                     if not rc:
                         logger.error(
                             "Error while processing %s (rc=%s)",
                             srcname,
                             str(rc),
                         )
-                        break
+                    return rc, st.st_size
+
+                rc = all(
+                    self._treecopy_run(
+                        "hardlink " + source,
+                        _link_one,
+                        files,
+                        paths=(source, destination),
+                    )
+                )
                 if rc:
-                    self._sh.copystat(source, destination)
-                    self.wperm(destination, force=True)
+                    for srcdir, dstdir in reversed(dirs):
+                        self._sh.copystat(srcdir, dstdir)
+                        self.wperm(dstdir, force=True)
                 return rc
         else:
             if link_threshold and self.size(source) < link_threshold:
@@ -3003,11 +3342,20 @@ class OSExtended(System):
                 )  # Rawcp is atomic as much as possible
                 if rc:
                     if self.path.isdir(destination):
-                        for copiedfile in self.ffind(destination):
-                            if not self.path.islink(
-                                copiedfile
-                            ):  # This make no sense to chmod symlinks
+
+                        def _chmod_one(copiedfile):
+                            # This make no sense to chmod symlinks
+                            if not self.path.islink(copiedfile):
                                 self.chmod(copiedfile, 0o444)
+                            return True, 0
+
+                        with self.mute_stderr():
+                            self._treecopy_run(
+                                "readonly " + destination,
+                                _chmod_one,
+                                [(f,) for f in self.ffind(destination)],
+                                paths=(destination,),
+                            )
                     else:
                         self.readonly(destination)
                 return rc
@@ -3532,11 +3880,26 @@ class OSExtended(System):
     )
 
     def ldd(self, filename):
-        """Call ldd on **filename**.
+        """Find the shared libraries needed by **filename** (like ldd does).
 
         Return the mapping between the library name and its physical path.
+
+        ELF binaries are analysed in-process (and the results are cached, see
+        :mod:`vortex.tools.elf`). Otherwise, the ``ldd`` command is called.
         """
         if self.path.isfile(filename):
+            resolver = elf.ldd_resolver()
+            if resolver is not None:
+                try:
+                    libs = resolver.ldd(
+                        filename,
+                        ld_library_path=self.env.get("LD_LIBRARY_PATH", ""),
+                    )
+                except OSError as e:
+                    logger.debug("In-process ldd failed: %s", str(e))
+                    libs = None
+                if libs is not None:
+                    return libs
             ldd_out = self.spawn(("ldd", filename))
             libs = dict()
             for ldd_match in [self._LDD_REGEX.match(l) for l in ldd_out]:
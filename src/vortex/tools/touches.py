@@ -0,0 +1,177 @@
+"""
+Touch directories lazily (updating their modification time).
+
+Caches may "touch" the parent directories of the files they hand over
+(see the ``rtouch`` attribute of :class:`~vortex.tools.storage.Cache`
+objects) so that cleaning scripts can tell which directories are still in
+use. During a big input phase, the same directories are touched over and
+over, which puts a heavy load on the metadata servers of shared
+filesystems.
+
+The :class:`DeferredTouches` class collects the directories that need to
+be touched: each directory is touched (with :func:`os.utime`) only once
+per batch, when :meth:`DeferredTouches.flush` is called or, at the latest,
+``delay`` seconds after the first request of the batch (a background
+timer is used). Pending touches are also flushed when the resources of a
+:class:`~vortex.layout.contexts.Context` are freed and when the process
+exits. There is one such object per process (see the
+:func:`deferred_touches` function).
+
+Example::
+
+    >>> from vortex.tools.touches import deferred_touches
+    >>> dtouches = deferred_touches()
+    >>> dtouches.request(['/my/cache/a/b', '/my/cache/a'])  # doctest: +SKIP
+    >>> dtouches.request(['/my/cache/a/c', '/my/cache/a'])  # doctest: +SKIP
+    >>> dtouches.flush()  # doctest: +SKIP
+    3
+
+The default settings can be changed in the ``cache`` section of the
+configuration file::
+
+    [cache]
+    rtouch_deferred = true
+    rtouch_flush_delay = 5.
+"""
+
+import atexit
+import collections
+import os
+import threading
+import time
+
+from bronx.fancies import loggers
+
+from vortex.config import get_from_config_w_default
+
+#: No automatic export
+__all__ = []
+
+logger = loggers.getLogger(__name__)
+
+
+class DeferredTouches:
+    """Collect the directories that need to be touched and touch them once."""
+
+    def __init__(self, active=None, delay=None):
+        """
+        :param bool active: Are touches deferred at all ? (if not, each
+                            request is honoured immediately)
+        :param float delay: The maximum number of seconds a touch may be
+                            deferred
+        """
+        self.active = bool(
+            get_from_config_w_default("cache", "rtouch_deferred", True)
+            if active is None
+            else active
+        )
+        self.delay = float(
+            get_from_config_w_default("cache", "rtouch_flush_delay", 5.0)
+            if delay is None
+            else delay
+        )
+        self._lock = threading.Lock()
+        self._pending = dict()
+        self._touched = dict()
+        self._timer = None
+        self._stats = collections.Counter()
+
+    @property
+    def stats(self):
+        """A dictionary with the number of requested, coalesced, throttled
+        and actual touches (``saved`` is the number of touches avoided)."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["saved"] = stats.get("requested", 0) - stats.get("touched", 0)
+        return stats
+
+    @property
+    def pending(self):
+        """The number of directories waiting to be touched."""
+        with self._lock:
+            return len(self._pending)
+
+    def request(self, paths, mindelay=0.0):
+        """Ask for the **paths** directories to be touched.
+
+        :param list paths: The directories to touch
+        :param float mindelay: Do not touch a directory that was already
+                               touched in the last **mindelay** seconds
+        """
+        now = time.time()
+        with self._lock:
+            for path in paths:
+                self._stats["requested"] += 1
+                if path in self._pending:
+                    self._stats["coalesced"] += 1
+                elif now - self._touched.get(path, 0) <= mindelay:
+                    self._stats["throttled"] += 1
+                else:
+                    self._pending[path] = now
+            start_timer = (
+                self.active
+                and self._pending
+                and (self._timer is None or not self._timer.is_alive())
+            )
+            if start_timer:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if not self.active:
+            self.flush()
+
+    def flush(self):
+        """Touch the pending directories.
+
+        :return: The number of touched directories
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = dict()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        ntouched = 0
+        for path in pending:
+            try:
+                os.utime(path, None)
+            except OSError as e:
+                logger.debug("Could not touch %s: %s", path, str(e))
+            else:
+                ntouched += 1
+        if pending:
+            logger.debug(
+                "%d directories touched (%d requested)", ntouched, len(pending)
+            )
+            now = time.time()
+            with self._lock:
+                self._touched.update(dict.fromkeys(pending, now))
+                self._stats["touched"] += ntouched
+        return ntouched
+
+    def _after_fork(self):
+        """In a forked process, the lock and timer must be reset."""
+        self._lock = threading.Lock()
+        self._timer = None
+
+
+_DEFERRED_TOUCHES = None
+
+_DEFERRED_TOUCHES_LOCK = threading.Lock()
+
+
+def deferred_touches():
+    """Return the process-wide :class:`DeferredTouches` object."""
+    global _DEFERRED_TOUCHES
+    with _DEFERRED_TOUCHES_LOCK:
+        if _DEFERRED_TOUCHES is None:
+            _DEFERRED_TOUCHES = DeferredTouches()
+            atexit.register(_DEFERRED_TOUCHES.flush)
+            os.register_at_fork(after_in_child=_DEFERRED_TOUCHES._after_fork)
+    return _DEFERRED_TOUCHES
+
+
+def flush():
+    """Touch the pending directories (if any)."""
+    if _DEFERRED_TOUCHES is not None:
+        _DEFERRED_TOUCHES.flush()
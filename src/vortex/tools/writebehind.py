@@ -0,0 +1,224 @@
+"""
+Perform some actions (typically cache refills) asynchronously.
+
+One :class:`WriteBehindQueue` object is created in each
+:class:`~vortex.layout.contexts.Context` (see
+:meth:`vortex.layout.contexts.Context.writebehind_queue`). It is used by
+:class:`~vortex.data.abstractstores.MultiStore` objects in order to refill
+the upper (cache) stores in background threads: the data are made
+available to the caller as soon as the local copy is done.
+
+Example::
+
+    >>> from vortex import sessions
+    >>> wbqueue = sessions.current().context.writebehind_queue
+
+    # Stage a copy of the file (the original may be modified by the caller)
+
+    >>> staged = wbqueue.stage('my_input_file', intent='in')  # doctest: +SKIP
+
+    # Use the staged copy in a background thread (it is removed afterwards)
+
+    >>> wbqueue.submit('refill', store.put, staged, remote,
+    ...                staged=staged)  # doctest: +SKIP
+
+    # Wait for all the submitted actions to complete
+
+    >>> wbqueue.flush()  # doctest: +SKIP
+
+The default settings can be changed in the ``writebehind`` section of the
+configuration file::
+
+    [writebehind]
+    workers = 2
+    maxsize = 32
+"""
+
+import collections
+import concurrent.futures
+import itertools
+import tempfile
+import threading
+
+from bronx.fancies import loggers
+
+from vortex.config import get_from_config_w_default
+
+#: No automatic export
+__all__ = []
+
+logger = loggers.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """A bounded queue of actions that are performed by background threads."""
+
+    def __init__(self, sh, contextrundir, maxsize=None, workers=None):
+        """
+        :param vortex.tools.systems.OSExtended sh: The current usable System object
+        :param str contextrundir: The current context's run directory where the
+                                  staging area/directory will be created. If ``None``,
+                                  the staging directory is created in the current
+                                  working directory.
+        :param int maxsize: The maximum number of pending actions (when it is
+                            reached, :meth:`submit` blocks)
+        :param int workers: The number of background threads
+        """
+        self._sh = sh
+        self._contextrundir = contextrundir
+        self._stagedir = None
+        self._maxsize = int(
+            maxsize or get_from_config_w_default("writebehind", "maxsize", 32)
+        )
+        self._workers = int(
+            workers or get_from_config_w_default("writebehind", "workers", 2)
+        )
+        self._slots = threading.BoundedSemaphore(self._maxsize)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = set()
+        self._counter = itertools.count()
+        self._stats = collections.Counter()
+
+    @property
+    def stagedir(self):
+        """This queue staging area/directory (where staged copies are stored)."""
+        if self._stagedir is None or not self._sh.path.isdir(self._stagedir):
+            self._stagedir = tempfile.mkdtemp(
+                prefix="writebehind_staging_area_",
+                dir=(
+                    self._contextrundir
+                    if self._contextrundir
+                    else self._sh.pwd()
+                ),
+            )
+        return self._stagedir
+
+    @property
+    def stats(self):
+        """The number of submitted, successful and failed actions."""
+        with self._lock:
+            return dict(self._stats)
+
+    @property
+    def pending(self):
+        """The number of actions that are not completed yet."""
+        with self._lock:
+            return len([f for f in self._pending if not f.done()])
+
+    def stage(self, local, fmt=None, intent="in"):
+        """Create a copy of **local** in the staging area.
+
+        If **intent** is ``in``, the local file is not supposed to change: a
+        hard link is created whenever possible. Otherwise, a real copy is made.
+
+        :return: The path to the staged copy (*None* if it fails)
+        """
+        if not isinstance(local, str):
+            return None
+        staged = self._sh.path.join(
+            self.stagedir,
+            "{:06d}_{:s}".format(
+                next(self._counter), self._sh.path.basename(local)
+            ),
+        )
+        try:
+            rc = self._sh.cp(local, staged, fmt=fmt, intent=intent)
+        except OSError as e:
+            logger.warning("Unable to stage %s: %s", local, str(e))
+            rc = False
+        return staged if rc else None
+
+    def submit(self, description, callback, *kargs, **kwargs):
+        """Call **callback** (with **kargs** and **kwargs**) in a background thread.
+
+        :param str description: A short description used in log messages
+        :param callable callback: The action to perform. It is considered to be
+                                  failed if it returns a false value or raises
+                                  an exception.
+        :param str staged: The path to a staged copy (see :meth:`stage`) that
+                           will be removed once the action is done.
+        :return: A :class:`concurrent.futures.Future` object
+        """
+        staged = kwargs.pop("staged", None)
+        self._slots.acquire()
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self._workers,
+                    thread_name_prefix="vortex-writebehind",
+                )
+            future = self._executor.submit(
+                self._run, description, callback, kargs, kwargs, staged
+            )
+            self._pending.add(future)
+            self._stats["submitted"] += 1
+        future.add_done_callback(self._done)
+        logger.debug("Write-behind action submitted: %s", description)
+        return future
+
+    def _run(self, description, callback, kargs, kwargs, staged):
+        """Perform the action and keep track of its outcome."""
+        try:
+            rc = callback(*kargs, **kwargs)
+        except Exception as e:
+            logger.error(
+                "Write-behind action failed (%s): %s", description, str(e)
+            )
+            rc = False
+        else:
+            if not rc:
+                logger.warning("Write-behind action failed: %s", description)
+        finally:
+            if staged is not None:
+                try:
+                    self._sh.remove(staged)
+                except OSError as e:
+                    logger.warning("Unable to remove %s: %s", staged, str(e))
+        with self._lock:
+            self._stats["done" if rc else "failed"] += 1
+        return rc
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+        self._slots.release()
+
+    def flush(self):
+        """Wait for all the pending actions to complete.
+
+        :return: The number of actions that failed since the queue's creation.
+        """
+        with self._lock:
+            pending = list(self._pending)
+        if pending:
+            logger.info(
+                "Waiting for %d write-behind action(s) to complete.",
+                len(pending),
+            )
+            concurrent.futures.wait(pending)
+        stats = self.stats
+        if stats.get("failed", 0):
+            logger.warning(
+                "%d write-behind action(s) failed (out of %d).",
+                stats["failed"],
+                stats["submitted"],
+            )
+        return stats.get("failed", 0)
+
+    def clear(self):
+        """Wait for the pending actions, then release all the resources."""
+        self.flush()
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if self._stagedir is not None:
+            self._sh.remove(self._stagedir)
+            self._stagedir = None
+
+    def __repr__(self):
+        return "{:s} | pending={:d}>".format(
+            super().__repr__().rstrip(">"), self.pending
+        )
@@ -0,0 +1,287 @@
+"""
+Memoize the outcome of footprints resolutions.
+
+Creating a resource handler (see :func:`vortex.toolbox.rload`) requires to
+pick up a resource, a provider and a container. Each pickup goes through
+the footprints of all the candidate classes of the collector, which is the
+dominant cost when thousands of similar resources are declared (e.g.
+ensemble members x terms).
+
+The :class:`FootprintResolutionCache` class remembers which class won a
+given pickup. Descriptions are normalised (after the merge of
+``footprints.setup.defaults``): the values of the attributes that may
+discriminate a class from another (i.e. attributes with ``values``,
+``outcast`` or ``remap`` settings, or involved in ``only`` clauses) are
+part of the cache key. For the other attributes, only the type of the value
+is taken into account, along with whether the value can be converted to
+each of the types declared by the candidate classes (e.g. ``term='12'``
+and ``term='abc'`` do not share an entry if some candidate declares an
+``int`` term). When a description matches a cache entry, the footprint of
+the remembered class is checked (to resolve the actual attributes' values)
+and the class is instantiated: other candidates are not considered.
+
+The cache entries of a given collector are discarded whenever classes are
+added to, removed from or replaced in the collector and whenever priority
+levels change.
+
+Example::
+
+    >>> import footprints
+    >>> from vortex.util.fpcache import resolution_cache
+    >>> rcache = resolution_cache()
+    >>> desc, _ = rcache.pickup_and_cache(footprints.proxy.containers,
+    ...                                   dict(local='toto'))
+    >>> desc['container']  # doctest: +ELLIPSIS
+    <vortex.data.containers.SingleFile object at 0x...>
+"""
+
+import collections
+import threading
+
+from bronx.fancies import loggers
+import footprints
+from footprints import priorities
+
+#: No automatic export
+__all__ = []
+
+logger = loggers.getLogger(__name__)
+
+_SIMPLE_TYPES = (str, int, float, bool, type(None))
+
+
+class _NotHashable:
+    """Any unhashable value (it never matches a cache entry)."""
+
+
+def _hashable(value):
+    """Return a hashable representation of **value** (for cache keys)."""
+    if isinstance(value, _SIMPLE_TYPES):
+        return value
+    try:
+        hash(value)
+    except TypeError:
+        if isinstance(value, (list, tuple)):
+            return (type(value), tuple([_hashable(v) for v in value]))
+        return _NotHashable
+    return (type(value), value)
+
+
+def _converts(value, ktype, kwargs, isclass):
+    """Would footprints accept **value** for an attribute of type **ktype** ?"""
+    if isclass:
+        return isinstance(value, type) and issubclass(value, ktype)
+    if isinstance(value, ktype):
+        return True
+    try:
+        ktype(value, **kwargs)
+    except (ValueError, TypeError, footprints.FootprintException):
+        return False
+    return True
+
+
+class _CollectorEntries:
+    """The cache entries of a given collector."""
+
+    def __init__(self, collector):
+        self.winners = collections.OrderedDict()
+        self._fasttrack = tuple(sorted(collector.fasttrack))
+        self._discriminating = dict()
+        self._classes = frozenset(collector.items())
+        self._levels = priorities.top.levels
+        self._priorities = [
+            (prio, prio["level"])
+            for prio in [
+                cls.footprint_retrieve().priority for cls in self._classes
+            ]
+        ]
+
+    def uptodate(self, collector):
+        """Are the classes of **collector** and their priorities unchanged ?"""
+        return (
+            self._levels == priorities.top.levels
+            and self._classes == set(collector.items())
+            and all([prio["level"] is lvl for prio, lvl in self._priorities])
+        )
+
+    def discriminating(self, desc):
+        """The attributes whose values matter for **desc**.
+
+        :return: A tuple: the set of attributes whose values are part of the
+                 cache key and a dictionary of the types that the other
+                 attributes are converted to (by any candidate class)
+        """
+        ftkey = tuple([_hashable(desc.get(k)) for k in self._fasttrack])
+        attrs = self._discriminating.get(ftkey)
+        if attrs is None:
+            attrs = set()
+            typed = collections.defaultdict(list)
+            for cls in self._classes:
+                fp = cls.footprint_retrieve()
+                if any(
+                    [
+                        fp.attr.get(k, dict()).get("values")
+                        and desc.get(k) not in fp.attr[k]["values"]
+                        and desc.get(k) not in fp.attr[k]["remap"]
+                        for k in self._fasttrack
+                        if isinstance(desc.get(k), str)
+                    ]
+                ):
+                    # This class could not possibly be picked up
+                    continue
+                for k, kdef in fp.attr.items():
+                    if kdef["values"] or kdef["outcast"] or kdef["remap"]:
+                        attrs.add(k)
+                        attrs.update(kdef["alias"])
+                    ktype = kdef.get("type", str)
+                    if ktype is not str or kdef.get("isclass", False):
+                        conversion = (
+                            ktype,
+                            kdef.get("args", dict()),
+                            kdef.get("isclass", False),
+                        )
+                        for name in (k,) + tuple(kdef["alias"]):
+                            if conversion not in typed[name]:
+                                typed[name].append(conversion)
+                for k in fp.only:
+                    attrs.add(k.partition("_")[-1] if "_" in k else k)
+                    attrs.add(k)
+            attrs = (
+                frozenset(attrs),
+                {k: tuple(v) for k, v in typed.items() if k not in attrs},
+            )
+            self._discriminating[ftkey] = attrs
+        return attrs
+
+
+class FootprintResolutionCache:
+    """Remember the classes picked up by footprints collectors."""
+
+    def __init__(self, maxsize=4096):
+        """
+        :param int maxsize: The maximum number of entries per collector
+        """
+        self.maxsize = maxsize
+        self.active = True
+        self._lock = threading.Lock()
+        self._collectors = dict()
+        self._stats = collections.Counter()
+
+    @property
+    def stats(self):
+        """A dictionary with the number of hits, misses and fallbacks."""
+        with self._lock:
+            return dict(self._stats)
+
+    def clear(self):
+        """Forget about everything (and reset the statistics)."""
+        with self._lock:
+            self._collectors.clear()
+            self._stats.clear()
+
+    def _entries(self, collector):
+        entries = self._collectors.get(collector.tag)
+        if entries is None or not entries.uptodate(collector):
+            if entries is not None:
+                logger.debug(
+                    "The %s collector changed: its resolution cache is reset",
+                    collector.tag,
+                )
+            entries = _CollectorEntries(collector)
+            self._collectors[collector.tag] = entries
+        return entries
+
+    def _key(self, entries, desc):
+        """The normalised description (or *None* if it can't be cached)."""
+        fulldesc = dict(footprints.setup.defaults)
+        fulldesc.update(desc)
+        discriminating, typed = entries.discriminating(fulldesc)
+        # Replacement sequences (e.g. "[format]") make the referenced values
+        # discriminating too
+        refs = set()
+        for k, v in fulldesc.items():
+            if (
+                (k in discriminating or k in typed)
+                and isinstance(v, str)
+                and "[" in v
+            ):
+                refs.update([m[0] for m in footprints.replattr.findall(v)])
+                refs.add(k)
+        if refs:
+            discriminating = discriminating | refs
+        key = list()
+        for k in sorted(fulldesc.keys()):
+            v = fulldesc[k]
+            if k in discriminating:
+                v = _hashable(v)
+                if v is _NotHashable:
+                    return None
+                key.append((k, v))
+            elif k in typed:
+                try:
+                    converts = tuple(
+                        [_converts(v, *conversion) for conversion in typed[k]]
+                    )
+                except Exception:
+                    # Let the footprints package deal with it
+                    return None
+                key.append((k, type(v), converts))
+            else:
+                # A "None" string is rejected by any footprint
+                key.append((k, type(v), v == "None"))
+        return tuple(key)
+
+    def pickup_and_cache(self, collector, desc, resolvecache=None):
+        """Same as the collector's ``pickup_and_cache`` method, but memoized.
+
+        :param collector: The footprints collector
+        :param dict desc: The description of the object to pick up
+        """
+        if (
+            not self.active
+            or desc.get(collector.tag) is not None
+            or any([k.startswith("_") for k in desc])
+        ):
+            return collector.pickup_and_cache(desc, resolvecache=resolvecache)
+        with self._lock:
+            entries = self._entries(collector)
+            key = self._key(entries, desc)
+            winner = entries.winners.get(key) if key is not None else None
+            if winner is not None:
+                entries.winners.move_to_end(key)
+        if winner is not None:
+            if resolvecache is None:
+                resolvecache = footprints.collectors.ResolveCache()
+            resolved, _ = winner.footprint_couldbe(
+                desc, resolvecache=resolvecache
+            )
+            if resolved:
+                with self._lock:
+                    self._stats["hits"] += 1
+                desc[collector.tag] = winner(resolved, checked=True)
+                return (
+                    desc[collector.tag].footprint_cleanup(desc),
+                    resolvecache,
+                )
+            with self._lock:
+                self._stats["fallbacks"] += 1
+        else:
+            with self._lock:
+                self._stats["misses"] += 1
+        desc, resolvecache = collector.pickup_and_cache(
+            desc, resolvecache=resolvecache
+        )
+        if key is not None and desc.get(collector.tag) is not None:
+            with self._lock:
+                entries.winners[key] = desc[collector.tag].__class__
+                while len(entries.winners) > self.maxsize:
+                    entries.winners.popitem(last=False)
+        return desc, resolvecache
+
+
+_RESOLUTION_CACHE = FootprintResolutionCache()
+
+
+def resolution_cache():
+    """Return the process-wide :class:`FootprintResolutionCache` object."""
+    return _RESOLUTION_CACHE
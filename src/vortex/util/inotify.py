@@ -0,0 +1,226 @@
+"""
+Watch the changes of files in a set of directories (Linux inotify).
+
+The Linux inotify API is accessed through :mod:`ctypes` (no additional
+package or service is needed). On other platforms, or if the C library does
+not provide the inotify functions, :func:`inotify_available` returns
+*False* and :class:`DirectoryWatcher` objects can't be created.
+
+Example::
+
+    >>> from vortex.util.inotify import DirectoryWatcher, inotify_available
+    >>> if inotify_available():  # doctest: +SKIP
+    ...     with DirectoryWatcher() as watcher:
+    ...         watcher.watch('/my/directory')
+    ...         changed = watcher.wait(timeout=1.)
+
+:meth:`DirectoryWatcher.wait` returns the set of paths that changed (i.e.
+files that were created, written, deleted or renamed in the watched
+directories). It returns *None* if some events were lost: in such a case,
+anything might have changed.
+
+Notice that, on network filesystems (e.g. Lustre or NFS), only the changes
+made by the current host are notified: inotify can't replace a periodic
+check entirely.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+
+from bronx.fancies import loggers
+
+#: No automatic export
+__all__ = []
+
+logger = loggers.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+#: The events that are watched by default
+IN_DEFAULT_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+
+#: The fixed-size part of a ``struct inotify_event``
+_EVENT_STRUCT = struct.Struct("iIII")
+
+_LIBC = None
+
+
+def _libc():
+    """Load the C library and check that it provides the inotify API."""
+    global _LIBC
+    if _LIBC is None:
+        _LIBC = False
+        if sys.platform.startswith("linux"):
+            try:
+                libc = ctypes.CDLL(
+                    ctypes.util.find_library("c") or "libc.so.6",
+                    use_errno=True,
+                )
+                libc.inotify_init1.argtypes = [ctypes.c_int]
+                libc.inotify_add_watch.argtypes = [
+                    ctypes.c_int,
+                    ctypes.c_char_p,
+                    ctypes.c_uint32,
+                ]
+                libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+            except (OSError, AttributeError) as e:
+                logger.debug("The inotify API is not available: %s", str(e))
+            else:
+                _LIBC = libc
+    return _LIBC or None
+
+
+def inotify_available():
+    """Is the inotify API available on this system ?"""
+    return _libc() is not None
+
+
+def _oserror(what):
+    eno = ctypes.get_errno()
+    return OSError(eno, "{:s}: {:s}".format(what, os.strerror(eno)))
+
+
+class DirectoryWatcher:
+    """Watch the changes of files in a set of directories.
+
+    The watcher must be closed when it is no longer used (it can be used
+    as a context manager).
+    """
+
+    def __init__(self, mask=IN_DEFAULT_MASK):
+        """
+        :param int mask: The inotify events that are watched
+        :raise OSError: if the inotify API is not available (or fails)
+        """
+        libc = _libc()
+        if libc is None:
+            raise OSError(
+                errno.ENOSYS, "The inotify API is not available on this system"
+            )
+        self._libc = libc
+        self._mask = mask | IN_ONLYDIR
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise _oserror("inotify_init1")
+        self._wd2dir = dict()
+        self._dir2wd = dict()
+
+    @property
+    def fileno(self):
+        """The inotify file descriptor (that may be used in a select call)."""
+        return self._fd
+
+    @property
+    def watched(self):
+        """The set of watched directories."""
+        return set(self._dir2wd)
+
+    def watch(self, directory):
+        """Start watching **directory**.
+
+        :return: *False* if **directory** can't be watched
+        """
+        directory = os.path.abspath(directory)
+        if directory in self._dir2wd:
+            return True
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(directory), self._mask
+        )
+        if wd < 0:
+            logger.debug("%s", str(_oserror(directory)))
+            return False
+        self._wd2dir[wd] = directory
+        self._dir2wd[directory] = wd
+        return True
+
+    def unwatch(self, directory):
+        """Stop watching **directory**."""
+        wd = self._dir2wd.pop(os.path.abspath(directory), None)
+        if wd is not None:
+            del self._wd2dir[wd]
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _read_events(self):
+        """Read and decode the pending events."""
+        changed = set()
+        overflow = False
+        while True:
+            try:
+                buf = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _, namelen = _EVENT_STRUCT.unpack_from(buf, offset)
+                offset += _EVENT_STRUCT.size
+                name = buf[offset : offset + namelen].rstrip(b"\0")
+                offset += namelen
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                directory = self._wd2dir.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_IGNORED:
+                    # The directory was removed (or unmounted)
+                    del self._wd2dir[wd]
+                    del self._dir2wd[directory]
+                if name:
+                    changed.add(os.path.join(directory, os.fsdecode(name)))
+                else:
+                    changed.add(directory)
+        return None if overflow else changed
+
+    def wait(self, timeout=None):
+        """Wait for some changes (at most **timeout** seconds).
+
+        :return: The set of paths that changed (possibly empty if the
+                 timeout was reached) or *None* if some events were lost.
+        """
+        try:
+            ready, _, _ = select.select([self._fd], [], [], timeout)
+        except InterruptedError:
+            ready = True
+        return self._read_events() if ready else set()
+
+    def close(self):
+        """Stop watching everything and release the inotify file descriptor."""
+        if self._fd is not None and self._fd >= 0:
+            os.close(self._fd)
+        self._fd = None
+        self._wd2dir.clear()
+        self._dir2wd.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exctype, excvalue, exctb):
+        self.close()
+
+    def __del__(self):
+        if getattr(self, "_fd", None) is not None:
+            self.close()
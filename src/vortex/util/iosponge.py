@@ -31,11 +31,15 @@ class IoSponge(io.BufferedIOBase):
         :param int size_check: The first size_check bytes will be buffered in
             order to be properly accounted for.
         :param int gressed_size: An estimate of the file-like object size (in
-            bytes)
+            bytes). It may also be a callable that returns such an estimate
+            (it is called only when the size is actually needed, which allows
+            for estimates that are refined as the data are read).
         """
         self._rawio = rawio
         self._size_check = size_check
-        self._guessed_size = int(guessed_size)
+        self._guessed_size = (
+            guessed_size if callable(guessed_size) else int(guessed_size)
+        )
         self._first_bytes = self._rawio.read(size_check)
         self._seek = 0
 
@@ -45,7 +49,12 @@ class IoSponge(io.BufferedIOBase):
         if len(self._first_bytes) < self._size_check:
             return len(self._first_bytes)
         else:
-            return max(len(self._first_bytes), self._guessed_size)
+            guessed_size = (
+                self._guessed_size()
+                if callable(self._guessed_size)
+                else self._guessed_size
+            )
+            return max(len(self._first_bytes), int(guessed_size))
 
     def tell(self):
         """The amount of bytes read in this strem."""
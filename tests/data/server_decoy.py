@@ -7,13 +7,13 @@ import time
 sync_py = './decoy_sync.py'
 
 
-def server(sleep, crash, verb):
+def server(sleep, crash, verb, direct=False):
     stop_request = False
     i = 0
     while not stop_request:
         if verb:
             print('Starting the {} script.'.format(sync_py))
-        retcode = subprocess.call([sys.executable, sync_py])
+        retcode = subprocess.call([sync_py] if direct else [sys.executable, sync_py])
         if verb:
             print('{} retcode is: {:d}.'.format(sync_py, retcode))
         if retcode == 1:  # This should not happened
@@ -51,6 +51,8 @@ if __name__ == "__main__":
                         help="Duration of the fake processing in seconds [default: %(default)s]")
     parser.add_argument("--crash", dest="crash", action="store_true",
                         help="Quit abruptly")
+    parser.add_argument("--direct", dest="direct", action="store_true",
+                        help="Execute the synchronisation script directly (not with Python)")
     args = parser.parse_args()
 
-    server(sleep=args.sleep, crash=args.crash, verb=args.verbose)
+    server(sleep=args.sleep, crash=args.crash, verb=args.verbose, direct=args.direct)
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+
+"""
+Micro-benchmarks for the most heavily used Vortex code paths.
+
+Each benchmark times a single operation (e.g. the creation of a resource
+handler or the retrieval of a file from a cache). The benchmarks run
+offline: the data are taken from the test cache located in ``tests/data``.
+
+Usage::
+
+    # Run all the benchmarks and save the results
+    python tests/profiling/vortex_benchmarks.py --json bench_2.4.1.json
+
+    # Run some of the benchmarks and compare with previous results
+    python tests/profiling/vortex_benchmarks.py --compare bench_2.4.1.json rh_create input_resolution
+
+    # Profile a given benchmark (the cProfile statistics are saved)
+    python tests/profiling/vortex_benchmarks.py --cprofile rh_create.prof rh_create
+
+When comparing with previous results, the exit code is 1 if any benchmark
+is slower than the reference by more than the ``--threshold`` factor.
+"""
+
+import argparse
+import collections
+import contextlib
+import cProfile
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import bronx.stdtypes.date
+import footprints as fp
+
+import vortex
+from vortex import sessions, toolbox
+from vortex.data.abstractstores import MultiStore, lookup_cache
+from vortex.data.stores import _VortexCacheBaseStore
+from vortex.layout.dataflow import LocalTracker, Sequence
+from vortex.tools.net import uriparse
+
+DATAPATHTEST = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+#: The path to the test items (relative to the test cache entry)
+CACHE_ITEMS = ['arpege/4dvarfr/{:s}/20180101T0000A/forecast/{:s}.arpege.txt'.format(xp, kind)
+               for xp in ('ABC1', 'ABC2') for kind in ('utest1', 'utest2')]
+
+
+# Stores used by the benchmarks
+
+class BenchCacheStore(_VortexCacheBaseStore):
+    """A Vortex cache store located in a temporary directory."""
+
+    _footprint = dict(
+        info = 'Benchmarks Vortex cache',
+        attr = dict(
+            netloc = dict(
+                values = ['vortex.bench-upper.fr', 'vortex.bench-lower.fr'],
+            ),
+        )
+    )
+
+    #: The root directory of the benchmark caches (set by the benchmarks)
+    rootdir = None
+
+    @property
+    def cache_entry(self):
+        return os.path.join(self.rootdir, self.netloc.split('.')[1])
+
+
+class BenchMultiStore(MultiStore):
+    """The upper cache is refilled with the data found in the lower one."""
+
+    _footprint = dict(
+        info = 'Benchmarks Vortex multi store',
+        attr = dict(
+            scheme = dict(
+                values = ['vortex'],
+            ),
+            netloc = dict(
+                values = ['vortex.bench-multi.fr'],
+            ),
+            refillstore = dict(
+                default = True,
+            ),
+        )
+    )
+
+    def alternates_netloc(self):
+        return ['vortex.bench-upper.fr', 'vortex.bench-lower.fr']
+
+    def alternates_fpextras(self):
+        return dict(username=self.username)
+
+
+# Benchmarks registration
+
+Benchmark = collections.namedtuple('Benchmark', ('name', 'setup', 'number', 'info'))
+
+BENCHMARKS = collections.OrderedDict()
+
+
+def benchmark(number):
+    """Register a benchmark.
+
+    The decorated function is the benchmark setup: it is called with a
+    temporary directory (the current working directory) and returns the
+    callable to be timed. It may also be a generator that yields the callable
+    and then cleans up.
+
+    :param int number: The number of calls per timing
+    """
+    def register(setup):
+        BENCHMARKS[setup.__name__] = Benchmark(setup.__name__, setup, number,
+                                               (setup.__doc__ or '').strip())
+        return setup
+    return register
+
+
+def _rh_description(**kw):
+    desc = dict(kind='gridpoint', format='grib', nativefmt='[format]',
+                origin='hst', term=3, local='toto', namespace='vortex.multi.fr',
+                experiment='ABCD', block='forecast', model='arpege',
+                vapp='arpege', vconf='4dvarfr', cutoff='assim',
+                date=bronx.stdtypes.date.Date('2016010100'),
+                geometry=vortex.data.geometries.get(tag='global798'))
+    desc.update(kw)
+    return desc
+
+
+@benchmark(number=500)
+def rh_create(tmpdir):
+    """Create a resource handler (toolbox.rh)."""
+    desc = _rh_description()
+    return lambda: toolbox.rh(**desc)
+
+
+@benchmark(number=200)
+def input_resolution(tmpdir):
+    """Declare an input (toolbox.input) with a term expansion (3 handlers)."""
+    desc = _rh_description(term=[3, 6, 9], local='toto_[term]', now=False, verbose=False)
+    sequence = sessions.current().context.sequence
+
+    def do_input():
+        toolbox.input(**desc)
+        sequence.clear()
+
+    yield do_input
+    sequence.clear()
+
+
+@benchmark(number=5000)
+def pack_pathname(tmpdir):
+    """Build a Vortex pathname (VortexNameBuilder.pack_pathname)."""
+    rh = toolbox.rh(**_rh_description())
+    provider = rh.provider
+    info = provider._pathname_info(rh.resource)
+    return lambda: provider.namebuilder.pack_pathname(info)
+
+
+def _bench_caches(tmpdir):
+    """Setup two caches: the lower one contains the test data."""
+    BenchCacheStore.rootdir = os.path.join(tmpdir, 'caches')
+    for cache in ('bench-upper', 'bench-lower'):
+        os.makedirs(os.path.join(BenchCacheStore.rootdir, cache))
+    for item in CACHE_ITEMS:
+        target = os.path.join(BenchCacheStore.rootdir, 'bench-lower', item)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(os.path.join(DATAPATHTEST, 'testcache', 'vortex', item), target)
+
+
+@benchmark(number=200)
+def cache_insert_retrieve(tmpdir):
+    """Insert a local file in a cache, then retrieve it (storage.Cache)."""
+    _bench_caches(tmpdir)
+    store = fp.proxy.store(scheme='vortex', netloc='vortex.bench-upper.fr',
+                           username='benchmarks')
+    cache = store.cache
+    sh = sessions.current().sh
+    shutil.copyfile(os.path.join(DATAPATHTEST, 'testcache', 'vortex', CACHE_ITEMS[0]), 'bench_local')
+
+    def do_insert_retrieve():
+        cache.insert('bench/item', 'bench_local', intent='in', fmt='foo')
+        cache.retrieve('bench/item', 'bench_retrieved', intent='in', fmt='foo')
+        sh.remove('bench_retrieved')
+
+    return do_insert_retrieve
+
+
+@benchmark(number=100)
+def multistore_get_refill(tmpdir):
+    """Get files from a MultiStore (the upper cache is refilled)."""
+    _bench_caches(tmpdir)
+    store = fp.proxy.store(scheme='vortex', netloc='vortex.bench-multi.fr',
+                           username='benchmarks')
+    upper = os.path.join(BenchCacheStore.rootdir, 'bench-upper')
+    sh = sessions.current().sh
+    uris = [uriparse('vortex://vortex.bench-multi.fr/' + item) for item in CACHE_ITEMS]
+
+    def do_get_refill():
+        for i, uri in enumerate(uris):
+            store.get(uri, 'bench_get_{:d}'.format(i), dict(fmt='foo', intent='in'))
+        # Next time, the upper cache will have to be refilled again
+        sh.rm(upper)
+        sh.mkdir(upper)
+
+    return do_get_refill
+
+
+@benchmark(number=20)
+def localtracker_json_dump(tmpdir):
+    """Dump a LocalTracker with 200 entries (LocalTracker.json_dump)."""
+    tracker = LocalTracker()
+    for term in range(200):
+        rh = toolbox.rh(**_rh_description(term=term, local='toto_{:03d}'.format(term)))
+        tracker.update_rh(rh, dict(stage='get'))
+    return lambda: tracker.json_dump('bench_tracker.json')
+
+
+@benchmark(number=20000)
+def sequence_fastsearch(tmpdir):
+    """Look for a section in a Sequence with 200 sections (Sequence.fastsearch)."""
+    sequence = Sequence()
+    rhs = [toolbox.rh(**_rh_description(term=term, local='toto_{:03d}'.format(term)))
+           for term in range(200)]
+    sequence.input(rh=rhs, role='Bench')
+    skeleton = rhs[100]
+    yield lambda: sequence.fastsearch(skeleton)
+    sequence.clear()
+
+
+@benchmark(number=5000)
+def environment_clone(tmpdir):
+    """Clone an Environment with 300 variables (Environment.clone)."""
+    env = sessions.current().env.clone()
+    env.update({'BENCH_VAR_{:03d}'.format(i): str(i) for i in range(300)})
+
+    return lambda: env.clone().bench_var_100
+
+
+# Benchmarks execution
+
+@contextlib.contextmanager
+def _benchmark_environment():
+    """Run in a temporary directory."""
+    sh = sessions.current().sh
+    oldpwd = sh.pwd()
+    tmpdir = sh.path.realpath(tempfile.mkdtemp(prefix='vortex_benchmarks_'))
+    sh.cd(tmpdir)
+    try:
+        yield tmpdir
+    finally:
+        lookup_cache().clear()
+        sh.cd(oldpwd)
+        sh.rm(tmpdir)
+
+
+def run_benchmark(bench, repeat=5, number=None, profiler=None):
+    """Run **bench** and return the timings (in seconds per call)."""
+    number = number or bench.number
+    with _benchmark_environment() as tmpdir:
+        setup = bench.setup(tmpdir)
+        if hasattr(setup, 'send'):
+            func = next(setup)
+        else:
+            func, setup = setup, None
+        try:
+            # Warm-up
+            func()
+            timings = list()
+            for _ in range(repeat):
+                if profiler is not None:
+                    profiler.enable()
+                t0 = time.perf_counter()
+                for _ in range(number):
+                    func()
+                timings.append((time.perf_counter() - t0) / number)
+                if profiler is not None:
+                    profiler.disable()
+        finally:
+            if setup is not None:
+                for _ in setup:
+                    pass
+    return timings
+
+
+def run_benchmarks(names=None, repeat=5, number=None, profiler=None, verbose=True):
+    """Run several benchmarks and return a dictionary of results."""
+    results = collections.OrderedDict()
+    for name in names or BENCHMARKS.keys():
+        bench = BENCHMARKS[name]
+        timings = run_benchmark(bench, repeat=repeat, number=number, profiler=profiler)
+        results[name] = dict(min=min(timings),
+                             median=statistics.median(timings),
+                             number=number or bench.number,
+                             repeat=repeat)
+        if verbose:
+            print('{:24s} {:12.3f} us/call (median: {:.3f} us/call)  -- {:s}'
+                  .format(name, results[name]['min'] * 1e6,
+                          results[name]['median'] * 1e6, bench.info))
+    return results
+
+
+def compare_results(results, reference, threshold=1.2):
+    """Compare **results** with **reference**.
+
+    :return: The list of benchmarks that are slower than the reference by
+        more than the **threshold** factor.
+    """
+    regressions = list()
+    for name, result in results.items():
+        if name not in reference:
+            continue
+        ratio = result['min'] / reference[name]['min']
+        status = 'REGRESSION' if ratio > threshold else 'ok'
+        print('{:24s} {:12.3f} us/call  vs {:12.3f} us/call  x{:5.2f}  {:s}'
+              .format(name, result['min'] * 1e6, reference[name]['min'] * 1e6, ratio, status))
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the Vortex benchmarks.',
+                                     epilog=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('benchmarks', nargs='*',
+                        help='The benchmarks to run (default: all, see --list)')
+    parser.add_argument('--list', action='store_true', help='List the available benchmarks')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timings per benchmark')
+    parser.add_argument('--number', type=int, help='Number of calls per timing (override)')
+    parser.add_argument('--json', help='Save the results in this JSON file')
+    parser.add_argument('--compare', help='Compare with the results saved in this JSON file')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='Slowdown factor that is considered to be a regression')
+    parser.add_argument('--cprofile', help='Save cProfile statistics in this file')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for bench in BENCHMARKS.values():
+            print('{:24s} {:s}'.format(bench.name, bench.info))
+        return 0
+
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error('Unknown benchmark(s): {:s}'.format(', '.join(unknown)))
+
+    profiler = cProfile.Profile() if args.cprofile else None
+    results = run_benchmarks(args.benchmarks, repeat=args.repeat,
+                             number=args.number, profiler=profiler)
+    if profiler is not None:
+        profiler.dump_stats(args.cprofile)
+
+    if args.json:
+        with open(args.json, 'w') as fhjson:
+            json.dump(dict(vortex=vortex.__version__,
+                           python=platform.python_version(),
+                           host=platform.node(),
+                           date=bronx.stdtypes.date.now().iso8601(),
+                           results=results),
+                      fhjson, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fhjson:
+            reference = json.load(fhjson)
+        print('\nComparison with {:s} (vortex {:s}):'.format(args.compare,
+                                                             reference.get('vortex', '?')))
+        if compare_results(results, reference['results'], threshold=args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import signal
+import subprocess
 import tempfile
 
 import footprints as fp
@@ -32,6 +33,22 @@ class ServerSyncToolQuick(serversynctools.ServerSyncSimpleSocket):
     )
 
 
+class ServerSyncFifoQuick(serversynctools.ServerSyncFifo):
+    """For test purposes: it just accelerate things by reducing the timeout."""
+    _footprint = dict(
+        attr = dict(
+            checkinterval = dict(
+                type        = int,
+                optional    = True,
+                default     = 1,
+            ),
+        ),
+        priority = dict(
+            level = fp.priorities.top.TOOLBOX  # @UndefinedVariable
+        )
+    )
+
+
 class ExpressoServer(components.Expresso):
     """Just a fake algo component that simulate some crashes."""
     _footprint = dict(
@@ -109,10 +126,10 @@ class TestExpressoServer(unittest.TestCase):
         rhScript.get()
         return rhScript
 
-    def _run_algo(self, rhScript, niter, *kargs, **kwargs):
+    def _run_algo(self, rhScript, niter, *kargs, method='simple_socket', **kwargs):
         algo = fp.proxy.component(engine='exec', interpreter='current',
                                   niter=niter, server_run=True,
-                                  serversync_method='simple_socket',
+                                  serversync_method=method,
                                   serversync_medium=self.syncscript,
                                   **kwargs)
         with self.sh.env.clone() as lenv:
@@ -165,6 +182,40 @@ class TestExpressoServer(unittest.TestCase):
         self.assertFalse(self.sh.path.exists('server_decoy_processing_1',),
                          'Checking fake processing')
 
+    def test_server_fifo(self):
+        """The FIFO synchronisation tool."""
+
+        rhScript = self._get_fake_server(rawopts='--sleep 0.1 --direct')
+
+        niter = 3
+        self._run_algo(rhScript, niter, method='fifo')
+        for i in range(niter):
+            self.assertTrue(self.sh.path.exists('server_decoy_processing_{:d}'.format(i + 1),),
+                            'Checking fake processing')
+        # The script and the FIFOs are removed
+        self.assertFalse([f for f in self.sh.listdir() if f.startswith('decoy_sync')])
+
+        rhScript = self._get_fake_server(rawopts='--sleep 10 --crash --direct')
+        with self.assertRaises(components.AlgoComponentError):
+            self._run_algo(rhScript, 2, method='fifo')
+
+    def test_fifo_stats(self):
+        """Step and handshake durations of the FIFO synchronisation tool."""
+        synctool = fp.proxy.serversynctool(method='fifo', medium=self.syncscript)
+        self.assertIsInstance(synctool, serversynctools.ServerSyncFifo)
+        self.assertFalse(synctool.trigger_stop())
+        server = subprocess.Popen(['sh', '-c', '{0:s} && sleep 0.2 && {0:s}'.format(self.syncscript)])
+        synctool.set_servercheck_callback(lambda: server.poll() is None)
+        synctool.trigger_wait()
+        synctool.trigger_run()
+        self.assertTrue(synctool.trigger_stop())
+        self.assertEqual(server.wait(), 0)
+        self.assertFalse(self.sh.path.exists(self.syncscript))
+        stats = synctool.stats
+        self.assertEqual(stats['steps'], 1)
+        self.assertGreaterEqual(stats['step_mean'], 0.2)
+        self.assertLess(stats['handshake_max'], 1)
+
 
 if __name__ == '__main__':
     unittest.main()
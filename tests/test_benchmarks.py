@@ -0,0 +1,37 @@
+import importlib.util
+import os
+import unittest
+
+from bronx.fancies import loggers
+
+tloglevel = 'ERROR'
+
+BENCHMARKS_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'profiling', 'vortex_benchmarks.py')
+
+
+def _load_benchmarks():
+    spec = importlib.util.spec_from_file_location('vortex_benchmarks', BENCHMARKS_PY)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@loggers.unittestGlobalLevel(tloglevel)
+class TestBenchmarks(unittest.TestCase):
+    """Check that the benchmarks still run (with a single call each)."""
+
+    def test_benchmarks_smoke(self):
+        vb = _load_benchmarks()
+        results = vb.run_benchmarks(repeat=1, number=1, verbose=False)
+        self.assertEqual(list(results.keys()), list(vb.BENCHMARKS.keys()))
+        for result in results.values():
+            self.assertGreater(result['min'], 0)
+        reference = {name: dict(min=result['min'] / 10) for name, result in results.items()}
+        self.assertEqual(vb.compare_results(results, reference, threshold=1e9), [])
+        self.assertEqual(vb.compare_results(results, reference, threshold=2),
+                         list(results.keys()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -77,6 +77,46 @@ class TestCompression(unittest.TestCase):
                     self.sh.copyfileobj(scompressed, sdest)
         self.assertDataConsistency("test_gb1")
 
+    def test_compression_inprocess(self):
+        for desc in ('gzip', 'bzip2&complevel=2', 'xz&complevel=1', 'gzip|xz'):
+            cp = CompressionPipeline(self.sh, desc)
+            self.assertTrue(cp.inprocess)
+            shcp = CompressionPipeline(self.sh, desc)
+            shcp._inprocess = False
+            self.assertFalse(shcp.inprocess)
+            # In-process compression, external uncompression
+            cp.compress2file(self.testfile, 'test_i1')
+            shcp.file2uncompress('test_i1', 'test_i2')
+            self.assertDataConsistency('test_i2')
+            # External compression, in-process uncompression
+            shcp.compress2file(self.testfile, 'test_i3')
+            cp.file2uncompress('test_i3', 'test_i4')
+            self.assertDataConsistency('test_i4')
+
+    def test_compression_threads(self):
+        cp = CompressionPipeline(self.sh, 'gzip')
+        cp._threads = 3
+        cp._threads_threshold = 0
+        cp._blocksize = 10000
+        cp.compress2file(self.testfile, 'test_t1.gz')
+        # Multi-member output that is understood by gunzip...
+        shcp = CompressionPipeline(self.sh, 'gzip')
+        shcp._inprocess = False
+        shcp.file2uncompress('test_t1.gz', 'test_t1')
+        self.assertDataConsistency('test_t1')
+        # ... and by the in-process decompressor
+        cp.file2uncompress('test_t1.gz', 'test_t2')
+        self.assertDataConsistency('test_t2')
+
+    def test_compression_estimated_size(self):
+        with open('compressible', 'wb') as fhout:
+            fhout.write(b'vortex' * 1024 * 1024)
+        cp = CompressionPipeline(self.sh, 'gzip')
+        with cp.compress2stream('compressible', iosponge=True) as scompressed:
+            scompressed._size_check = 1024
+            # The observed compression ratio is used
+            self.assertLess(scompressed.size, 0.1 * 6 * 1024 * 1024)
+
     def test_compression_system(self):
         self.sh.generic_compress('gzip&complevel=1', self.testfile, 'test_sys1.gz')
         self.sh.generic_uncompress('gzip&complevel=1', 'test_sys1.gz')
@@ -0,0 +1,102 @@
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+
+from bronx.fancies import loggers
+
+import vortex  # @UnusedImport
+from vortex.tools import digests
+
+tloglevel = 'ERROR'
+
+
+@loggers.unittestGlobalLevel(tloglevel)
+class TestDigestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='test_digests_')
+        self.file1 = os.path.join(self.tmpdir, 'file1')
+        self.file2 = os.path.join(self.tmpdir, 'file2')
+        self.write(self.file1, b'toto')
+        self.write(self.file2, b'titi')
+        self.dcache = digests.DigestCache(tag='digests_unittest',
+                                          active=True, maxsize=2)
+        self.dcache.clear()
+
+    def tearDown(self):
+        vortex.sessions.current().system().rmtree(self.tmpdir)
+
+    @staticmethod
+    def write(path, content):
+        with open(path, 'wb') as fhw:
+            fhw.write(content)
+
+    @staticmethod
+    def md5(content):
+        return hashlib.md5(content).hexdigest()
+
+    def test_file2hash(self):
+        self.assertEqual(self.dcache.file2hash(self.file1, 'md5'),
+                         self.md5(b'toto'))
+        self.assertEqual(len(self.dcache), 1)
+        self.assertEqual(self.dcache.file2hash(self.file1, 'md5'),
+                         self.md5(b'toto'))
+        self.assertEqual(self.dcache.stats, dict(hits=1, misses=1, records=1))
+        # Hardlinks share the same entry
+        link1 = os.path.join(self.tmpdir, 'link1')
+        os.link(self.file1, link1)
+        self.assertEqual(self.dcache.lookup(link1, 'md5'), self.md5(b'toto'))
+        self.assertIsNone(self.dcache.lookup(link1, 'sha1'))
+        # Modified files are re-hashed
+        self.write(self.file1, b'tata')
+        st = os.stat(self.file1)
+        os.utime(self.file1, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+        self.assertIsNone(self.dcache.lookup(self.file1, 'md5'))
+        self.assertEqual(self.dcache.file2hash(self.file1, 'md5'),
+                         self.md5(b'tata'))
+        # File like objects
+        self.assertEqual(self.dcache.file2hash(io.BytesIO(b'titi'), 'md5'),
+                         self.md5(b'titi'))
+        # LRU
+        self.dcache.file2hash(self.file2, 'md5')
+        self.dcache.file2hash(self.file2, 'sha1')
+        self.assertEqual(len(self.dcache), 2)
+        self.assertIsNone(self.dcache.lookup(self.file1, 'md5'))
+        self.dcache.invalidate(self.file2)
+        self.assertEqual(len(self.dcache), 0)
+
+    def test_filecheck(self):
+        ref = os.path.join(self.tmpdir, 'file1.md5')
+        self.write(ref, self.md5(b'toto').encode() + b'  file1\n')
+        self.assertTrue(self.dcache.filecheck(self.file1, 'md5', ref))
+        # The digest is remembered
+        self.assertEqual(self.dcache.lookup(self.file1, 'md5'), self.md5(b'toto'))
+        self.assertFalse(self.dcache.filecheck(self.file2, 'md5', ref))
+        self.assertTrue(self.dcache.filecheck(
+            self.file1, 'md5', io.BytesIO(self.md5(b'toto').encode())))
+        self.assertTrue(self.dcache.filecheck(self.file2, 'md5',
+                                              self.md5(b'titi')))
+        self.assertEqual(self.dcache.file2hash_fh(self.file2, 'md5').read(),
+                         self.md5(b'titi').encode())
+
+    def test_streaming(self):
+        self.assertIsNone(digests.streaming_digest())
+        with digests.streaming_digests('md5'):
+            sdigest = digests.streaming_digest()
+        self.assertIsNone(digests.streaming_digest())
+        self.assertEqual(sdigest.algorithm, 'md5')
+        target = os.path.join(self.tmpdir, 'streamed')
+        with open(target, 'wb') as fhw:
+            write = sdigest.wrap(fhw.write)
+            write(b'to')
+            write(b'to')
+        sdigest.record(target)
+        dcache = digests.digest_cache()
+        self.assertEqual(dcache.lookup(target, 'md5'), self.md5(b'toto'))
+        dcache.invalidate(target)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from bronx.fancies import loggers
+
+from vortex.tools.elf import ELFError, LddResolver, elf_dynamic_info
+
+tloglevel = 'CRITICAL'
+
+_LDD_REGEX = re.compile(r"^\s*([^\s]+)\s+=>\s*(?:([^\s]+)\s+\(0x.+\)|not found)$")
+
+
+def _system_ldd(filename):
+    try:
+        out = subprocess.run(['ldd', filename], capture_output=True, text=True)
+    except OSError:
+        return None
+    if out.returncode:
+        return None
+    return {m.group(1): m.group(2)
+            for m in map(_LDD_REGEX.match, out.stdout.splitlines()) if m}
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'Linux only')
+@loggers.unittestGlobalLevel(tloglevel)
+class TestElfLdd(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='test_elf_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_not_elf(self):
+        script = os.path.join(self.tmpdir, 'script.sh')
+        with open(script, 'w') as fhs:
+            fhs.write('#!/bin/sh\n')
+        with self.assertRaises(ELFError):
+            elf_dynamic_info(script)
+        self.assertIsNone(LddResolver().ldd(script))
+
+    def test_ldd(self):
+        binary = os.path.realpath(sys.executable)
+        ref = _system_ldd(binary)
+        if ref is None:
+            self.skipTest('The ldd command is not usable')
+        cachefile = os.path.join(self.tmpdir, 'ldd_cache.json')
+        libs = LddResolver(cachefile).ldd(binary)
+        self.assertEqual({k: v and os.path.realpath(v) for k, v in libs.items()},
+                         {k: v and os.path.realpath(v) for k, v in ref.items()})
+        # The result is remembered
+        with open(cachefile) as fhc:
+            self.assertEqual(len(json.load(fhc)), 1)
+        resolver = LddResolver(cachefile)
+        resolver._resolve = None  # Should not be called
+        self.assertEqual(resolver.ldd(binary), libs)
+        # The binary's path is not part of the key (no $ORIGIN)
+        hardlink = os.path.join(self.tmpdir, 'python_link')
+        try:
+            os.link(binary, hardlink)
+        except OSError:
+            pass
+        else:
+            self.assertEqual(resolver.ldd(hardlink), libs)
+
+    def test_ldd_cache(self):
+        binary = os.path.realpath(sys.executable)
+        cachefile = os.path.join(self.tmpdir, 'ldd_cache.json')
+        # Unresolved libraries are not remembered
+        resolver = LddResolver(cachefile, maxsize=1)
+        resolver._resolve = lambda f, p: {'libmissing.so': None}
+        self.assertEqual(resolver.ldd(binary), {'libmissing.so': None})
+        self.assertFalse(os.path.exists(cachefile))
+        resolver._resolve = lambda f, p: {'libmissing.so': binary}
+        self.assertEqual(resolver.ldd(binary), {'libmissing.so': binary})
+        # The oldest entries are discarded
+        resolver.ldd(binary, ld_library_path='/nowhere')
+        with open(cachefile) as fhc:
+            self.assertEqual(list(json.load(fhc).values()), [{'libmissing.so': binary}])
+        self.assertEqual(len(resolver._load_cache()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
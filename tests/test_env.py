@@ -4,7 +4,7 @@ import os
 
 from unittest import TestCase, main
 
-from common.data.modelstates import Analysis3D
+from vortex.nwp.data.modelstates import Analysis3D
 from vortex.data import geometries
 from vortex.tools.env import Environment
 
@@ -181,6 +181,57 @@ class UtEnv(TestCase):
         with self.assertRaises(RuntimeError):
             e.rewind()
 
+    def test_copy_on_write(self):
+        e = Environment(clear=True)
+        e.update(toto=1, titi=2, tata=3)
+        z = Environment(env=e)
+        # The variables are shared (not copied)
+        self.assertIs(z._pool._top, e._pool._top)
+        self.assertEqual(dict(z._pool._top.data), dict(TOTO=1, TITI=2, TATA=3))
+        z.toto = 10
+        del z.titi
+        z.tutu = 4
+        self.assertEqual(dict(e.items()), dict(TOTO=1, TITI=2, TATA=3))
+        self.assertEqual(dict(z.items()), dict(TOTO=10, TATA=3, TUTU=4))
+        self.assertNotIn('titi', z)
+        self.assertIsNone(z.titi)
+        # The parent's changes are not seen by existing children
+        e.tata = 30
+        del e.toto
+        self.assertEqual(z.tata, 3)
+        self.assertEqual(z.toto, 10)
+        self.assertEqual(len(z), 3)
+        # Long chains of environments
+        envs = [z]
+        for i in range(20):
+            envs.append(envs[-1].clone())
+            envs[-1]['var{:d}'.format(i)] = i
+            if i % 3:
+                del envs[-1]['var{:d}'.format(i - 1)]
+        for i, env in enumerate(envs[1:]):
+            self.assertEqual(env['var{:d}'.format(i)], i)
+            self.assertEqual(env.tutu, 4)
+            self.assertNotIn('titi', env)
+        self.assertEqual(sorted(envs[-1].keys()),
+                         ['TATA', 'TOTO', 'TUTU', 'VAR11', 'VAR14', 'VAR17', 'VAR19',
+                          'VAR2', 'VAR5', 'VAR8'])
+        envs[-1].clear()
+        self.assertTrue(envs[-1].naked())
+        self.assertEqual(envs[-2].var18, 18)
+
+    def test_activate_export(self):
+        e = Environment(active=True)
+        e.toto = [1, 2]
+        z = Environment(env=e, noexport=['titi'])
+        z.titi = 'hidden'
+        del z.toto
+        with z:
+            self.assertNotIn('TOTO', os.environ)
+            self.assertNotIn('TITI', os.environ)
+        self.assertEqual(os.environ['TOTO'], '[1, 2]')
+        self.assertEqual(set(os.environ.keys()), set(e.keys()))
+        e.active(False)
+
 
 if __name__ == '__main__':
     main(verbosity=2)
@@ -0,0 +1,165 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from bronx.fancies.loggers import unittestGlobalLevel
+
+import vortex
+from vortex.layout.fetching import FetchEngine
+from vortex.tools.delayedactions import PrivateDelayedActionsHub
+
+TLOGLEVEL = 9999
+
+
+class _FakeStore:
+
+    def __init__(self, netloc):
+        self.scheme = 'fake'
+        self.netloc = netloc
+
+
+class _FakeContainer:
+
+    def __init__(self, local):
+        self._local = local
+
+    def iotarget(self):
+        return self._local
+
+
+class _FakeRh:
+
+    def __init__(self, local, netloc):
+        self.container = _FakeContainer(local)
+        self._netloc = netloc
+
+    @property
+    def store(self):
+        return _FakeStore(self._netloc)
+
+
+class _FakeSection:
+
+    def __init__(self, local, netloc='fake.store.fr', delay=0.05, rc=True,
+                 monitor=None):
+        self.rh = _FakeRh(local, netloc)
+        self.delay = delay
+        self.rc = rc
+        self.monitor = monitor
+
+    def get(self, **kw):
+        if self.monitor is not None:
+            self.monitor.enter(self)
+        try:
+            time.sleep(self.delay)
+            if isinstance(self.rc, Exception):
+                raise self.rc
+            return self.rc
+        finally:
+            if self.monitor is not None:
+                self.monitor.leave(self)
+
+
+class _ConcurrencyMonitor:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = 0
+        self.highest = 0
+        self.order = list()
+
+    def enter(self, section):
+        with self._lock:
+            self.current += 1
+            self.highest = max(self.highest, self.current)
+            self.order.append(section)
+
+    def leave(self, section):
+        with self._lock:
+            self.current -= 1
+
+
+@unittestGlobalLevel(TLOGLEVEL)
+class TestFetchEngine(unittest.TestCase):
+
+    def test_results_order(self):
+        sections = [_FakeSection('file{:d}'.format(i), delay=0.01 * (5 - i), rc=i)
+                    for i in range(5)]
+        fetcher = FetchEngine(workers=5, storelimit=5)
+        self.assertEqual(fetcher.run_action(sections, 'get'), list(range(5)))
+        self.assertEqual(fetcher.stats, dict(done=5))
+        self.assertEqual(fetcher.run([], []), [])
+        with self.assertRaises(ValueError):
+            fetcher.run(sections, [])
+
+    def test_concurrency_limits(self):
+        monitor = _ConcurrencyMonitor()
+        sections = [_FakeSection('file{:d}'.format(i), monitor=monitor)
+                    for i in range(8)]
+        fetcher = FetchEngine(workers=8, storelimit=3)
+        fetcher.run_action(sections, 'get')
+        self.assertEqual(monitor.highest, 3)
+        monitor = _ConcurrencyMonitor()
+        sections = [_FakeSection('file{:d}'.format(i), monitor=monitor)
+                    for i in range(8)]
+        fetcher = FetchEngine(workers=8, storelimit=3,
+                              storelimits={'fake://fake.store.fr': 1})
+        fetcher.run_action(sections, 'get')
+        self.assertEqual(monitor.highest, 1)
+        # Same local target -> sequential processing
+        monitor = _ConcurrencyMonitor()
+        sections = [_FakeSection('samefile', delay=0.01 * (4 - i), monitor=monitor)
+                    for i in range(4)]
+        fetcher = FetchEngine(workers=8, storelimit=8)
+        fetcher.run_action(sections, 'get')
+        self.assertEqual(monitor.highest, 1)
+        self.assertEqual(monitor.order, sections)
+
+    def test_errors(self):
+        sections = [_FakeSection('file0', delay=0.1),
+                    _FakeSection('file1', rc=RuntimeError('Failed')),
+                    _FakeSection('file1', rc=True),
+                    _FakeSection('file2', delay=0.2)]
+        fetcher = FetchEngine(workers=1)
+        with self.assertRaises(RuntimeError):
+            fetcher.run_action(sections, 'get')
+        results = fetcher.run_action(sections, 'get', fatal=False)
+        self.assertTrue(results[0])
+        self.assertIsInstance(results[1], RuntimeError)
+        self.assertIsNone(results[2])
+        self.assertIsNone(results[3])
+        self.assertEqual(fetcher.stats, dict(done=1, errors=1, skipped=2))
+
+
+
+@unittestGlobalLevel(TLOGLEVEL)
+class TestDelayedActionsHubThreads(unittest.TestCase):
+
+    def test_concurrent_register(self):
+        tmpdir = tempfile.mkdtemp(prefix='test_dahub_')
+        hub = PrivateDelayedActionsHub(vortex.sessions.current().system(), tmpdir)
+        r_ids = list()
+
+        def _register():
+            for _ in range(10):
+                r_ids.append(hub.register(0, kind='sleep'))
+
+        try:
+            threads = [threading.Thread(target=_register) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len(set(r_ids)), 80)
+            self.assertEqual(len(hub._delayedactionshandlers), 1)
+            hub.finalise(*r_ids)
+            self.assertTrue(all([hub.retrieve(r_id) is not False for r_id in r_ids]))
+        finally:
+            hub.clear()
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+
+from bronx.fancies import loggers
+from bronx.stdtypes.date import Date
+import footprints as fp
+
+import vortex
+from vortex import toolbox
+from vortex.data.resources import Resource
+from vortex.util.fpcache import resolution_cache
+
+tloglevel = 'ERROR'
+
+
+@loggers.unittestGlobalLevel(tloglevel)
+class TestFootprintResolutionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.rcache = resolution_cache()
+        self.rcache.clear()
+        self.desc = dict(kind='gridpoint', format='grib', nativefmt='[format]',
+                         origin='hst', term=3, local='toto', namespace='vortex.multi.fr',
+                         experiment='ABCD', block='forecast', model='arpege',
+                         vapp='arpege', vconf='4dvarfr', cutoff='assim',
+                         date=Date('2016010100'),
+                         geometry=vortex.data.geometries.get(tag='global798'))
+
+    def tearDown(self):
+        toolbox.active_resolvecache = True
+        self.rcache.clear()
+
+    def test_rh(self):
+        toolbox.active_resolvecache = False
+        ref = toolbox.rh(**self.desc)
+        self.assertEqual(self.rcache.stats, dict())
+        toolbox.active_resolvecache = True
+        rh1 = toolbox.rh(**self.desc)
+        self.assertEqual(self.rcache.stats, dict(misses=3))
+        # Only the term changes: the same classes are used
+        rh2 = toolbox.rh(**dict(self.desc, term=6, local='titi'))
+        self.assertEqual(self.rcache.stats, dict(misses=3, hits=3))
+        for rh in (rh1, rh2):
+            for what in ('resource', 'provider', 'container'):
+                self.assertIs(type(getattr(rh, what)), type(getattr(ref, what)))
+        self.assertEqual(rh1.resource.footprint_as_dict(), ref.resource.footprint_as_dict())
+        self.assertEqual(rh2.resource.term.hour, 6)
+        self.assertEqual(rh2.container.localpath(), 'titi')
+        self.assertEqual(rh1.location(), ref.location())
+        # Discriminating attributes are part of the key
+        rh3 = toolbox.rh(**dict(self.desc, origin='fcst'))
+        self.assertEqual(self.rcache.stats['misses'], 4)
+        self.assertEqual(rh3.resource.origin, 'fcst')
+        # Failures are not remembered
+        with self.assertRaises(toolbox.VortexToolboxDescError):
+            toolbox.rh(**dict(self.desc, kind='not_a_resource_kind'))
+
+    def test_collector_change(self):
+        toolbox.rh(**self.desc)
+        toolbox.rh(**self.desc)
+        self.assertEqual(self.rcache.stats['hits'], 3)
+
+        class FpCacheTestResource(Resource):
+            _footprint = dict(
+                attr=dict(
+                    kind=dict(values=['fpcacheunittest']),
+                ),
+            )
+
+        rh = toolbox.rh(**self.desc)
+        self.assertEqual(self.rcache.stats['hits'], 5)
+        self.assertEqual(self.rcache.stats['misses'], 4)
+        self.assertEqual(rh.resource.kind, 'gridpoint')
+        fp.proxy.resources.discard(FpCacheTestResource)
+
+    def test_typed_attributes(self):
+
+        class FpCacheTestHi(Resource):
+            _footprint = dict(
+                attr=dict(
+                    kind=dict(values=['fpcachetyped']),
+                    term=dict(type=int),
+                ),
+                priority=dict(level=fp.priorities.top.TOOLBOX),
+            )
+
+        class FpCacheTestLo(Resource):
+            _footprint = dict(
+                attr=dict(
+                    kind=dict(values=['fpcachetyped']),
+                    term=dict(),
+                ),
+            )
+
+        try:
+            desc = dict(self.desc, kind='fpcachetyped')
+            rh = toolbox.rh(**dict(desc, term='abc'))
+            self.assertIs(type(rh.resource), FpCacheTestLo)
+            # '12' converts to int whereas 'abc' does not: no cache hit
+            rh = toolbox.rh(**dict(desc, term='12'))
+            self.assertIs(type(rh.resource), FpCacheTestHi)
+            rh = toolbox.rh(**dict(desc, term='24'))
+            self.assertIs(type(rh.resource), FpCacheTestHi)
+            self.assertEqual(rh.resource.term, 24)
+            self.assertEqual(self.rcache.stats['hits'], 3)
+            # A priority change is noticed
+            prio = FpCacheTestLo.footprint_retrieve().priority
+            prio['level'] = fp.priorities.top.DEBUG
+            try:
+                rh = toolbox.rh(**dict(desc, term='36'))
+                self.assertIs(type(rh.resource), FpCacheTestLo)
+            finally:
+                prio['level'] = fp.priorities.top.DEFAULT
+        finally:
+            fp.proxy.resources.discard(FpCacheTestHi)
+            fp.proxy.resources.discard(FpCacheTestLo)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from bronx.fancies import loggers
+
+import vortex
+from vortex.tools.delayedactions import PrivateDelayedActionsHub
+
+tloglevel = 'ERROR'
+
+
+class FakeFtget:
+    """Mimic the ftget method of the System object (no network involved)."""
+
+    def __init__(self, failures=()):
+        self.failures = dict.fromkeys(failures, 1)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.maxrunning = 0
+        self.calls = list()
+
+    def __call__(self, source, destination, hostname=None, logname=None,
+                 port=None, cpipeline=None, fmt=None):
+        with self.lock:
+            self.calls.append((source, hostname, fmt))
+            self.running += 1
+            self.maxrunning = max(self.maxrunning, self.running)
+            failing = self.failures.get(source, 0)
+            if failing:
+                self.failures[source] = failing - 1
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        if failing or source.startswith('missing'):
+            return False
+        with open(destination, 'w') as fhd:
+            fhd.write(source)
+        return True
+
+
+@loggers.unittestGlobalLevel(tloglevel)
+class TestBatchFtget(unittest.TestCase):
+
+    def setUp(self):
+        self.sh = vortex.sessions.current().system()
+        self.tmpdir = tempfile.mkdtemp(prefix='test_ftpbatch_')
+
+    def tearDown(self):
+        del self.sh.ftget
+        self.sh.rmtree(self.tmpdir)
+
+    def assertFetched(self, path, source):
+        with open(path) as fhs:
+            self.assertEqual(fhs.read(), source)
+
+    def test_batchftget(self):
+        self.sh.ftget = FakeFtget(failures=['file03', ])
+        sources = ['file{:02d}'.format(i) for i in range(10)] + ['missing', ]
+        destinations = [os.path.join(self.tmpdir, s) for s in sources]
+        rc = self.sh.batchftget(sources, destinations,
+                                hostname='batch1.unittest.fr', retries=1)
+        self.assertEqual(rc, [True, ] * 10 + [False, ])
+        for s, d in zip(sources[:-1], destinations):
+            self.assertFetched(d, s)
+        # Per-host connection limit (4 by default)
+        self.assertGreater(self.sh.ftget.maxrunning, 1)
+        self.assertLessEqual(self.sh.ftget.maxrunning, 4)
+        # One retry for file03 and for the missing file
+        self.assertEqual(len(self.sh.ftget.calls), 13)
+
+    def test_delayed_get(self):
+        self.sh.ftget = FakeFtget()
+        hub = PrivateDelayedActionsHub(self.sh, self.tmpdir)
+        r_ids = [hub.register((s, 'grib'), kind='archive',
+                              storage='batch2.unittest.fr', goal='get',
+                              tube='ftp', raw=False)
+                 for s in ('file1', 'file2', 'missing')]
+        self.assertIsNone(hub.register(('file1', 'grib'), kind='archive',
+                                       storage='batch2.unittest.fr',
+                                       goal='get', tube='ftp', raw=False))
+        hub.finalise(*r_ids)
+        self.assertFetched(hub.retrieve(r_ids[0]), 'file1')
+        self.assertFetched(hub.retrieve(r_ids[1]), 'file2')
+        self.assertFalse(hub.retrieve(r_ids[2]))
+        self.assertEqual({c[1:] for c in self.sh.ftget.calls},
+                         {('batch2.unittest.fr', 'grib')})
+        hub.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from bronx.fancies import loggers
+
+import vortex
+from vortex.tools.net import FtpConnectionPool
+
+tloglevel = 'ERROR'
+
+
+class FakeFtplib:
+    """Mimic the ExtendedFtplib interface (no network involved)."""
+
+    host = 'fakehost'
+    port = 21
+
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.closed = False
+        self.noops = 0
+
+    def voidcmd(self, cmd):
+        assert cmd == 'NOOP'
+        if self.broken:
+            raise EOFError('Connection lost')
+        self.noops += 1
+        return '200 OK'
+
+    def close(self):
+        self.closed = True
+        return True
+
+
+@loggers.unittestGlobalLevel(tloglevel)
+class TestFtpConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.sh = vortex.sessions.current().system()
+        self.tmpdir = tempfile.mkdtemp(prefix='test_ftppool_')
+        self.fnrc = os.path.join(self.tmpdir, 'fakenetrc')
+        with open(self.fnrc, 'w') as fhnrc:
+            fhnrc.write('machine fakehost login fakeuser password fakepwd')
+        os.chmod(self.fnrc, 0o600)
+
+    def tearDown(self):
+        self.sh.rm(self.tmpdir)
+
+    def new_pool(self, **kwargs):
+        kwargs.setdefault('maxspare', 4)
+        kwargs.setdefault('idletimeout', 300)
+        kwargs.setdefault('checkdelay', 300)
+        return FtpConnectionPool(self.sh, nrcfile=self.fnrc, ignoreproxy=True,
+                                 **kwargs)
+
+    @staticmethod
+    def deal(pool, broken=False):
+        ftpc = pool.deal('fakehost', 'fakeuser', delayed=True)
+        if ftpc._internal_ftp is None:
+            # Pretend that the connection is established
+            ftpc._internal_ftp = FakeFtplib(broken=broken)
+        return ftpc
+
+    def test_reuse(self):
+        pool = self.new_pool()
+        ftpc1 = self.deal(pool)
+        ftpc2 = self.deal(pool)
+        self.assertIsNot(ftpc1, ftpc2)
+        ftpc1.close()
+        self.assertEqual(pool.poolsize, 1)
+        self.assertIs(self.deal(pool), ftpc1)
+        self.assertEqual(pool.poolsize, 0)
+        ftpc1.close()
+        ftpc2.close()
+        self.assertEqual(pool.stats,
+                         dict(poolsize=2, created=2, reused=1, givenback=3,
+                              reconnected=0, discarded=0))
+        lib1 = ftpc1._internal_ftp
+        pool.clear()
+        self.assertEqual(pool.poolsize, 0)
+        self.assertTrue(lib1.closed)
+
+    def test_maxspare(self):
+        pool = self.new_pool(maxspare=1)
+        ftpc1 = self.deal(pool)
+        ftpc2 = self.deal(pool)
+        lib1 = ftpc1._internal_ftp
+        ftpc1.close()
+        ftpc2.close()
+        self.assertEqual(pool.poolsize, 1)
+        self.assertEqual(pool.stats['discarded'], 1)
+        self.assertTrue(lib1.closed)
+        self.assertIs(self.deal(pool), ftpc2)
+
+    def test_idletimeout(self):
+        pool = self.new_pool(idletimeout=0.05)
+        ftpc1 = self.deal(pool)
+        lib1 = ftpc1._internal_ftp
+        ftpc1.close()
+        time.sleep(0.1)
+        pool.expire()
+        self.assertEqual(pool.poolsize, 0)
+        self.assertTrue(lib1.closed)
+        self.assertIsNot(self.deal(pool), ftpc1)
+
+    def test_healthcheck(self):
+        pool = self.new_pool(checkdelay=0)
+        ftpc1 = self.deal(pool)
+        lib1 = ftpc1._internal_ftp
+        ftpc1.close()
+        time.sleep(0.01)
+        self.assertIs(self.deal(pool), ftpc1)
+        self.assertEqual(lib1.noops, 1)
+        self.assertEqual(pool.stats['reconnected'], 0)
+        # The connection is now broken: it is transparently dropped
+        lib1.broken = True
+        ftpc1.close()
+        time.sleep(0.01)
+        self.assertIs(pool.deal('fakehost', 'fakeuser'), ftpc1)
+        self.assertIsNone(ftpc1._internal_ftp)
+        self.assertTrue(lib1.closed)
+        self.assertEqual(pool.stats['reconnected'], 1)
+
+    def test_threads(self):
+        pool = self.new_pool(maxspare=3)
+        errors = list()
+
+        def worker():
+            try:
+                for _ in range(50):
+                    ftpc = self.deal(pool)
+                    ftpc.close()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        stats = pool.stats
+        self.assertLessEqual(stats['poolsize'], 3)
+        self.assertEqual(stats['created'] + stats['reused'], 400)
+        self.assertEqual(stats['givenback'], 400)
+        self.assertEqual(stats['poolsize'] + stats['discarded'],
+                         stats['created'])
+        pool.clear()
+
+
+@loggers.unittestGlobalLevel(tloglevel)
+class TestSessionFtpPool(unittest.TestCase):
+
+    def test_session_pool(self):
+        sh = vortex.sessions.current().system()
+        with sh.ftppool() as pool:
+            if sh.ftpsessionpool:
+                self.assertIs(pool, sh.ftp_session_pool())
+        pool = sh.ftp_session_pool()
+        self.assertIs(sh.ftp_session_pool(), pool)
+        sh.ftp_session_pool_clear()
+        self.assertIsNot(sh.ftp_session_pool(), pool)
+        sh.ftp_session_pool_clear()
+
+    def test_session_pool_fork(self):
+        sh = vortex.sessions.current().system()
+        pool = sh.ftp_session_pool()
+        rfd, wfd = os.pipe()
+        pool.clear = lambda: os.write(wfd, b'C')
+        pid = os.fork()
+        if pid == 0:
+            try:
+                # The parent's connections must not be closed by the child
+                cpool = sh.ftp_session_pool()
+                sh.ftp_session_pool_clear()
+                os.write(wfd, b'N' if cpool is not pool else b'S')
+            finally:
+                os._exit(0)
+        os.close(wfd)
+        os.waitpid(pid, 0)
+        with os.fdopen(rfd, 'rb') as fhr:
+            self.assertEqual(fhr.read(), b'N')
+        self.assertIs(sh.ftp_session_pool(), pool)
+        del pool.clear
+        sh.ftp_session_pool_clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -114,6 +114,28 @@ def test_user_geometry_override(user_override_file):
     )  # Same as original but with different stretching
 
 
+def test_lazy_load(user_geometries_file):
+    """Test that geometries are only created when they are first requested."""
+    from vortex.data import geometries
+
+    geometries.load(refresh=True, verbose=False, lazy=True,
+                    _user_config_dir=user_geometries_file.parent)
+    previous = geometries.Geometry._tag_table["global798"]
+
+    # Nothing is read until a geometry is looked for
+    assert geometries._DEFERRED_LOADS
+    geo = geometries.get(tag="test_user_geo")
+    assert geo.truncation == 999
+    assert not geometries._DEFERRED_LOADS
+    assert "test_projected" in geometries._DEFERRED
+    assert geometries.GaussGeometry("global798") is not previous
+    assert "global798" not in geometries._DEFERRED
+
+    # Browsing the geometries creates all of them
+    assert "test_projected" in geometries.keys()
+    assert not geometries._DEFERRED
+
+
 def test_geometry_singleton_behavior():
     """Test that GetByTag returns the same object for repeated calls."""
     from vortex.data import geometries
@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from bronx.fancies import loggers
+
+from vortex.tools.grib import GRIBIndexError, grib_message_index
+from vortex.nwp.tools.grib import GRIBFilter
+
+tloglevel = 'CRITICAL'
+
+
+def _grib1(param, leveltype, level, centre=85):
+    sec1 = bytearray(28)
+    sec1[0:3] = (28).to_bytes(3, 'big')
+    sec1[3] = 1
+    sec1[4] = centre
+    sec1[8] = param
+    sec1[9] = leveltype
+    sec1[10:12] = level.to_bytes(2, 'big')
+    return b'GRIB' + (40).to_bytes(3, 'big') + b'\x01' + bytes(sec1) + b'7777'
+
+
+def _grib2(category, number, surface, value, discipline=0, centre=85, scale=0):
+    sec1 = bytearray(21)
+    sec1[0:4] = (21).to_bytes(4, 'big')
+    sec1[4] = 1
+    sec1[5:7] = centre.to_bytes(2, 'big')
+    sec4 = bytearray(34)
+    sec4[0:4] = (34).to_bytes(4, 'big')
+    sec4[4] = 4
+    sec4[9] = category
+    sec4[10] = number
+    sec4[22] = surface
+    sec4[23] = scale
+    sec4[24:28] = value.to_bytes(4, 'big')
+    sec4[28] = 255
+    length = 16 + len(sec1) + len(sec4) + 4
+    return (b'GRIB\0\0' + bytes([discipline, 2]) + length.to_bytes(8, 'big') +
+            bytes(sec1) + bytes(sec4) + b'7777')
+
+
+@loggers.unittestGlobalLevel(tloglevel)
+class TestGribIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='test_gribindex_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def _write(self, name, *msgs):
+        with open(self._path(name), 'wb') as fhg:
+            fhg.write(b''.join(msgs))
+        return self._path(name)
+
+    def test_index(self):
+        gfile = self._write('g1', _grib1(11, 100, 850), _grib1(11, 100, 500),
+                            _grib2(0, 0, 103, 2))
+        index = grib_message_index(gfile)
+        self.assertEqual([(m.offset, m.length, m.edition, m.centre) for m in index],
+                         [(0, 40, 1, 85), (40, 40, 1, 85), (80, 75, 2, 85)])
+        self.assertEqual(index[1].fid['indicatorOfParameter'], 11)
+        self.assertEqual(index[1].fid['indicatorOfTypeOfLevel'], 100)
+        self.assertEqual(index[1].fid['level'], 500)
+        self.assertEqual(index[2].fid['parameterCategory'], 0)
+        self.assertEqual(index[2].fid['typeOfFirstFixedSurface'], 103)
+        self.assertEqual(index[2].fid['scaledValueOfFirstFixedSurface'], 2)
+        self.assertEqual(index[2].fid['scaleFactorOfFirstFixedSurface'], 0)
+        # Signed values (the sign is the leftmost bit) and missing values
+        gfile = self._write('g3', _grib2(0, 0, 103, 0x80000005, scale=0x81),
+                            _grib2(0, 0, 1, 0xFFFFFFFF, scale=0xFF))
+        index = grib_message_index(gfile)
+        self.assertEqual(index[0].fid['scaleFactorOfFirstFixedSurface'], -1)
+        self.assertEqual(index[0].fid['scaledValueOfFirstFixedSurface'], -5)
+        self.assertNotIn('scaleFactorOfFirstFixedSurface', index[1].fid)
+        self.assertNotIn('scaledValueOfFirstFixedSurface', index[1].fid)
+        # Filters on missing keys can't be processed on the raw messages
+        gfilter = GRIBFilter(concatenate=False)
+        gfilter.add_filters(dict(filter_name='t2m', fid_format='GRIB2',
+                                 fields_include=[dict(typeOfFirstFixedSurface=103,
+                                                      scaledValueOfFirstFixedSurface=2)]))
+        self.assertTrue(gfilter._fast_filtering_ok(index[:1]))
+        self.assertFalse(gfilter._fast_filtering_ok(index))
+        gfile = self._write('g2', _grib1(11, 100, 850)[:-2])
+        with self.assertRaises(GRIBIndexError):
+            grib_message_index(gfile)
+
+    def test_filter(self):
+        msgs = [_grib1(11, 100, 850), _grib1(11, 100, 500), _grib1(33, 105, 10)]
+        gfile = self._write('g1', *msgs)
+        gfilter = GRIBFilter(concatenate=True)
+        gfilter.add_filters(dict(filter_name='t850', fid_format='GRIB1',
+                                 fields_include=[dict(indicatorOfParameter=11,
+                                                      level=[850, 300])]),
+                            dict(filter_name='not_t', fid_format='GRIB1',
+                                 fields_exclude=[dict(indicatorOfParameter=11,
+                                                      comment='No T')]))
+        outfiles = gfilter(gfile, self._path('OUT_{filtername:s}.grib'))
+        self.assertEqual(outfiles, [self._path('OUT_t850.grib'),
+                                    self._path('OUT_not_t.grib'),
+                                    self._path('OUT_concatenate.grib')])
+        expected = [msgs[0], msgs[2], b''.join(msgs)]
+        for outfile, data in zip(outfiles, expected):
+            with open(outfile, 'rb') as fhg:
+                self.assertEqual(fhg.read(), data)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
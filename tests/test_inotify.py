@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from bronx.fancies import loggers
+
+from vortex.util.inotify import DirectoryWatcher, inotify_available
+
+tloglevel = 'CRITICAL'
+
+
+@unittest.skipUnless(inotify_available(), 'The inotify API is not available')
+@loggers.unittestGlobalLevel(tloglevel)
+class TestDirectoryWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='test_inotify_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _wait_for(self, watcher, path, timeout=5):
+        t0 = time.time()
+        while time.time() - t0 < timeout:
+            changed = watcher.wait(0.1)
+            if changed and path in changed:
+                return True
+        return False
+
+    def test_watch(self):
+        promise = os.path.join(self.tmpdir, 'file.pr')
+        with open(promise, 'w') as fhp:
+            fhp.write('promise')
+        with DirectoryWatcher() as watcher:
+            self.assertFalse(watcher.watch(os.path.join(self.tmpdir, 'nothere')))
+            self.assertTrue(watcher.watch(self.tmpdir))
+            self.assertEqual(watcher.watched, {self.tmpdir})
+            self.assertEqual(watcher.wait(0.01), set())
+            os.unlink(promise)
+            self.assertTrue(self._wait_for(watcher, promise))
+            newfile = os.path.join(self.tmpdir, 'file')
+            with open(newfile + '.tmp', 'w') as fhp:
+                fhp.write('data')
+            os.rename(newfile + '.tmp', newfile)
+            self.assertTrue(self._wait_for(watcher, newfile))
+            watcher.unwatch(self.tmpdir)
+            self.assertEqual(watcher.watched, set())
+            os.unlink(newfile)
+            self.assertEqual(watcher.wait(0.05), set())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
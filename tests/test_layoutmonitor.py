@@ -9,10 +9,11 @@ from bronx.stdtypes import date as _date
 from footprints import proxy as fpx
 
 import vortex
-import common  # @UnusedImport
+import vortex.nwp  # @UnusedImport
 from vortex.data.handlers import Handler
 from vortex.layout.dataflow import stripargs_section, intent, ixo, Section
 from vortex.layout import monitor
+from vortex.util import inotify
 
 logger = getLogger(__name__)
 tloglevel = 'CRITICAL'
@@ -44,6 +45,8 @@ class TestMonitor(unittest.TestCase):
         self.sh = self.t.system()
         self.tmpdir = tempfile.mkdtemp(suffix='_test_layout_monitor')
         self.sh.cd(self.tmpdir)
+        # Clean up even if the remaining of the setup fails
+        self.addCleanup(self._cleanup)
         self.t.rundir = self.tmpdir
         self.t.activate()
         self.t.context.cocoon()
@@ -102,7 +105,7 @@ class TestMonitor(unittest.TestCase):
                 what.update(const_stuff)
                 self._inputs[it][im] = self._create_section(what, ixo.INPUT)
 
-    def tearDown(self):
+    def _cleanup(self):
         self.t.exit()
         self.cursession.activate()
         self.sh.cd(self.oldpwd)
@@ -180,6 +183,35 @@ class TestMonitor(unittest.TestCase):
             self.assertEqualTimedOut(lambda: len(bm.available),
                                      len(self._TERMS) * len(self._MEMBERS) - 2)
 
+    @unittest.skipUnless(inotify.inotify_available(), 'The inotify API is not available')
+    def test_monitor_inotify(self):
+        for it in self._TERMS:
+            for im in self._MEMBERS:
+                self.assertTrue(self._actual_get(it, im))
+        # No periodic crawl after the first one: only inotify can spot the updates
+        bm = monitor.BasicInputMonitor(self.t.context, role='InputStuff',
+                                       caching_freq=3600, mute=True, event_driven=True)
+        with bm:
+            self.assertEqualTimedOut(lambda: len(bm.expected),
+                                     len(self._TERMS) * len(self._MEMBERS))
+            self._actual_put(term=self._TERMS[1], member=self._MEMBERS[1])
+            self.assertEqualTimedOut(lambda: len(bm.available), 1)
+            ima = bm.pop_available()
+            self.assertIs(ima.section, self._inputs[self._TERMS[1]][self._MEMBERS[1]])
+            self._actual_fail(term=self._TERMS[2], member=self._MEMBERS[0])
+            self.assertEqualTimedOut(lambda: len(bm.failed), 1)
+            self.assertEqual(len(bm.expected), len(self._TERMS) * len(self._MEMBERS) - 2)
+        # Without inotify, the update is only found by the next crawl
+        bm = monitor.BasicInputMonitor(self.t.context, role='InputStuff',
+                                       caching_freq=3600, mute=True, event_driven=False)
+        with bm:
+            self.assertEqualTimedOut(lambda: len(bm.expected),
+                                     len(self._TERMS) * len(self._MEMBERS) - 2)
+            navailable = len(bm.available)
+            self._actual_put(term=self._TERMS[3], member=self._MEMBERS[2])
+            time.sleep(1)
+            self.assertEqual(len(bm.available), navailable)
+
     def test_monitor_and_gangs(self):
         for it in self._TERMS:
             for im in self._MEMBERS:
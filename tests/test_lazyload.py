@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from bronx.fancies import loggers
+
+import vortex
+from vortex import lazyload
+
+tloglevel = 'CRITICAL'
+
+_LAZY_SCRIPT = """
+import sys
+import footprints as fp
+import vortex
+from vortex.data import geometries
+assert 'vortex.nwp' not in sys.modules
+assert len(geometries.Geometry._tag_table) == 0
+assert fp.proxy.conftool is not None
+assert vortex.lazyload.pending()
+fp.proxy.container(local='toto')
+assert 'vortex.nwp' in sys.modules
+assert not vortex.lazyload.pending()
+assert 'vortex.nwp.data.obs.ObsRaw' in [c.fullname() for c in fp.proxy.resources()]
+assert geometries.get(tag='global798').truncation == 798
+assert len(geometries.Geometry._tag_table) < 20
+assert len(geometries.keys()) > 300
+print('Lazy startup ok')
+"""
+
+
+@loggers.unittestGlobalLevel(tloglevel)
+class TestLazyLoad(unittest.TestCase):
+
+    def test_manifest(self):
+        manifest = lazyload.read_manifest(vortex.__version__)
+        self.assertIsNotNone(manifest,
+                             'The footprints manifest is missing or outdated')
+        self.assertEqual(manifest, lazyload.build_manifest())
+        self.assertIsNone(lazyload.read_manifest('0.0.0'))
+
+    def _run(self, lazy):
+        env = dict(os.environ)
+        env['VORTEX_LAZY_IMPORT'] = lazy
+        return subprocess.run([sys.executable, '-c', _LAZY_SCRIPT],
+                              env=env, capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__))
+
+    def test_lazy_startup(self):
+        out = self._run('1')
+        self.assertEqual(out.returncode, 0, out.stderr)
+        self.assertIn('Lazy startup ok', out.stdout)
+        # The usual startup
+        out = self._run('0')
+        self.assertNotEqual(out.returncode, 0)
+        self.assertIn('AssertionError', out.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,124 @@
+import ast
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from bronx.fancies import loggers
+import footprints
+
+import vortex
+from vortex.tools.lfi import LFIIndex, LFIMultipartIndex, LFIFormatError, lfi_index
+
+tloglevel = 'CRITICAL'
+
+
+DATAPATHTEST = os.path.join(os.path.dirname(__file__), 'data')
+
+# The LFI files whose listing (as printed by lfilist) is available in DATAPATHTEST
+LFI_FILES = ('historic.light.fa', 'historic.verylight.fa',
+             'lfi_multipage.lfi',  # Two index pages, deleted/moved/renamed articles
+             'lfi_multipart.lfi')  # LFI_ALTM: historic.verylight.fa + lfi_multipage.lfi
+
+
+def lfilist(name):
+    """The lfilist's output for the **name** LFI file."""
+    with open(os.path.join(DATAPATHTEST, name + '.lfilist')) as fhl:
+        return fhl.read().splitlines()
+
+
+@loggers.unittestGlobalLevel(tloglevel)
+class TestLFINative(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='test_lfi_')
+        self.sh = vortex.sessions.current().system()
+        self.lfi = footprints.proxy.addon(kind='lfi', shell=self.sh)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def _copy(self, name, target):
+        shutil.copyfile(os.path.join(DATAPATHTEST, name), self._path(target))
+        return self._path(target)
+
+    def test_index(self):
+        for name in LFI_FILES:
+            listing = lfilist(name)
+            table = [tuple(ast.literal_eval(x)[0]) for x in listing]
+            with lfi_index(os.path.join(DATAPATHTEST, name)) as lfindex:
+                self.assertEqual(lfindex.table(), table)
+            st = self.lfi.fa_table(os.path.join(DATAPATHTEST, name))
+            self.assertEqual(st.stdout, listing)
+            self.assertEqual(st.result, table)
+        with LFIIndex(os.path.join(DATAPATHTEST, 'historic.light.fa')) as lfindex:
+            self.assertEqual(struct.unpack('>11q', lfindex.read('DATE-DES-DONNEES'))[:5],
+                             (2016, 5, 30, 18, 0))
+        with LFIMultipartIndex(os.path.join(DATAPATHTEST, 'lfi_multipart.lfi')) as lfaltm:
+            self.assertEqual([os.path.basename(x) for x in lfaltm.parts],
+                             ['historic.verylight.fa', 'lfi_multipage.lfi'])
+            with LFIIndex(os.path.join(DATAPATHTEST, 'lfi_multipage.lfi')) as lfindex:
+                for article in ('FIELD00010', 'FIELD01554', 'RENAMED'):
+                    self.assertEqual(lfaltm.read(article), lfindex.read(article))
+                    self.assertTrue(lfaltm.same_article(article, lfindex))
+        # Multipart LFI file with a missing part
+        f1 = self._copy('lfi_multipart.lfi', 'f1')
+        self._copy('lfi_multipage.lfi', 'lfi_multipage.lfi')
+        with self.assertRaises(LFIFormatError):
+            lfi_index(f1)
+        # Not LFI files
+        with open(self._path('f2'), 'wb') as fhl:
+            fhl.write(b'LFI_ALTM' + b'\0' * 4088)
+        with self.assertRaises(LFIFormatError):
+            LFIIndex(self._path('f2'))
+        with open(self._path('f3'), 'wb') as fhl:
+            fhl.write(b'\1' * 4096)
+        with self.assertRaises(LFIFormatError):
+            LFIIndex(self._path('f3'))
+        # Inconsistent header (the number of articles)
+        f4 = self._copy('historic.verylight.fa', 'f4')
+        with open(f4, 'r+b') as fhl:
+            fhl.seek(5 * 8)
+            fhl.write(struct.pack('>q', 10))
+        with self.assertRaises(LFIFormatError):
+            LFIIndex(f4)
+
+    def test_diff(self):
+        f1 = self._copy('historic.light.fa', 'f1')
+        f2 = self._copy('historic.verylight.fa', 'f2')
+        with LFIIndex(f2) as lfindex:
+            _, position = lfindex.articles['CADRE-REDPOINPOL']
+        with open(f2, 'r+b') as fhl:
+            fhl.seek((position - 1) * 8 + 100)
+            fhl.write(b'\xff')
+        st = self.lfi.fa_diff(f1, f2)
+        self.assertFalse(st)
+        self.assertEqual(st.result.deleted, {'SURFTEMPERATURE'})
+        self.assertEqual(st.result.created, set())
+        self.assertEqual(st.result.updated, {'CADRE-REDPOINPOL'})
+        self.assertIn('S090TEMPERATURE', st.result.unchanged)
+        st = self.lfi.fa_diff(f1, f1)
+        self.assertTrue(st)
+        self.assertEqual(st.stdout, [])
+        # Multipart and multi-pages LFI files
+        f3 = self._copy('lfi_multipage.lfi', 'lfi_multipage.lfi')
+        with LFIIndex(f3) as lfindex:
+            _, position = lfindex.articles['RENAMED']
+        with open(f3, 'r+b') as fhl:
+            fhl.seek((position - 1) * 8)
+            fhl.write(b'\xff')
+        st = self.lfi.fa_diff(os.path.join(DATAPATHTEST, 'lfi_multipart.lfi'), f3)
+        self.assertFalse(st)
+        self.assertEqual(st.result.deleted,
+                         {ast.literal_eval(x)[0][0] for x in lfilist('historic.verylight.fa')})
+        self.assertEqual(st.result.updated, {'RENAMED'})
+        self.assertEqual(st.stdout[-1], ' != RENAMED')
+        self.assertEqual(len(st.result.unchanged), 1596)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,172 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from bronx.fancies import loggers
+
+from vortex.layout.dataflow import LocalTracker
+
+tloglevel = 'CRITICAL'
+
+
+class _FakeContainer:
+
+    def __init__(self, local):
+        self.local = local
+
+    def iotarget(self):
+        return self.local
+
+
+class _FakeRh:
+
+    def __init__(self, local, **kw):
+        self.container = _FakeContainer(local)
+        self._desc = dict(kind='gridpoint', local=local, options=dict())
+        self._desc.update(kw)
+
+    def as_dict(self):
+        return dict(self._desc)
+
+
+class _FakeStore:
+
+    scheme = 'vortex'
+    netloc = 'vortex.multi.fr'
+    tracking_extraargs = dict()
+
+
+def _remote(path):
+    return dict(path=path, params='', query=dict(), fragment='')
+
+
+@loggers.unittestGlobalLevel(tloglevel)
+class TestLocalTrackerJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='test_localtracker_')
+        self.jfile = os.path.join(self.tmpdir, 'tracker.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    @staticmethod
+    def _fill(tracker, n, stage='get'):
+        for i in range(n):
+            local = 'toto_{:03d}'.format(i)
+            tracker.update_rh(_FakeRh(local, term=i), dict(stage=stage))
+            tracker.update_store(_FakeStore(),
+                                 dict(action=stage, status=True, local=local,
+                                      remote=_remote('/a/{:03d}'.format(i))))
+
+    def _nlines(self):
+        with open(self.jfile) as fhj:
+            return len(fhj.readlines())
+
+    def _dump_contents(self, tracker):
+        return {loc: entry.dump_as_dict() for loc, entry in tracker.items()}
+
+    def test_roundtrip(self):
+        tracker = LocalTracker()
+        self._fill(tracker, 5, stage='put')
+        tracker['toto_001'].update_rh(None, dict(stage='get', hook=dict(a=1)))
+        tracker.json_dump(self.jfile)
+        self.assertEqual(self._nlines(), 6)
+        reloaded = LocalTracker()
+        reloaded.json_load(self.jfile)
+        # Nothing is created until it is accessed
+        self.assertEqual(len(reloaded), 5)
+        self.assertEqual(dict.__len__(reloaded), 0)
+        self.assertIn('toto_002', reloaded)
+        self.assertNotIn('toto_010', reloaded)
+        self.assertEqual(reloaded['toto_001'].latest_rhdict('put')['term'], 1)
+        self.assertEqual(dict.__len__(reloaded), 1)
+        self.assertEqual(self._dump_contents(reloaded),
+                         self._dump_contents(tracker))
+        # The URI hash table is consistent
+        self.assertEqual(len(reloaded.grep_uri('put', dict(path='/a/003'))), 1)
+
+    def test_incremental(self):
+        tracker = LocalTracker()
+        self._fill(tracker, 5)
+        tracker.json_dump(self.jfile)
+        self.assertEqual(self._nlines(), 6)
+        with open(self.jfile) as fhj:
+            snapshot = fhj.read()
+        # Nothing changed
+        tracker.json_dump(self.jfile)
+        self.assertEqual(self._nlines(), 6)
+        # Changes are appended
+        tracker.update_rh(_FakeRh('toto_001', term=99), dict(stage='put'))
+        tracker.update_rh(_FakeRh('new_one'), dict(stage='get'))
+        tracker.update_rh(_FakeRh('toto_004'), dict(stage='get', clear=True))
+        tracker.json_dump(self.jfile)
+        self.assertEqual(self._nlines(), 10)
+        with open(self.jfile) as fhj:
+            self.assertTrue(fhj.read().startswith(snapshot))
+        reloaded = LocalTracker()
+        reloaded.json_load(self.jfile)
+        self.assertEqual(sorted(reloaded.keys()), sorted(tracker.keys()))
+        self.assertNotIn('toto_004', reloaded)
+        self.assertEqual(self._dump_contents(reloaded),
+                         self._dump_contents(tracker))
+        # The reloaded tracker carries on with the same journal
+        reloaded.update_rh(_FakeRh('toto_002', term=98), dict(stage='put'))
+        reloaded.json_dump(self.jfile)
+        self.assertEqual(self._nlines(), 11)
+        again = LocalTracker()
+        again.json_load(self.jfile)
+        self.assertEqual(again['toto_002'].latest_rhdict('put')['term'], 98)
+        # Compaction
+        reloaded.json_dump(self.jfile, compact=True)
+        self.assertEqual(self._nlines(), 6)
+        again.json_load(self.jfile)
+        self.assertEqual(self._dump_contents(again),
+                         self._dump_contents(reloaded))
+
+    def test_remote_delete(self):
+        tracker = LocalTracker()
+        self._fill(tracker, 3, stage='put')
+        tracker.json_dump(self.jfile)
+        reloaded = LocalTracker()
+        reloaded.json_load(self.jfile)
+        reloaded.update_store(_FakeStore(),
+                              dict(action='del', status=True,
+                                   remote=_remote('/a/001')))
+        self.assertEqual(reloaded['toto_001'].dump_as_dict()['uri']['put'], [])
+        reloaded.json_dump(self.jfile)
+        again = LocalTracker()
+        again.json_load(self.jfile)
+        self.assertEqual(again['toto_001'].dump_as_dict()['uri']['put'], [])
+        self.assertEqual(len(again['toto_002'].dump_as_dict()['uri']['put']), 1)
+
+    def test_external_change(self):
+        tracker = LocalTracker()
+        self._fill(tracker, 3)
+        tracker.json_dump(self.jfile)
+        other = LocalTracker()
+        other.json_dump(self.jfile)
+        # The file was overwritten by someone else: a full dump is needed
+        tracker.update_rh(_FakeRh('toto_001'), dict(stage='put'))
+        tracker.json_dump(self.jfile)
+        self.assertEqual(self._nlines(), 4)
+
+    def test_legacy_format(self):
+        tracker = LocalTracker()
+        self._fill(tracker, 3)
+        legacy = {loc: entry.dump_as_dict() for loc, entry in tracker.items()}
+        with open(self.jfile, 'w') as fhj:
+            json.dump(legacy, fhj, indent=2, sort_keys=True)
+        reloaded = LocalTracker()
+        reloaded.json_load(self.jfile)
+        self.assertEqual(dict.__len__(reloaded), 0)
+        self.assertEqual(self._dump_contents(reloaded), legacy)
+        # The next dump uses the journal format
+        reloaded.json_dump(self.jfile)
+        self.assertEqual(self._nlines(), 4)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
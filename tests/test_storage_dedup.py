@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+
+from bronx.fancies import loggers
+
+import footprints as fp
+
+import vortex
+from vortex.tools.storage import Cache, DedupBlobStore
+
+tloglevel = 'critical'
+
+
+class DedupTestCache(Cache):
+
+    _footprint = dict(
+        info = 'A cache with a dedicated kind (for unit-testing).',
+        attr = dict(
+            kind = dict(
+                values   = ['dedupunittest', ],
+            ),
+        )
+    )
+
+
+@loggers.unittestGlobalLevel(tloglevel)
+class TestCacheDedup(unittest.TestCase):
+
+    def setUp(self):
+        self.sh = vortex.sessions.current().system()
+        self.tmpdir = tempfile.mkdtemp(suffix='_test_storage_dedup')
+        self.oldpwd = self.sh.pwd()
+        self.sh.cd(self.tmpdir)
+        self.entry = self.sh.path.join(self.tmpdir, 'cache')
+        for fname, content in (('file1', 'toto'), ('file2', 'toto'),
+                               ('file3', 'titi')):
+            with open(fname, 'w') as fhw:
+                fhw.write(content)
+
+    def tearDown(self):
+        self.sh.cd(self.oldpwd)
+        self.sh.rmtree(self.tmpdir)
+
+    def new_cache(self, **kwargs):
+        return fp.proxy.cache(kind='dedupunittest', entry=self.entry,
+                              **kwargs)
+
+    def assertContent(self, path, content):
+        with open(path) as fhr:
+            self.assertEqual(fhr.read(), content)
+
+    def test_dedup_off(self):
+        cache = self.new_cache(dedup=False)
+        self.assertIsNone(cache.dedup_store)
+        self.assertTrue(cache.insert('a/file1', 'file1'))
+        self.assertFalse(os.path.exists(os.path.join(self.entry, '.blobs')))
+
+    def test_dedup(self):
+        cache = self.new_cache(dedup=True, dedup_hash='md5')
+        dstore = cache.dedup_store
+        self.assertIsInstance(dstore, DedupBlobStore)
+        self.assertEqual(dstore.algorithm, 'md5')
+        self.assertTrue(cache.insert('a/file1', 'file1', intent='inout'))
+        self.assertTrue(cache.insert('b/file2', 'file2', intent='inout'))
+        self.assertTrue(cache.insert('b/file3', 'file3', intent='inout'))
+        loc1 = cache.fullpath('a/file1')
+        loc2 = cache.fullpath('b/file2')
+        loc3 = cache.fullpath('b/file3')
+        # Identical files share the same blob
+        self.assertTrue(os.path.samefile(loc1, loc2))
+        self.assertFalse(os.path.samefile(loc1, loc3))
+        self.assertEqual(os.stat(loc1).st_nlink, 3)
+        self.assertCountEqual(cache.catalog(),
+                              ['/a/file1', '/b/file2', '/b/file3'])
+        # Re-inserting an unchanged file is a no-op
+        ino = os.stat(loc1).st_ino
+        self.assertTrue(cache.insert('a/file1', 'file1', intent='inout'))
+        self.assertEqual(os.stat(loc1).st_ino, ino)
+        # Retrieve
+        self.assertTrue(cache.retrieve('b/file2', 'rfile2', intent='inout'))
+        self.assertContent('rfile2', 'toto')
+        # Updating an entry leaves the other entries untouched
+        self.assertTrue(cache.insert('b/file2', 'file3', intent='inout'))
+        self.assertContent(loc1, 'toto')
+        self.assertContent(loc2, 'titi')
+        # Garbage collection
+        self.assertEqual(dstore.gc()['removed'], 0)
+        self.assertTrue(cache.delete('a/file1'))
+        self.assertEqual(dstore.gc(dryrun=True),
+                         dict(removed=1, freed=4, kept=1))
+        self.assertEqual(dstore.gc(), dict(removed=1, freed=4, kept=1))
+        self.assertEqual(dstore.gc(), dict(removed=0, freed=0, kept=1))
+        self.assertContent(loc3, 'titi')
+        # Directories are not deduplicated
+        self.sh.mkdir('testdir')
+        self.sh.cp('file1', 'testdir/file1')
+        self.assertTrue(cache.insert('c/testdir', 'testdir', intent='inout'))
+        self.assertContent(cache.fullpath('c/testdir/file1'), 'toto')
+        self.assertEqual(os.stat(cache.fullpath('c/testdir/file1')).st_nlink, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import os
 import pickle
 import tempfile
+import time
 import unittest
 
 from bronx.fancies.loggers import unittestGlobalLevel
@@ -9,6 +10,7 @@ import footprints as fp
 
 import vortex  # @UnusedImport
 import vortex.data.stores
+from vortex.data.abstractstores import MultiStore, Store, lookup_cache
 from vortex.tools.net import uriparse, uriunparse
 from bronx.datagrip.datastore import DataStore
 
@@ -17,6 +19,101 @@ DATAPATHTEST = os.path.join(os.path.dirname(__file__), 'data')
 TLOGLEVEL = 9999
 
 
+class LookupCacheTestStore(Store):
+    """A fake store that counts the number of check calls."""
+
+    _footprint = dict(
+        attr=dict(
+            scheme=dict(
+                values=['lookuptest'],
+            ),
+            netloc=dict(
+                values=['lookup.unittest.fr'],
+            ),
+        ),
+    )
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.existing = set()
+        self.nchecks = 0
+
+    def use_lookup_cache(self):
+        return True
+
+    def lookuptestcheck(self, remote, options):
+        self.nchecks += 1
+        return remote['path'] in self.existing
+
+    def lookuptestlocate(self, remote, options):
+        return remote['path']
+
+    def lookuptestput(self, local, remote, options):
+        self.existing.add(remote['path'])
+        return True
+
+    def lookuptestdelete(self, remote, options):
+        self.existing.discard(remote['path'])
+        return True
+
+
+class ProbeTestStore(Store):
+    """A fake store with slow checks."""
+
+    _footprint = dict(
+        attr=dict(
+            scheme=dict(
+                values=['probetest'],
+            ),
+            netloc=dict(
+                values=['probe1.unittest.fr', 'probe2.unittest.fr', 'probe3.unittest.fr'],
+            ),
+        ),
+    )
+
+    #: The content of each store
+    contents = dict()
+
+    def probetestcheck(self, remote, options):
+        time.sleep(0.2)
+        return remote['path'] in self.contents.get(self.netloc, ())
+
+    def probetestlocate(self, remote, options):
+        return self.netloc + remote['path']
+
+    def probetestget(self, remote, local, options):
+        with open(local, 'w') as fhl:
+            fhl.write(self.netloc)
+        return remote['path'] in self.contents.get(self.netloc, ())
+
+    def use_cache(self):
+        return self.netloc != 'probe3.unittest.fr'
+
+    def probetestput(self, local, remote, options):
+        time.sleep(0.2)
+        with open(local) as fhl:
+            self.contents.setdefault(self.netloc, dict())[remote['path']] = fhl.read()
+        return True
+
+
+class ProbeTestMultiStore(MultiStore):
+    """Aggregate three ProbeTestStore objects."""
+
+    _footprint = dict(
+        attr=dict(
+            scheme=dict(
+                values=['probetest'],
+            ),
+            netloc=dict(
+                values=['probe.unittest.fr'],
+            ),
+        ),
+    )
+
+    def alternates_netloc(self):
+        return ['probe1.unittest.fr', 'probe2.unittest.fr', 'probe3.unittest.fr']
+
+
 @unittestGlobalLevel(TLOGLEVEL)
 class AbstractTestStores(unittest.TestCase):
 
@@ -387,6 +484,146 @@ class TestFunctionStore(AbstractTestStores):
         self.assertFalse(st.check(furi, dict(fmt='ascii')))
 
 
+class TestStoreLookupCache(AbstractTestStores):
+
+    def setUp(self):
+        super().setUp()
+        self.lcache = lookup_cache()
+        self.lcache.clear()
+        self.store = fp.proxy.store(scheme='lookuptest', netloc='lookup.unittest.fr')
+        self.uri = uriparse('lookuptest://lookup.unittest.fr/a/b/c')
+
+    def tearDown(self):
+        self.lcache.clear()
+        super().tearDown()
+
+    def test_check(self):
+        self.assertFalse(self.store.check(self.uri))
+        self.assertFalse(self.store.check(self.uri))
+        self.assertEqual(self.store.nchecks, 1)
+        # Bypass the cache
+        self.assertFalse(self.store.check(self.uri, dict(lookupcache=False)))
+        self.assertEqual(self.store.nchecks, 2)
+        # The put invalidates the negative lookup
+        self.assertTrue(self.store.put('toto', self.uri))
+        self.assertTrue(self.store.check(self.uri))
+        self.assertTrue(self.store.check(self.uri.copy()))
+        self.assertEqual(self.store.nchecks, 3)
+        # Other paths or queries are not concerned
+        uri_q = uriparse('lookuptest://lookup.unittest.fr/a/b/c?extract=d')
+        self.assertTrue(self.store.check(uri_q))
+        self.assertEqual(self.store.nchecks, 4)
+        self.assertFalse(self.store.check(uriparse('lookuptest://lookup.unittest.fr/a/b')))
+        self.assertEqual(self.store.nchecks, 5)
+        # The delete invalidates the positive lookup
+        self.assertTrue(self.store.delete(self.uri))
+        self.assertFalse(self.store.check(self.uri))
+        self.assertEqual(self.store.nchecks, 6)
+        self.assertEqual(self.store.locate(self.uri), '/a/b/c')
+        self.assertEqual(self.store.locate(self.uri), '/a/b/c')
+        stats = self.lcache.stats
+        self.assertEqual(stats['hits'], 3)
+        self.assertEqual(stats['invalidations'], 2)
+
+    def test_ttl(self):
+        ttl, negative_ttl = self.lcache.ttl, self.lcache.negative_ttl
+        try:
+            self.lcache.negative_ttl = 0
+            self.assertFalse(self.store.check(self.uri))
+            self.assertFalse(self.store.check(self.uri))
+            self.assertEqual(self.store.nchecks, 2)
+            self.lcache.ttl = 0.05
+            self.store.existing.add('/a/b/c')
+            self.assertTrue(self.store.check(self.uri))
+            self.assertTrue(self.store.check(self.uri))
+            self.assertEqual(self.store.nchecks, 3)
+            self.sh.sleep(0.1)
+            self.assertTrue(self.store.check(self.uri))
+            self.assertEqual(self.store.nchecks, 4)
+        finally:
+            self.lcache.ttl, self.lcache.negative_ttl = ttl, negative_ttl
+
+    def test_cache_store(self):
+        # Caches may be filled by other processes: misses are not remembered
+        self.store.use_cache = lambda: True
+        self.assertFalse(self.store.check(self.uri))
+        self.assertFalse(self.store.check(self.uri))
+        self.assertEqual(self.store.nchecks, 2)
+        self.store.existing.add('/a/b/c')
+        self.assertTrue(self.store.check(self.uri))
+        self.assertTrue(self.store.check(self.uri))
+        self.assertEqual(self.store.nchecks, 3)
+
+
+class TestMultiStoreProbes(AbstractTestStores):
+
+    def setUp(self):
+        super().setUp()
+        ProbeTestStore.contents = dict()
+        self.store = fp.proxy.store(scheme='probetest', netloc='probe.unittest.fr',
+                                    username='unittest')
+        self.uri = uriparse('probetest://probe.unittest.fr/a/b/c')
+
+    def assert_check(self, expected, concurrent):
+        t0 = time.monotonic()
+        self.assertEqual(bool(self.store.check(self.uri, dict(concurrent_probes=concurrent))),
+                         expected)
+        return time.monotonic() - t0
+
+    def test_check(self):
+        self.assertIsInstance(self.store, ProbeTestMultiStore)
+        self.assertGreater(self.assert_check(False, False), 0.55)
+        self.assertLess(self.assert_check(False, True), 0.55)
+        ProbeTestStore.contents['probe3.unittest.fr'] = {'/a/b/c'}
+        self.assertLess(self.assert_check(True, True), 0.55)
+        ProbeTestStore.contents['probe1.unittest.fr'] = {'/a/b/c'}
+        self.assertLess(self.assert_check(True, True), 0.35)
+        self.assertEqual(self.store.locate(self.uri, dict(concurrent_probes=True)),
+                         'probe1.unittest.fr/a/b/c;probe2.unittest.fr/a/b/c;probe3.unittest.fr/a/b/c')
+
+    def test_get(self):
+        ProbeTestStore.contents['probe2.unittest.fr'] = {'/a/b/c'}
+        ProbeTestStore.contents['probe3.unittest.fr'] = {'/a/b/c'}
+        # The highest priority store wins
+        self.assertTrue(self.store.get(self.uri, 'probed', dict(concurrent_probes=True)))
+        with open('probed') as fhp:
+            self.assertEqual(fhp.read(), 'probe2.unittest.fr')
+        # Nothing is found: fall back to the sequential processing
+        ProbeTestStore.contents = dict()
+        self.assertFalse(self.store.get(self.uri, 'probed', dict(concurrent_probes=True)))
+        with open('probed') as fhp:
+            self.assertEqual(fhp.read(), 'probe3.unittest.fr')
+
+
+class TestMultiStoreWriteBehind(AbstractTestStores):
+
+    def setUp(self):
+        super().setUp()
+        ProbeTestStore.contents = dict()
+        self.store = fp.proxy.store(scheme='probetest', netloc='probe.unittest.fr',
+                                    username='unittest', refillstore=True)
+        self.uri = uriparse('probetest://probe.unittest.fr/a/b/c')
+
+    def test_refill(self):
+        ProbeTestStore.contents['probe3.unittest.fr'] = {'/a/b/c': 'probe3.unittest.fr'}
+        wbqueue = self.t.context.writebehind_queue
+        t0 = time.monotonic()
+        self.assertTrue(self.store.get(self.uri, 'refilled', dict(writebehind_refills=True)))
+        # The refills are not on the critical path
+        self.assertLess(time.monotonic() - t0, 0.55 + 0.4)
+        with open('refilled') as fhp:
+            self.assertEqual(fhp.read(), 'probe3.unittest.fr')
+        self.t.context.flush_writebehind()
+        self.assertEqual(wbqueue.pending, 0)
+        for netloc in ('probe1.unittest.fr', 'probe2.unittest.fr'):
+            self.assertEqual(ProbeTestStore.contents[netloc]['/a/b/c'], 'probe3.unittest.fr')
+        # The staged copies are removed
+        self.assertEqual(self.sh.listdir(wbqueue.stagedir), [])
+        self.assertCountEqual(self.sh.listdir(self.tmpdir),
+                              ['refilled', self.sh.path.basename(wbqueue.stagedir)])
+        wbqueue.clear()
+
+
 class TestFinderStore(AbstractTestStores):
 
     def test_basics(self):
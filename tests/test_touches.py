@@ -0,0 +1,87 @@
+import os
+import tempfile
+import time
+import unittest
+
+from bronx.fancies import loggers
+
+import footprints as fp
+
+import vortex
+from vortex.tools import touches
+
+tloglevel = 'CRITICAL'
+
+
+@loggers.unittestGlobalLevel(tloglevel)
+class TestDeferredTouches(unittest.TestCase):
+
+    def setUp(self):
+        self.sh = vortex.sessions.current().system()
+        self.tmpdir = tempfile.mkdtemp(prefix='test_touches_')
+        self.dirs = [self.sh.path.join(self.tmpdir, d) for d in ('a', 'a/b', 'a/c')]
+        for d in self.dirs:
+            self.sh.mkdir(d)
+        self._age()
+
+    def tearDown(self):
+        self.sh.rm(self.tmpdir)
+
+    def _age(self):
+        for d in self.dirs:
+            os.utime(d, (1000000000, 1000000000))
+
+    def _touched(self):
+        return [os.stat(d).st_mtime > 1000000000 for d in self.dirs]
+
+    def test_batch(self):
+        dtouches = touches.DeferredTouches(active=True, delay=3600)
+        dtouches.request([self.dirs[1], self.dirs[0]])
+        dtouches.request([self.dirs[2], self.dirs[0]])
+        self.assertEqual(dtouches.pending, 3)
+        self.assertEqual(self._touched(), [False, False, False])
+        self.assertEqual(dtouches.flush(), 3)
+        self.assertEqual(self._touched(), [True, True, True])
+        self.assertEqual(dtouches.flush(), 0)
+        # Recently touched directories are skipped
+        self._age()
+        dtouches.request(self.dirs[:2], mindelay=600)
+        dtouches.request(self.dirs[:2])
+        dtouches.request([self.sh.path.join(self.tmpdir, 'missing')])
+        self.assertEqual(dtouches.flush(), 2)
+        self.assertEqual(self._touched(), [True, True, False])
+        self.assertEqual(dtouches.stats,
+                         dict(requested=9, coalesced=1, throttled=2, touched=5, saved=4))
+
+    def test_timer(self):
+        dtouches = touches.DeferredTouches(active=True, delay=0.05)
+        dtouches.request(self.dirs)
+        t0 = time.time()
+        while dtouches.pending and time.time() - t0 < 5:
+            time.sleep(0.01)
+        self.assertEqual(self._touched(), [True, True, True])
+
+    def test_inactive(self):
+        dtouches = touches.DeferredTouches(active=False)
+        dtouches.request(self.dirs[:1])
+        self.assertEqual(dtouches.pending, 0)
+        self.assertEqual(self._touched(), [True, False, False])
+
+    def test_cache(self):
+        cache = fp.proxy.cache(entry=self.tmpdir, rtouch=True, rtouchdelay=0)
+        local = self.sh.path.join(self.tmpdir, 'local')
+        with open(local, 'w') as fhl:
+            fhl.write('data')
+        self.assertTrue(cache.insert('a/b/d/file', local))
+        cache.flush_touches()
+        self._age()
+        self.assertTrue(cache.retrieve('a/c/file', local, silent=True) is False)
+        self.assertTrue(cache.retrieve('a/b/d/file', local + '.bis'))
+        # The touches are deferred
+        self.assertEqual(self._touched(), [False, False, False])
+        cache.flush_touches()
+        self.assertEqual(self._touched(), [True, True, False])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
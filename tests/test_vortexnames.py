@@ -1,3 +1,5 @@
+import copy
+import pickle
 import unittest
 
 from vortex.tools.names import VortexNameBuilder, VortexNameBuilderError
@@ -329,5 +331,44 @@ class TestProxyNameBuilder(unittest.TestCase):
                          'vortexdata.arpege.20180101T0000A-20180101T1800+0006:00-100')
 
 
+class TestNameBuilderMemo(unittest.TestCase):
+
+    def testMemoAndDefaults(self):
+        vb = VortexDateNameBuilder(name='date@std')
+        desc = dict(style='obs', nativefmt='toto', stage='void', part='all')
+        for _ in range(3):
+            self.assertEqual(vb.pack_basename(desc), 'toto-std.void.all')
+        self.assertEqual(vb.pack_basename(dict(desc, part='conv')),
+                         'toto-std.void.conv')
+        # Unused (and unhashable) values do not matter
+        self.assertEqual(vb.pack_basename(dict(desc, unused=[set()])),
+                         'toto-std.void.all')
+        # Changing the defaults discards the remembered names
+        vb.setdefault(suffix='test')
+        self.assertEqual(vb.pack_basename(desc), 'toto-std.void.all.test')
+
+    def testPickleAndCopy(self):
+        vb = VortexDateNameBuilder(name='date@std')
+        desc = dict(style='obs', nativefmt='toto', stage='void', part='all')
+        self.assertEqual(vb.pack_basename(desc), 'toto-std.void.all')
+        for vbbis in (pickle.loads(pickle.dumps(vb)), copy.deepcopy(vb)):
+            self.assertEqual(vbbis.pack_basename(desc), 'toto-std.void.all')
+            self.assertEqual(vbbis.pack_basename(dict(desc, part='conv')),
+                             'toto-std.void.conv')
+
+    def testPackPathnames(self):
+        vb = VortexNameBuilder()
+        descs = [dict(vapp='arpege', vconf='4dvarfr', experiment='ABCD',
+                      flow=[{'date': '20180101' + cutoff}, ],
+                      block='forecast')
+                 for cutoff in ('00', '12', '00')]
+        self.assertEqual(vb.pack_pathnames(descs),
+                         ['arpege/4dvarfr/ABCD/2018010100X/forecast',
+                          'arpege/4dvarfr/ABCD/2018010112X/forecast',
+                          'arpege/4dvarfr/ABCD/2018010100X/forecast'])
+        self.assertEqual(vb.pack_basenames([dict(radical='a'), dict(radical='b')]),
+                         ['a', 'b'])
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
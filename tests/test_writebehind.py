@@ -0,0 +1,72 @@
+import tempfile
+import threading
+import time
+import unittest
+
+from bronx.fancies import loggers
+
+import vortex
+from vortex.tools.writebehind import WriteBehindQueue
+
+tloglevel = 'CRITICAL'
+
+
+@loggers.unittestGlobalLevel(tloglevel)
+class TestWriteBehindQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.sh = vortex.sessions.current().system()
+        self.tmpdir = tempfile.mkdtemp(prefix='test_writebehind_')
+        self.wbqueue = WriteBehindQueue(self.sh, self.tmpdir, maxsize=2, workers=2)
+
+    def tearDown(self):
+        self.wbqueue.clear()
+        self.sh.rm(self.tmpdir)
+
+    def test_stage(self):
+        local = self.sh.path.join(self.tmpdir, 'local')
+        with open(local, 'w') as fhl:
+            fhl.write('data')
+        for intent in ('in', 'inout'):
+            staged = self.wbqueue.stage(local, intent=intent)
+            self.assertTrue(staged.startswith(self.wbqueue.stagedir))
+            with open(staged) as fhs:
+                self.assertEqual(fhs.read(), 'data')
+        self.assertIsNone(self.wbqueue.stage(self.sh.path.join(self.tmpdir, 'missing')))
+
+    def test_submit(self):
+        results = list()
+        event = threading.Event()
+
+        def action(value):
+            event.wait()
+            if value == 'failed':
+                return False
+            if value == 'crash':
+                raise ValueError('Crash')
+            results.append(value)
+            return True
+
+        local = self.sh.path.join(self.tmpdir, 'local')
+        with open(local, 'w') as fhl:
+            fhl.write('data')
+        staged = self.wbqueue.stage(local)
+        self.wbqueue.submit('test1', action, 'ok', staged=staged)
+        self.wbqueue.submit('test2', action, 'failed')
+        self.assertEqual(self.wbqueue.pending, 2)
+        # The queue is bounded
+        thread = threading.Thread(target=self.wbqueue.submit, args=('test3', action, 'crash'))
+        thread.start()
+        time.sleep(0.1)
+        self.assertTrue(thread.is_alive())
+        event.set()
+        thread.join()
+        self.assertEqual(self.wbqueue.flush(), 2)
+        self.assertEqual(self.wbqueue.pending, 0)
+        self.assertEqual(results, ['ok'])
+        self.assertEqual(self.wbqueue.stats, dict(submitted=3, done=1, failed=2))
+        self.assertFalse(self.sh.path.exists(staged))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,15 @@
+import os
 import sys
+import tempfile
+import threading
+import time
 import unittest
 
 from bronx.fancies.loggers import unittestGlobalLevel
 
 import vortex
-from vortex.algo.components import Expresso, AlgoComponentError
+from vortex.algo.components import Expresso, AlgoComponentError, DelayedAlgoComponentError
+from vortex.layout.dataflow import SectionFatalError
 
 tloglevel = 'ERROR'
 
@@ -41,6 +46,72 @@ class TestAlgoBasicsClass(unittest.TestCase):
                                   interpreter_path=sys.executable)
         self.assertEqual(exp1._actual_interpreter, sys.executable)
 
+    def test_flyput_promises(self):
+
+        class FakeContainer:
+
+            def __init__(self, local):
+                self.abspath = os.path.abspath(local)
+
+            def localpath(self):
+                return self.abspath
+
+        class FakeRh:
+
+            def __init__(self, local):
+                self.container = FakeContainer(local)
+
+        class FakePromise:
+
+            def __init__(self, local):
+                self.rh = FakeRh(local)
+                self.threads = list()
+
+            def put(self, incache=False):
+                time.sleep(0.05)
+                self.threads.append(threading.current_thread().name)
+                if self.rh.container.abspath.endswith('fatal'):
+                    raise SectionFatalError('Could not put ' + self.rh.container.abspath)
+                return incache
+
+        exp = self._new_expresso(interpreter='python')
+        startdir = os.getcwd()
+        tmpdir = tempfile.mkdtemp(prefix='test_flyput_')
+        try:
+            os.chdir(tmpdir)
+            exp._promises = [FakePromise('toto_{:02d}'.format(i)) for i in range(8)]
+            self.assertIs(exp.promise_lookup('./toto_03'), exp._promises[3])
+            self.assertIs(exp.promise_lookup(os.path.join(tmpdir, 'toto_04')),
+                          exp._promises[4])
+            self.assertIsNone(exp.promise_lookup('toto_10'))
+            # Concurrent puts
+            exp.io_poll_workers = 4
+            t0 = time.time()
+            exp._flyput_job_internal_put(['toto_{:02d}'.format(i) for i in range(8)] +
+                                         ['toto_00', 'unexpected'])
+            self.assertEqual(exp.flyput_flush(), 0)
+            self.assertLess(time.time() - t0, 0.35)
+            self.assertEqual([len(p.threads) for p in exp._promises],
+                             [2] + [1] * 7)
+            self.assertTrue(all([t.startswith('vortex-writebehind')
+                                 for p in exp._promises for t in p.threads]))
+            self.assertEqual(exp.flyput_flush(), 0)
+            # Failing puts are reported at the end of the run
+            exp._promises.append(FakePromise('toto_fatal'))
+            exp._promises_index = None
+            exp._flyput_job_internal_put(['toto_fatal', 'toto_01'])
+            self.assertEqual(exp.flyput_flush(), 1)
+            with self.assertRaises(DelayedAlgoComponentError):
+                exp.delayed_exceptions(dict())
+            # Serial puts
+            exp.io_poll_workers = 1
+            exp._flyput_job_internal_put(['toto_05'])
+            self.assertEqual(exp._promises[5].threads[-1],
+                             threading.current_thread().name)
+        finally:
+            os.chdir(startdir)
+            os.rmdir(tmpdir)
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
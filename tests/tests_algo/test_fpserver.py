@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from bronx.fancies.loggers import unittestGlobalLevel
+
+import vortex
+from vortex.nwp.algo.fpserver import (
+    FullPosServerFlyPoller, fullpos_server_flypoll, fullpos_server_flypoll_pickle
+)
+
+tloglevel = 'ERROR'
+
+
+@unittestGlobalLevel(tloglevel)
+class TestFullPosServerFlyPoll(unittest.TestCase):
+
+    def setUp(self):
+        self.sh = vortex.sessions.current().system()
+        self.startupdir = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp(prefix='test_fpserver_')
+        os.chdir(self.tmpdir)
+
+    def tearDown(self):
+        os.chdir(self.startupdir)
+        shutil.rmtree(self.tmpdir)
+
+    @staticmethod
+    def _touch(*names):
+        for name in names:
+            open(name, 'w').close()
+
+    @staticmethod
+    def _term(directory, term):
+        with open(os.path.join(directory, 'term'), 'w') as fht:
+            fht.write(term + '\n')
+
+    def test_poller(self):
+        poller = FullPosServerFlyPoller(self.sh)
+        dirs = ('.', 'sub')
+        self.assertEqual(poller('PF', 'term', directories=dirs), [])
+        self.assertTrue(os.path.isdir('sub'))
+        self._touch('PFFPOSDOM+0000', 'PFFPOSDOM+0001:30.sfx', 'PFFPOSDOM+0002',
+                    'PFFPOSDOM+0003.d', 'GRIBPF+0000', 'sub/PFFPOSDOM+0000')
+        self._term('.', '1:30')
+        self.assertEqual(sorted(poller('PF', 'term', directories=dirs)),
+                         ['PFFPOSDOM+0000', 'PFFPOSDOM+0001:30.sfx'])
+        self.assertEqual(poller('PF', 'term', directories=dirs), [])
+        self._term('.', '3')
+        self._term('sub', '0')
+        self.assertEqual(sorted(poller('PF', 'term', directories=dirs)),
+                         ['PFFPOSDOM+0002', 'sub/PFFPOSDOM+0000'])
+        # The state is saved on close
+        self.assertFalse(os.path.exists(fullpos_server_flypoll_pickle))
+        poller.close()
+        self.assertTrue(os.path.exists(fullpos_server_flypoll_pickle))
+        self._touch('PFFPOSDOM+0004')
+        self._term('.', '4')
+        self.assertEqual(fullpos_server_flypoll(self.sh, 'PF', 'term'),
+                         ['PFFPOSDOM+0004'])
+        # The state saved by someone else is reloaded
+        self.assertEqual(poller('PF', 'term', directories=dirs), [])
+        self.assertEqual(fullpos_server_flypoll(self.sh, 'GRIBPF', 'term'),
+                         ['GRIBPF+0000'])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
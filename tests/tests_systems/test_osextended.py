@@ -7,6 +7,7 @@ import unittest
 
 import footprints as fp
 
+from vortex import config
 from vortex.tools.systems import OSExtended
 
 
@@ -176,6 +177,41 @@ class TestOSExtendedBasics(unittest.TestCase):
         self.assert_sameinode(self.sh.path.join('testdir_inout', 'tsfile1'),
                               self.sh.path.join('testdir_inout', 'sub1', 'tlink3.txt'))
 
+    def _check_tree_copies(self, suffix):
+        self.assertTrue(self.sh.cp('bigdir', 'bigdir_in' + suffix, intent='in'))
+        self.assertEqual(self.sh.treecopy_stats.files, 120)
+        self.assertEqual(self.sh.treecopy_stats.bytes, sum([4 * i for i in range(120)]))
+        self.assert_sameinode(self.sh.path.join('bigdir', 'sub3', 'file052'),
+                              self.sh.path.join('bigdir_in' + suffix, 'sub3', 'file052'))
+        self.assertFalse(self.sh.stat(self.sh.path.join('bigdir_in' + suffix, 'sub3', 'file052')).st_mode
+                         & 0o222)
+        self.assertTrue(self.sh.path.islink(self.sh.path.join('bigdir_in' + suffix, 'sub0', 'link007')))
+        self.assertTrue(self.sh.cp('bigdir', 'bigdir_inout' + suffix, intent='inout'))
+        self.assertEqual(self.sh.treecopy_stats.files, 120)
+        self.assert_not_sameinode(self.sh.path.join('bigdir', 'sub3', 'file052'),
+                                  self.sh.path.join('bigdir_inout' + suffix, 'sub3', 'file052'))
+        with open(self.sh.path.join('bigdir_inout' + suffix, 'sub6', 'file118')) as fhtest:
+            self.assertEqual(fhtest.read(), 'data' * 118)
+        self.assertEqual(sorted(self.sh.ffind('bigdir_inout' + suffix)),
+                         sorted([f.replace('bigdir', 'bigdir_inout' + suffix, 1)
+                                 for f in self.sh.ffind('bigdir')]))
+
+    def test_tree_operations(self):
+        for i in range(120):
+            subdir = self.sh.path.join('bigdir', 'sub{:d}'.format(i % 7))
+            self.sh.mkdir(subdir)
+            with open(self.sh.path.join(subdir, 'file{:03d}'.format(i)), 'w') as fhtest:
+                fhtest.write('data' * i)
+        self.sh.softlink('file007', self.sh.path.join('bigdir', 'sub0', 'link007'))
+        self._check_tree_copies('_serial')
+        # Large enough to be processed concurrently
+        self.assertFalse(config.is_defined('treecopy'))
+        config.set_config('treecopy', 'local_workers', 4)
+        try:
+            self._check_tree_copies('_threaded')
+        finally:
+            del config.VORTEX_CONFIG['treecopy']
+
     def test_dirlock(self):
         with self.sh.lockdir_context('toto'):
             self.sh.mkdir('toto')